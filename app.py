@@ -1,24 +1,122 @@
 import streamlit as st
 
-from src.utils import utils
-import pandas as pd
-from functools import lru_cache
+from src.utils import (
+    DASHBOARD_COLUMNS,
+    available_months,
+    filter_trades,
+    load_trades,
+    paginate,
+    partition_fingerprint,
+    summarize_trades,
+)
 
 st.set_page_config(layout="wide")
 
+DATA_TYPES = {"실거래": "trade", "분양권": "bunyang"}
 
-@lru_cache
-def get_data(fname):
-    fpath = utils.find_file(fname)
-    df = pd.read_csv(fpath)
-    return df
 
+# 캐시 키에 partition_fingerprint가 들어가므로 새 date_id가 저장되면 다시 읽음
+@st.cache_data(show_spinner="데이터를 읽는 중...", max_entries=8)
+def get_trades(data_type: str, start: int, end: int, fingerprint: tuple):
+    return load_trades(data_type, start=start, end=end, columns=DASHBOARD_COLUMNS)
 
-df_08 = get_data("trade_202408.csv")
-df_09 = get_data("trade_202409.csv")
 
-st.markdown("# 24년 8월")
-st.dataframe(data=df_08)
+@st.cache_data(max_entries=64)
+def get_filtered(
+    data_type: str, start: int, end: int, fingerprint: tuple, filters: tuple
+):
+    sgg_names, apt_name, area_range, exclude_cancelled = filters
+    df = get_trades(data_type, start, end, fingerprint)
+    return filter_trades(
+        df,
+        sgg_names=list(sgg_names),
+        apt_name=apt_name,
+        area_range=area_range,
+        exclude_cancelled=exclude_cancelled,
+    )
 
-st.markdown("# 24년 9월")
-st.dataframe(data=df_09)
+
+@st.cache_data
+def get_sgg_names(data_type: str, start: int, end: int, fingerprint: tuple):
+    return sorted(
+        get_trades(data_type, start, end, fingerprint)["시군구코드"]
+        .astype(str)
+        .unique()
+        .tolist()
+    )
+
+
+# 브라우저에는 집계 결과와 현재 page의 row만 보냄
+@st.cache_data(max_entries=64)
+def get_summary(
+    data_type: str, start: int, end: int, fingerprint: tuple, filters: tuple
+):
+    return summarize_trades(get_filtered(data_type, start, end, fingerprint, filters))
+
+
+@st.cache_data(max_entries=256)
+def get_page(
+    data_type: str,
+    start: int,
+    end: int,
+    fingerprint: tuple,
+    filters: tuple,
+    page: int,
+    page_size: int,
+    sort_by: str,
+    ascending: bool,
+):
+    df = get_filtered(data_type, start, end, fingerprint, filters)
+    return len(df), *paginate(df, page, page_size, sort_by=sort_by, ascending=ascending)
+
+
+with st.sidebar:
+    data_name = st.radio("데이터", list(DATA_TYPES.keys()), horizontal=True)
+    data_type = DATA_TYPES[data_name]
+    months = available_months(data_type)
+    if not months:
+        st.warning("저장된 데이터가 없습니다")
+        st.stop()
+    start, end = st.select_slider(
+        "계약월", options=months, value=(months[max(0, len(months) - 12)], months[-1])
+    )
+    fingerprint = partition_fingerprint(data_type, start, end)
+
+    sgg_names = st.multiselect(
+        "시군구", get_sgg_names(data_type, start, end, fingerprint)
+    )
+    apt_name = st.text_input("아파트명").strip()
+    area_range = st.slider("전용면적", 0.0, 300.0, (0.0, 300.0), step=1.0)
+    if area_range == (0.0, 300.0):
+        area_range = None
+    exclude_cancelled = st.checkbox("계약해지 제외", value=False)
+
+    page_size = st.selectbox("페이지당 거래수", [50, 100, 200, 500], index=1)
+    sort_by = st.selectbox("정렬", ["계약일", "거래금액", "전용면적"])
+    ascending = st.checkbox("오름차순", value=False)
+
+filters = (tuple(sgg_names), apt_name, area_range, exclude_cancelled)
+
+st.markdown(f"# {data_name} {start} ~ {end}")
+st.markdown("## 월별/시군구별 집계")
+st.dataframe(
+    get_summary(data_type, start, end, fingerprint, filters),
+    use_container_width=True,
+    hide_index=True,
+)
+
+st.markdown("## 거래 목록")
+page = st.number_input("페이지", min_value=1, value=1, step=1)
+total, rows, pages = get_page(
+    data_type,
+    start,
+    end,
+    fingerprint,
+    filters,
+    int(page),
+    page_size,
+    sort_by,
+    ascending,
+)
+st.caption(f"{total:,}건 중 {min(int(page), pages)}/{pages} 페이지")
+st.dataframe(rows, use_container_width=True, hide_index=True)
@@ -1,30 +1,54 @@
 import pandas as pd
 from typing import Literal
-from utils import PathConfig, BatchManager, get_task_id
-from datetime import datetime, timedelta
-import shutil
-import matplotlib as mpl
-from matplotlib import pyplot as plt
-from matplotlib import font_manager as fm
-from copy import deepcopy
+from utils import (
+    PathConfig,
+    PlotConfig,
+    BatchManager,
+    Metastore,
+    get_task_id,
+    prepare_dataframe,
+)
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import os
 from argparse import ArgumentParser
-import numpy as np
 
-# Font 찾기
-font_list = fm.findSystemFonts(fontpaths=None, fontext="ttf")
-font_path = [f for f in font_list if "NanumGothic.ttf" in f][0]
-font_file_name = os.path.basename(font_path)
-font_name = fm.FontProperties(fname=font_path, size=10).get_name()
+# 찾은 폰트 경로를 저장할 metastore key
+FONT_KEY = "plot_font"
+_font_name = None
+
+
+def setup_font():
+    """PlotConfig.font_file 한글 폰트를 matplotlib에 등록, 차트를 그릴 때 프로세스에서 한 번만 실행
+    찾은 폰트 경로는 metastore에 저장해서 다음 실행부터는 시스템 폰트를 탐색하지 않고,
+    matplotlib 폰트 캐시를 지우거나 폰트 파일을 복사하지 않고 fontManager에 직접 추가
+
+    Returns: 폰트 이름
+    """
+    global _font_name
+    if _font_name is not None:
+        return _font_name
+    from matplotlib import font_manager as fm
+    from matplotlib import pyplot as plt
+
+    metastore = Metastore()
+    font_path = (metastore.get(FONT_KEY) or {}).get("path")
+    if not font_path or not os.path.exists(font_path):
+        font_list = fm.findSystemFonts(fontpaths=None, fontext="ttf")
+        font_paths = [
+            f for f in font_list if os.path.basename(f) == PlotConfig.font_file
+        ]
+        if not font_paths:
+            raise FileNotFoundError(f"{PlotConfig.font_file} is not installed")
+        font_path = font_paths[0]
+        metastore.add(FONT_KEY, {"path": font_path})
+
+    fm.fontManager.addfont(font_path)
+    _font_name = fm.FontProperties(fname=font_path).get_name()
+    plt.rc("font", family=_font_name)
+    return _font_name
 
-# System Font Path의 ttf 파일을 matplotlib의 font 설정파일로 복사
-config_path = os.path.dirname(mpl.matplotlib_fname())
-config_font_path = os.path.join(os.path.join(config_path, "fonts"), "ttf")
-shutil.rmtree(mpl.get_cachedir())
-shutil.copy(font_path, os.path.join(config_font_path, font_file_name))
-
-# Font Name 가져와서 추가
-plt.rc("font", family=font_name)
 
 # agg_type 변환기
 agg_type_converter = {
@@ -35,59 +59,80 @@ agg_type_converter = {
 }
 
 
-def _sales_trend_prep(df, apt_names, agg_type, date_id):
-    data = deepcopy(df)
-    data["price_range"] = data["가격"].apply(lambda x: int(x / 1e8))
-    data = data[data["면적구분"] == "84"]
-    data["date_id"] = data["date_id"].astype(str)
-    data["기준확인일"] = (
-        data["date_id"]
-        .apply(lambda x: datetime.strptime(x, "%Y-%m-%d") - timedelta(days=28))
-        .astype(str)
+# 그래프에 필요한 컬럼
+TREND_COLUMNS = ["아파트명", "가격", "면적구분", "확인날짜", "date_id"]
+SALES_KO_MAP = {"sales": "매매", "rent": "전세"}
+# 매물 추이 그래프에 그릴 아파트
+TREND_APT_NAMES = [
+    "헬리오시티",
+    "파크리오",
+    "마포래미안푸르지오",
+    "더클래시",
+    "올림픽파크포레온",
+]
+
+
+def sales_trend_data(
+    sales_name: Literal["sales", "rent"], apt_names: list, date_id: str = None
+):
+    """sales_name 데이터를 한 번 읽어서 (아파트명, date_id)별 평균/중앙/최대/최저/매물수를 한 번의 groupby로 계산
+    date_id 기준 28일 이내에 확인된 84타입 매물만 집계
+
+    Args:
+        sales_name: sales, rent
+        apt_names: 그래프에 그릴 아파트명
+        date_id: 이 날짜까지의 date_id만 사용, default 전체
+
+    Returns: 아파트명, date_id(문자열), 평균, 중앙, 최대, 최저, 매물수 컬럼의 dataframe
+    """
+    df = prepare_dataframe(data_type=sales_name, columns=TREND_COLUMNS)
+    data = df[(df["면적구분"] == "84") & df["아파트명"].isin(apt_names)]
+    dates = data["date_id"].astype(str)
+    if date_id:
+        data, dates = data[dates <= date_id], dates[dates <= date_id]
+    # 같은 date_id가 반복되므로 to_datetime의 캐시로 unique 값만 변환
+    base_date = pd.to_datetime(dates, format="%Y-%m-%d") - pd.Timedelta(days=28)
+    valid = data["확인날짜"] >= base_date
+    data = data[valid].assign(
+        date_id=dates[valid], 아파트명=data.loc[valid, "아파트명"].astype(str)
     )
-    data["유효매물"] = np.where(data["확인날짜"] >= data["기준확인일"], True, False)
-    data = data[data["유효매물"]]
-    data = data[data["아파트명"].isin(apt_names)]
 
     trend = (
-        data.groupby(["아파트명", "date_id"])
-        .agg({"가격": ["mean", "median", "max", "min", "count"]})
+        data.groupby(["아파트명", "date_id"])["가격"]
+        .agg(["mean", "median", "max", "min", "count"])
         .reset_index()
     )
     trend.columns = ["아파트명", "date_id", "평균", "중앙", "최대", "최저", "매물수"]
-    trend = trend.sort_values(
-        ["date_id", agg_type_converter[agg_type]], ascending=[True, False]
-    )
-    sorted_apt_names = trend["아파트명"].drop_duplicates().to_list()
-
-    return trend, sorted_apt_names
+    return trend
 
 
-def sales_trend(
-    date_id,
-    apt_names,
+def draw_trend(
+    trend: pd.DataFrame,
     agg_type: Literal["mean", "median", "min", "count"],
     sales_name: Literal["sales", "rent"],
 ):
-    # Make Graph and save png files in PathConfig.graph
-    sales_map = {"sales": PathConfig.sales, "rent": PathConfig.rent}
-    sales_ko_map = {"sales": "매매", "rent": "전세"}
+    """sales_trend_data 결과로 agg_type 그래프를 그려서 PathConfig.graph에 저장하고 figure를 닫음
+
+    Returns: 저장한 png 경로
+    """
+    setup_font()
+    from matplotlib import pyplot as plt
 
-    df = pd.read_parquet(sales_map[sales_name])
-    data, sorted_apt_names = _sales_trend_prep(
-        df=df, apt_names=apt_names, agg_type=agg_type, date_id=date_id
-    )
     converted_agg_type = agg_type_converter[agg_type]  # average -> 평균
+    data = trend.sort_values(["date_id", converted_agg_type], ascending=[True, False])
+    sorted_apt_names = data["아파트명"].drop_duplicates().to_list()
+    panels = dict(list(data.groupby("아파트명", sort=False)))
+
     fig, ax = plt.subplots()
-    ax.set_title(f"아파트별 {sales_ko_map[sales_name]} 매물 추이({converted_agg_type})")
+    ax.set_title(f"아파트별 {SALES_KO_MAP[sales_name]} 매물 추이({converted_agg_type})")
     ax.set_xlabel("날짜")
     if agg_type == "count":
         ax.set_ylabel("갯수")
     else:
         ax.set_ylabel("가격(억)")
-    plt.xticks(rotation=90)
+    ax.tick_params(axis="x", labelrotation=90)
     for apt_name in sorted_apt_names:
-        panel = data[data["아파트명"] == apt_name]
+        panel = panels[apt_name]
         ax.plot(panel["date_id"], panel[converted_agg_type], marker="o", alpha=0.5)
 
     ax.grid()
@@ -96,7 +141,56 @@ def sales_trend(
     graph_path = PathConfig.graph
     if not os.path.exists(graph_path):
         os.makedirs(graph_path, exist_ok=True)
-    plt.savefig(os.path.join(PathConfig.graph, f"{sales_name}_trend_{agg_type}.png"))
+    path = os.path.join(graph_path, f"{sales_name}_trend_{agg_type}.png")
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+
+def render_trends(
+    date_id: str,
+    apt_names: list,
+    sales_names: list = None,
+    agg_types: list = None,
+    processes: int = None,
+):
+    """sales_name마다 데이터를 한 번만 읽고 집계해서 agg_type별 그래프를 모두 그림
+
+    Args:
+        date_id: 이 날짜까지의 date_id만 사용
+        apt_names: 그래프에 그릴 아파트명
+        sales_names: sales, rent, default 둘 다
+        agg_types: mean, median, min, count, default 전체
+        processes: 2 이상이면 그래프를 process pool에서 나눠 그림
+            scheduler의 thread pool 안에서도 불리므로 fork 대신 spawn으로 worker를 띄움(lock을 잡은 채 fork되지 않도록)
+
+    Returns: 저장한 png 경로 리스트
+    """
+    sales_names = sales_names or list(SALES_KO_MAP.keys())
+    agg_types = agg_types or list(agg_type_converter.keys())
+    jobs = []
+    for sales_name in sales_names:
+        trend = sales_trend_data(sales_name, apt_names=apt_names, date_id=date_id)
+        jobs += [(trend, agg_type, sales_name) for agg_type in agg_types]
+    if processes and processes > 1:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=min(processes, len(jobs)), mp_context=context
+        ) as pool:
+            return list(pool.map(draw_trend, *zip(*jobs)))
+    return [draw_trend(*job) for job in jobs]
+
+
+def sales_trend(
+    date_id,
+    apt_names,
+    agg_type: Literal["mean", "median", "min", "count"],
+    sales_name: Literal["sales", "rent"],
+):
+    """그래프 하나만 그림, 여러 개는 render_trends 사용"""
+    return render_trends(
+        date_id, apt_names, sales_names=[sales_name], agg_types=[agg_type]
+    )[0]
 
 
 def parse():
@@ -106,6 +200,7 @@ def parse():
     parser.add_argument(
         "--date_id", default=datetime.now().strftime("%Y-%m-%d"), action="store"
     )
+    parser.add_argument("--processes", default=None, type=int, action="store")
     return parser.parse_args()
 
 
@@ -115,28 +210,15 @@ if __name__ == "__main__":
     block = args.nonblock
     date_id = args.date_id
 
-    apt_names = [
-        "헬리오시티",
-        "파크리오",
-        "마포래미안푸르지오",
-        "더클래시",
-        "올림픽파크포레온",
-    ]
-
-    sales_types = ["sales", "rent"]
-    agg_types = ["mean", "median", "min", "count"]
-    for sales_type in sales_types:
-        for agg_type in agg_types:
-            bm = BatchManager(
-                task_id=get_task_id(__file__, date_id, f"{sales_type}_{agg_type}"),
-                key=date_id,
-                block=block,
-            )
-            bm(
-                task_type="execute",
-                func=sales_trend,
-                date_id=date_id,
-                apt_names=apt_names,
-                agg_type=agg_type,
-                sales_name=sales_type,
-            )
+    bm = BatchManager(
+        task_id=get_task_id(__file__, date_id, "trend"),
+        key=date_id,
+        block=block,
+    )
+    bm(
+        task_type="execute",
+        func=render_trends,
+        date_id=date_id,
+        apt_names=TREND_APT_NAMES,
+        processes=args.processes,
+    )
@@ -0,0 +1,163 @@
+import asyncio
+import shutil
+from collections import Counter
+from pathlib import Path
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from argparse import ArgumentParser
+
+import pandas as pd
+from loguru import logger
+
+import apt_trade
+import bunyang_trade
+from utils import (
+    stream_public_api_data,
+    get_region_index,
+    parse_xml,
+    Metastore,
+    PathConfig,
+    conform,
+    write_history,
+)
+
+URL_KEY = {"trade": "아파트실거래", "bunyang": "분양권실거래"}
+TRANSFORM = {"trade": apt_trade.transform, "bunyang": bunyang_trade.transform}
+
+
+def get_checkpoint_key(data_type: str):
+    """backfill 진행 상황을 저장할 metastore key
+    task_id는 끝난 작업 단위 '{month}_{lawd_cd}'와 history에 합쳐진 월 '{month}'
+    """
+    return f"backfill_{data_type}"
+
+
+def month_range(start: str, end: str):
+    """start ~ end(포함) yyyyMM 리스트"""
+    cur = datetime.strptime(str(start), "%Y%m")
+    last = datetime.strptime(str(end), "%Y%m")
+    months = []
+    while cur <= last:
+        months.append(cur.strftime("%Y%m"))
+        cur += relativedelta(months=1)
+    return months
+
+
+def _staging_path(data_type: str, month: str):
+    # _로 시작하는 폴더는 read_history에서 탐색하지 않음
+    return Path(PathConfig.history).joinpath("_staging", data_type, month)
+
+
+def _stage(data_type: str, lawd_cd: str, month: str, texts: list, date_id: str):
+    """작업 단위(lawd_cd, month) 하나를 전처리해서 월별 중간 폴더에 저장, 데이터가 없으면 저장하지 않음"""
+    result = [df for df in (parse_xml(text, "items") for text in texts) if not df.empty]
+    if not result:
+        return 0
+    df = TRANSFORM[data_type](result, month=month, date_id=date_id)
+    path = _staging_path(data_type, month)
+    path.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(path.joinpath(f"{lawd_cd}.parquet"), engine="pyarrow", index=False)
+    return len(df)
+
+
+def _compact(data_type: str, month: str):
+    """한 달의 작업 단위가 모두 끝나면 중간 파일을 합쳐서 history의 month_id 파티션 파일 하나로 저장"""
+    path = _staging_path(data_type, month)
+    files = sorted(path.glob("*.parquet")) if path.exists() else []
+    if files:
+        df = pd.concat(
+            [pd.read_parquet(f, engine="pyarrow") for f in files], ignore_index=True
+        )
+        write_history(conform(df, data_type), data_type)
+        logger.info(f"{data_type}: {month} saved in history ({len(df)} rows)")
+    shutil.rmtree(path, ignore_errors=True)
+    Metastore().add_task(key=get_checkpoint_key(data_type), task_id=month)
+
+
+async def _fetch(
+    data_type: str, pairs: list, remaining: Counter, concurrency: int = None
+):
+    """작업 단위를 worker pool로 가져와서 끝나는 대로 저장하고 checkpoint를 남김
+
+    Returns: 실패한 작업 단위 리스트
+    """
+    key = get_checkpoint_key(data_type)
+    date_id = datetime.now().strftime("%Y-%m-%d")
+    failed = []
+    async for (lawd_cd, month), texts in stream_public_api_data(
+        url_key=URL_KEY[data_type], pairs=pairs, concurrency=concurrency
+    ):
+        if isinstance(texts, Exception):
+            logger.error(f"{data_type}: {month} : {lawd_cd} FAILED {texts!r}")
+            failed.append((lawd_cd, month))
+            continue
+        rows = _stage(data_type, lawd_cd, month, texts, date_id=date_id)
+        Metastore().add_task(key=key, task_id=f"{month}_{lawd_cd}")
+        logger.info(f"{data_type}: {month} : {lawd_cd} COMPLETE ({rows} rows)")
+        remaining[month] -= 1
+        if remaining[month] == 0:
+            _compact(data_type, month)
+    return failed
+
+
+def backfill(data_type: str, start: str, end: str, concurrency: int = None):
+    """start ~ end 월의 25개 구 거래를 (lawd_cd, month) 작업 단위로 나눠서 history에 저장
+    끝난 작업 단위와 월은 metastore에 기록하므로, 중단 후 다시 실행하면 남은 작업 단위만 가져옴
+
+    Args:
+        data_type: trade, bunyang
+        start: 시작 yyyyMM
+        end: 끝 yyyyMM(포함)
+        concurrency: worker 수(동시 요청 수), default APIConfig.concurrency
+    """
+    key = get_checkpoint_key(data_type)
+    done = set(Metastore().get(key))
+    months = [m for m in month_range(start, end) if m not in done]
+    lawd_cd_list = get_region_index().lawd_cd.tolist()
+    pairs = [
+        (lawd_cd, m)
+        for m in months
+        for lawd_cd in lawd_cd_list
+        if f"{m}_{lawd_cd}" not in done
+    ]
+    remaining = Counter(m for _, m in pairs)
+    logger.info(f"{data_type}: {len(months)} months, {len(pairs)} units left")
+
+    # 작업 단위는 모두 끝났지만 합치기 전에 중단된 월
+    for month in months:
+        if remaining[month] == 0:
+            _compact(data_type, month)
+
+    failed = (
+        asyncio.run(_fetch(data_type, pairs, remaining, concurrency=concurrency))
+        if pairs
+        else []
+    )
+    if failed:
+        raise RuntimeError(
+            f"{len(failed)} units failed, run again to retry: {failed[:10]}"
+        )
+
+
+def parse():
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--data_type", nargs="+", default=["trade"], choices=["trade", "bunyang"]
+    )
+    parser.add_argument("--start", required=True, action="store", help="yyyyMM")
+    parser.add_argument(
+        "--end",
+        default=(datetime.now() - relativedelta(months=1)).strftime("%Y%m"),
+        action="store",
+        help="yyyyMM, default 직전월",
+    )
+    parser.add_argument("--concurrency", default=None, type=int, action="store")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse()
+    for data_type in args.data_type:
+        backfill(
+            data_type, start=args.start, end=args.end, concurrency=args.concurrency
+        )
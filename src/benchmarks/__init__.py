@@ -0,0 +1,58 @@
+"""수집/전처리 단계별 성능 측정용 벤치마크 모음
+
+src 폴더에서 모듈로 실행한다
+    python -m benchmarks.parse_xml
+"""
+
+import time
+import tracemalloc
+
+
+def measure(func, *args, repeat: int = 5, trace_memory: bool = True, **kwargs):
+    """func을 repeat번 실행해서 소요시간과 최대 메모리 사용량을 측정
+
+    Args:
+        func: 측정할 함수
+        repeat: 반복 횟수
+        trace_memory: tracemalloc으로 최대 메모리를 측정할지 여부(측정 중에는 느려지므로 시간 측정과 분리)
+
+    Returns: {"best": 최소 소요시간(초), "mean": 평균 소요시간(초), "peak_mb": 최대 메모리(MB)}
+    """
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        elapsed.append(time.perf_counter() - start)
+
+    peak_mb = None
+    if trace_memory:
+        tracemalloc.start()
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_mb = peak / 1024**2
+    return {
+        "best": min(elapsed),
+        "mean": sum(elapsed) / len(elapsed),
+        "peak_mb": peak_mb,
+    }
+
+
+def report(results: dict, baseline: str = None):
+    """measure 결과를 표로 출력
+
+    Args:
+        results: {이름: measure 결과}
+        baseline: 속도 비교 기준이 될 results의 키
+    """
+    print(
+        f"{'name':<40}{'best(ms)':>12}{'mean(ms)':>12}{'peak(MB)':>12}{'speedup':>10}"
+    )
+    for name, res in results.items():
+        speedup = ""
+        if baseline in results:
+            speedup = f"{results[baseline]['best'] / res['best']:.1f}x"
+        peak = f"{res['peak_mb']:.1f}" if res["peak_mb"] is not None else "-"
+        print(
+            f"{name:<40}{res['best'] * 1e3:>12.1f}{res['mean'] * 1e3:>12.1f}{peak:>12}{speedup:>10}"
+        )
@@ -0,0 +1,192 @@
+"""수집 엔진 동시 요청 수 벤치마크
+mock_server.py를 별도 프로세스로 띄우고(지연, 에러 비율, 429 설정) URLConfig.URL을 mock 서버로 바꾼 뒤,
+fetch_public_api_data(아파트 실거래)와 fetch_naver_listing_data를 동시 요청 수별로 실행해서
+소요시간, 초당 요청 수, 재시도/throttle 횟수를 비교한다
+
+    python -m benchmarks.fetch                                        # concurrency 1 4 8 16 32
+    python -m benchmarks.fetch --rate_limit 25 --error_rate 0.02      # 서버의 429/500
+    python -m benchmarks.fetch --rate_limit 25 --client_rate 20       # HTTPConfig.rate_limit 조정
+"""
+
+import asyncio
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+from loguru import logger
+
+from utils import (
+    CircuitOpenError,
+    FilterConfig,
+    HTTPConfig,
+    MockServerConfig,
+    fetch_naver_listing_data,
+    fetch_public_api_data,
+    get_http_stats,
+    get_region_index,
+    reset_http_stats,
+    use_mock_server,
+)
+
+MOCK_SERVER = Path(__file__).resolve().parents[1].joinpath("mock_server.py")
+
+
+def start_server(args):
+    """mock_server.py를 띄우고 /stats가 응답할 때까지 기다림"""
+    url = f"http://{MockServerConfig.host}:{args.port}"
+    command = [
+        sys.executable,
+        str(MOCK_SERVER),
+        "--port",
+        str(args.port),
+        "--scale",
+        str(args.scale),
+    ]
+    for name in ["latency", "jitter", "error_rate", "rate_limit", "seed"]:
+        if getattr(args, name) is not None:
+            command += [f"--{name}", str(getattr(args, name))]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"mock server exited with code {process.returncode}")
+        try:
+            requests.get(f"{url}/stats", timeout=1)
+            return process, url
+        except requests.ConnectionError:
+            time.sleep(0.5)
+    process.terminate()
+    raise TimeoutError("mock server did not start")
+
+
+def fetch_trade(lawd_cds: list, months: list, concurrency: int):
+    return asyncio.run(
+        fetch_public_api_data(
+            url_key="아파트실거래",
+            serviceKey="mock",
+            lawd_cd_list=lawd_cds,
+            deal_ymd_list=months,
+            concurrency=concurrency,
+        )
+    )
+
+
+def fetch_listing(pairs: list, concurrency: int):
+    return asyncio.run(fetch_naver_listing_data(pairs, concurrency=concurrency))
+
+
+def run(func, host: str, *args):
+    """func을 실행해서 소요시간과 mock 서버 host의 요청 통계, 재시도 후에도 실패하면 error에 기록"""
+    reset_http_stats()
+    start = time.perf_counter()
+    error = None
+    try:
+        func(*args)
+    except (aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError) as e:
+        error = type(e).__name__
+    elapsed = time.perf_counter() - start
+    return {"elapsed": elapsed, "error": error, **get_http_stats().get(host, {})}
+
+
+def report_sweep(results: dict):
+    """{concurrency: run 결과}를 표로 출력"""
+    print(
+        f"{'concurrency':>12}{'elapsed(s)':>12}{'req/s':>10}{'requests':>10}{'retries':>10}{'throttled':>10}{'errors':>8}{'latency(ms)':>13}  error"
+    )
+    for concurrency, res in results.items():
+        count = res.get("requests", 0)
+        print(
+            f"{concurrency:>12}{res['elapsed']:>12.2f}{count / res['elapsed']:>10.1f}{count:>10}"
+            f"{res.get('retries', 0):>10}{res.get('throttled', 0):>10}{res.get('errors', 0):>8}"
+            f"{res.get('mean_latency', 0) * 1e3:>13.1f}  {res['error'] or ''}"
+        )
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--concurrency", nargs="+", default=[1, 4, 8, 16, 32], type=int)
+    parser.add_argument(
+        "--months",
+        nargs="+",
+        default=["202412"],
+        help="요청할 DEAL_YMD(응답은 같은 스냅샷)",
+    )
+    parser.add_argument(
+        "--complexes",
+        default=None,
+        type=int,
+        help="요청할 단지 수, default FilterConfig.apt_code 전체",
+    )
+    parser.add_argument("--port", default=MockServerConfig.port + 1, type=int)
+    parser.add_argument(
+        "--latency", default=None, type=float, help="default MockServerConfig"
+    )
+    parser.add_argument(
+        "--jitter", default=None, type=float, help="default MockServerConfig"
+    )
+    parser.add_argument(
+        "--error_rate", default=None, type=float, help="default MockServerConfig"
+    )
+    parser.add_argument(
+        "--rate_limit",
+        default=None,
+        type=float,
+        help="mock 서버의 endpoint별 초당 요청 수",
+    )
+    parser.add_argument(
+        "--client_rate",
+        default=None,
+        type=float,
+        help="mock 서버 host의 HTTPConfig.rate_limit",
+    )
+    parser.add_argument("--scale", default=1, type=int)
+    parser.add_argument("--seed", default=0, type=int)
+    args = parser.parse_args()
+
+    # 재시도마다 찍는 WARNING 로그가 표에 섞이지 않도록
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+
+    process, url = start_server(args)
+    host = urlsplit(url).netloc
+    if args.client_rate:
+        HTTPConfig.rate_limit[host] = args.client_rate
+    codes = list(FilterConfig.apt_code.values())
+    if args.complexes:
+        # 모르는 단지 코드는 mock 서버가 스냅샷 단지 중 하나로 응답
+        codes = [
+            codes[i] if i < len(codes) else f"mock{i}" for i in range(args.complexes)
+        ]
+    pairs = [
+        (code, FilterConfig.sales_code[name])
+        for code in codes
+        for name in ["매매", "전세"]
+    ]
+
+    lawd_cds = get_region_index().lawd_cd.tolist()
+
+    use_mock_server(url)
+    try:
+        print(f"fetch_public_api_data: {len(lawd_cds)} 구 x {len(args.months)} 월")
+        report_sweep(
+            {
+                c: run(fetch_trade, host, lawd_cds, args.months, c)
+                for c in args.concurrency
+            }
+        )
+        print(f"\nfetch_naver_listing_data: {len(pairs)} (단지, 거래 타입)")
+        report_sweep({c: run(fetch_listing, host, pairs, c) for c in args.concurrency})
+        print(f"\nmock server: {requests.get(f'{url}/stats', timeout=5).json()}")
+    finally:
+        use_mock_server(None)
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main()
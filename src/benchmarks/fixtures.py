@@ -0,0 +1,179 @@
+"""저장된 스냅샷으로 공공데이터 API 응답(xml)과 네이버 매물 API 응답(json)을 재현하는 fixture"""
+
+import asyncio
+import json
+import math
+import threading
+
+import pandas as pd
+from aiohttp import web
+
+from utils import (
+    APIConfig,
+    FilterConfig,
+    PathConfig,
+    prepare_dataframe,
+    render_response,
+    to_api_rows,
+    to_articles,
+)
+
+
+def load_trade_rows(
+    data_type: str = "trade", month_id: str = None, date_id: str = None
+):
+    """fixture로 사용할 스냅샷 row를 불러옴, 인자가 없으면 가장 최근 date_id"""
+    if date_id:
+        df = prepare_dataframe(data_type=data_type, month_id=month_id, date_id=date_id)
+    else:
+        df = pd.read_parquet(getattr(PathConfig, data_type), engine="pyarrow")
+        date_id = df["date_id"].astype(str).max()
+        df = df[df["date_id"].astype(str) == date_id]
+    return df.reset_index(drop=True)
+
+
+def trade_responses(
+    df: pd.DataFrame = None,
+    num_of_rows: int = APIConfig.num_of_rows,
+    data_type: str = "trade",
+):
+    """시군구코드별로 페이지를 나눈 API 응답 fixture
+
+    Returns: {(lawd_cd, month_id): [페이지별 xml 문자열]}
+    """
+    if df is None:
+        df = load_trade_rows()
+    rows = to_api_rows(df, data_type)
+    responses = {}
+    for (lawd_cd, month_id), group in rows.groupby(
+        [rows["sggCd"], df["month_id"].astype(str)]
+    ):
+        total_cnt = len(group)
+        responses[(lawd_cd, month_id)] = [
+            render_response(
+                group.iloc[(page_no - 1) * num_of_rows : page_no * num_of_rows],
+                page_no,
+                num_of_rows,
+                total_cnt,
+            )
+            for page_no in range(1, math.ceil(total_cnt / num_of_rows) + 1)
+        ]
+    return responses
+
+
+def listing_responses(
+    df: pd.DataFrame, apt_codes: dict = None, page_size: int = APIConfig.naver_page_size
+):
+    """(단지, 거래 타입)별로 페이지를 나눈 네이버 매물 API 응답 fixture
+
+    Args:
+        df: 매매/전세 스냅샷
+        apt_codes: {아파트명: 단지 코드}, default 아파트명 순서대로 붙인 가짜 코드
+
+    Returns: {(apt_code, sales_code): [페이지별 json 문자열]}
+    """
+    if apt_codes is None:
+        apt_codes = {
+            name: str(900000 + i)
+            for i, name in enumerate(sorted(df["아파트명"].astype(str).unique()))
+        }
+    responses = {}
+    for (apt_name, sales_name), group in df.groupby(
+        [df["아파트명"].astype(str), df["거래유형"].astype(str)]
+    ):
+        articles = to_articles(group)
+        pages = [
+            articles[i : i + page_size] for i in range(0, len(articles), page_size)
+        ]
+        responses[(apt_codes[apt_name], FilterConfig.sales_code[sales_name])] = [
+            json.dumps(
+                {"result": {"list": page, "totalCount": len(articles)}},
+                ensure_ascii=False,
+            )
+            for page in pages
+        ]
+    return responses
+
+
+class FixtureServer:
+    """trade_responses, listing_responses fixture를 응답하는 로컬 http 서버, with 블록 동안 별도 thread에서 실행
+    fixture에 없는 요청은 데이터가 없는 응답(totalCount 0)
+
+    Args:
+        public: trade_responses 결과, public_url로 요청(LAWD_CD, DEAL_YMD, pageNo)
+        naver: listing_responses 결과, naver_url로 요청(complexNumber, tradeTypes, page)
+
+    Examples:
+        with FixtureServer(public=trade_responses()) as server:
+            asyncio.run(fetch_public_api_data(base_url=server.public_url, serviceKey="fixture", ...))
+    """
+
+    def __init__(self, public: dict = None, naver: dict = None):
+        self.public = public or {}
+        self.naver = naver or {}
+        self.url = None
+        self._loop = None
+        self._thread = None
+        self._runner = None
+
+    @property
+    def public_url(self):
+        return f"{self.url}/public"
+
+    @property
+    def naver_url(self):
+        return f"{self.url}/naver"
+
+    async def _public(self, request: web.Request):
+        query = request.query
+        pages = self.public.get((query.get("LAWD_CD"), query.get("DEAL_YMD")))
+        page_no = int(query.get("pageNo", 1))
+        if pages and page_no <= len(pages):
+            text = pages[page_no - 1]
+        else:
+            text = render_response(
+                pd.DataFrame(),
+                page_no,
+                int(query.get("numOfRows", 10)),
+                len(pages or []),
+            )
+        return web.Response(text=text, content_type="text/xml")
+
+    async def _naver(self, request: web.Request):
+        query = request.query
+        pages = self.naver.get(
+            (query.get("complexNumber"), query.get("tradeTypes")), []
+        )
+        page = int(query.get("page", 0))
+        if page < len(pages):
+            text = pages[page]
+        else:
+            total_cnt = json.loads(pages[0])["result"]["totalCount"] if pages else 0
+            text = json.dumps({"result": {"list": [], "totalCount": total_cnt}})
+        return web.Response(text=text, content_type="application/json")
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_get("/public", self._public)
+        app.router.add_get("/naver", self._naver)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="fixture-server", daemon=True
+        )
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
@@ -0,0 +1,52 @@
+"""parse_xml 마이크로 벤치마크: BeautifulSoup + pd.read_xml(기존) vs iterparse(현재)
+
+python -m benchmarks.parse_xml
+"""
+
+from io import StringIO
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from benchmarks import measure, report
+from benchmarks.fixtures import trade_responses
+from utils import parse_public_api_xml, parse_total_count, parse_xml
+
+
+def legacy_parse(pages: list):
+    """기존 경로: sentinel을 BeautifulSoup으로 한 번, 페이지마다 BeautifulSoup + read_xml로 두 번 파싱"""
+    soup = BeautifulSoup(pages[0], "xml")
+    int(soup.totalCount.get_text())
+    result = []
+    for page in pages:
+        data = BeautifulSoup(page, "xml").find_all("items")[0].decode()
+        result.append(pd.read_xml(StringIO(data)))
+    return pd.concat(result)
+
+
+def streaming_parse(pages: list):
+    parse_total_count(pages[0])
+    return pd.concat([parse_xml(page, "items") for page in pages])
+
+
+def main():
+    responses = trade_responses()
+    pages = [page for texts in responses.values() for page in texts]
+    print(f"{len(pages)} pages, {sum(len(p) for p in pages) / 1024**2:.1f} MB")
+
+    legacy = legacy_parse(pages)
+    streaming = streaming_parse(pages)
+    assert len(legacy) == len(streaming)
+    assert parse_public_api_xml(pages[0])[0] == parse_total_count(pages[0])
+
+    report(
+        {
+            "BeautifulSoup + read_xml": measure(legacy_parse, pages, repeat=3),
+            "iterparse": measure(streaming_parse, pages, repeat=3),
+        },
+        baseline="BeautifulSoup + read_xml",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""수집 파이프라인 단계별 벤치마크
+저장된 스냅샷으로 만든 API 응답 fixture를 로컬 서버(FixtureServer)에서 응답하게 하고,
+apt_trade/bunyang_trade/listing의 main_task와 notifier가 거치는 단계를 하나씩 측정한다
+
+    실거래/분양권: fetch -> parse_xml -> convert_trade_columns -> process_trade_columns
+                  -> generate_new_trade_columns -> parquet write(+ 집계) -> notifier render
+    매매 매물: fetch -> parse_listing_json -> process_sales_column -> parquet write(+ 변경 로그, 집계) -> notifier render
+
+scale배로 (구, 월) 조합(실거래/분양권은 월을 늘림)과 단지 수(매물은 단지를 복제)를 늘려서 측정하고,
+데이터는 임시 폴더에 저장한다
+
+    python -m benchmarks.pipeline                     # 1x, 10x, 100x
+    python -m benchmarks.pipeline --scales 1 10 --repeat 5
+"""
+
+import asyncio
+import shutil
+import sys
+import tempfile
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import partial
+
+import pandas as pd
+from loguru import logger
+
+import apt_trade
+import bunyang_trade
+import listing
+import notifier
+from benchmarks import measure, report
+from benchmarks.fixtures import FixtureServer, listing_responses, trade_responses
+from utils import (
+    FilterConfig,
+    PathConfig,
+    SchemaConfig,
+    conform,
+    fetch_naver_listing_data,
+    fetch_public_api_data,
+    generate_new_trade_columns,
+    get_region_index,
+    parse_listing_json,
+    pick_partition,
+    process_sales_column,
+    read_dataset,
+    save_dataframe,
+    save_listings,
+    trade_sort_order,
+    update_sales_aggregates,
+    update_trade_aggregates,
+)
+
+TRADE_MODULES = {"trade": apt_trade, "bunyang": bunyang_trade}
+# 벤치마크 동안 임시 폴더로 바꾸는 저장 경로
+STORAGE_PATHS = ["snapshots", "deltas", "listing_log", "aggregates", "history"]
+
+
+def _prev(date_id: str):
+    return (datetime.strptime(date_id, "%Y-%m-%d") - timedelta(days=1)).strftime(
+        "%Y-%m-%d"
+    )
+
+
+def target_months(base_month: int, scale: int):
+    """base_month부터 거꾸로 scale개월(yyyyMM 문자열)"""
+    period = pd.Period(f"{str(base_month)[:4]}-{str(base_month)[4:]}", freq="M")
+    return [(period - i).strftime("%Y%m") for i in range(scale)]
+
+
+def prev_rows(df: pd.DataFrame, date_id: str, seed: int = 0):
+    """전일 데이터: 당일 row의 95%(나머지 5%는 당일 신규)"""
+    return df.sample(frac=0.95, random_state=seed).assign(date_id=_prev(date_id))
+
+
+def trade_fixture(data_type: str, months: list, date_id: str):
+    """실거래/분양권 스냅샷 한 달치를 months마다 복제해서 (응답 fixture, {month: 전일 DataFrame}, row 수)"""
+    month_id, source_date_id = pick_partition(data_type)
+    df = read_dataset(data_type, month_id=month_id, date_id=source_date_id)
+    scaled = pd.concat(
+        [df.assign(month_id=month) for month in months], ignore_index=True
+    )
+    prev = {
+        month: conform(
+            prev_rows(df, date_id, seed=i).assign(month_id=int(month)), data_type
+        )
+        for i, month in enumerate(months)
+    }
+    return trade_responses(scaled, data_type=data_type), prev, len(scaled)
+
+
+def listing_fixture(scale: int, date_id: str):
+    """매매 스냅샷의 단지를 scale배로 복제(아파트명 뒤에 번호)해서 (응답 fixture, 전일 DataFrame, row 수)"""
+    _, source_date_id = pick_partition("sales")
+    df = read_dataset("sales", date_id=source_date_id)
+    df = df[df["거래유형"] == "매매"]
+    scaled = pd.concat(
+        [
+            df.assign(아파트명=df["아파트명"].astype(str) + (str(i) if i else ""))
+            for i in range(scale)
+        ],
+        ignore_index=True,
+    )
+    prev = prev_rows(scaled, date_id)
+    return listing_responses(scaled), prev, len(scaled)
+
+
+def fetch_trade(server: FixtureServer, months: list, concurrency: int = None):
+    return asyncio.run(
+        fetch_public_api_data(
+            base_url=server.public_url,
+            serviceKey="fixture",
+            lawd_cd_list=get_region_index().lawd_cd.tolist(),
+            deal_ymd_list=months,
+            concurrency=concurrency,
+        )
+    )
+
+
+def parse_trade(module, pages: dict):
+    """월별로 module._parse, {month: {lawd_cd: 페이지별 DataFrame 리스트}}"""
+    by_month = {}
+    for (lawd_cd, deal_ymd), texts in pages.items():
+        by_month.setdefault(str(deal_ymd), {})[(lawd_cd, deal_ymd)] = texts
+    return {
+        month: module._parse(month_pages) for month, month_pages in by_month.items()
+    }
+
+
+def convert_trade(module, date_id: str, parsed: dict):
+    return {
+        month: module.convert(
+            [df for dfs in frames.values() for df in dfs if len(df)], month, date_id
+        )
+        for month, frames in parsed.items()
+    }
+
+
+def process_trade(module, converted: dict):
+    return {month: module.process(df) for month, df in converted.items()}
+
+
+def generate_trade(data_type: str, date_id: str, prev: dict, processed: dict):
+    """update_trade_snapshot의 신규거래 계산과 정렬"""
+    result = {}
+    for month, cur in processed.items():
+        df = conform(
+            generate_new_trade_columns(pd.concat([prev[month], cur]), date_id=date_id),
+            data_type,
+        )
+        result[month] = df.take(trade_sort_order(df)).reset_index(drop=True)
+    return result
+
+
+def write_trade(data_type: str, date_id: str, generated: dict):
+    """main_task의 저장 부분"""
+    for month, df in generated.items():
+        df = df[list(SchemaConfig.trade.keys())].astype(SchemaConfig.trade)
+        save_dataframe(df, data_type=data_type, month_id=month, date_id=date_id)
+        update_trade_aggregates(data_type, df, month_id=month, date_id=date_id)
+
+
+def render_trade(months: list, date_id: str):
+    """notify_trade의 메세지 생성(전송 제외)"""
+    return [
+        (
+            notifier.daily_aggregation(
+                month, date_id=date_id, sgg_contains=FilterConfig.sgg_contains
+            ),
+            notifier.daily_new_trade(
+                month, date_id=date_id, apt_contains=FilterConfig.apt_contains
+            ),
+        )
+        for month in months
+    ]
+
+
+def fetch_listing(server: FixtureServer, concurrency: int = None):
+    return asyncio.run(
+        fetch_naver_listing_data(
+            list(server.naver), base_url=server.naver_url, concurrency=concurrency
+        )
+    )
+
+
+def parse_listing(pages: dict):
+    return parse_listing_json(
+        [page for texts in pages.values() for page in texts],
+        price_key=FilterConfig.price_code["매매"],
+    )
+
+
+def process_listing(date_id: str, concat: pd.DataFrame):
+    """listing.main_task의 전처리 부분"""
+    reverse_sales_code = {v: k for k, v in FilterConfig.sales_code.items()}
+    concat = concat.assign(date_id=date_id)
+    concat["거래유형"] = concat["거래유형"].map(reverse_sales_code)
+    return process_sales_column(concat)
+
+
+def write_listing(date_id: str, df: pd.DataFrame):
+    save_listings(df, data_type=listing.DATA_TYPE["매매"], date_id=date_id)
+    update_sales_aggregates(listing.DATA_TYPE["매매"], df, date_id=date_id)
+
+
+def run_stages(stages: list, repeat: int):
+    """stage마다 이전 stage의 결과를 입력으로 측정, stages: [(이름, 입력 하나를 받는 함수)]"""
+    results, value = {}, None
+    for name, func in stages:
+        results[name] = measure(func, value, repeat=repeat)
+        value = func(value)
+    return results
+
+
+@contextmanager
+def temp_storage():
+    """with 블록 동안 저장 경로(STORAGE_PATHS)를 임시 폴더로 바꾸고, 끝나면 원래 경로로 되돌리고 삭제"""
+    saved = {attr: getattr(PathConfig, attr) for attr in STORAGE_PATHS}
+    tmp = tempfile.mkdtemp()
+    try:
+        for attr in STORAGE_PATHS:
+            setattr(PathConfig, attr, f"{tmp}/{attr}")
+        yield tmp
+    finally:
+        for attr, path in saved.items():
+            setattr(PathConfig, attr, path)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def bench_trade(scale: int, date_id: str, repeat: int, concurrency: int = None):
+    months = target_months(pick_partition("trade")[0], scale)
+    fixtures = {
+        data_type: trade_fixture(data_type, months, date_id)
+        for data_type in TRADE_MODULES
+    }
+    with temp_storage():
+        for data_type, (_, prev, _) in fixtures.items():
+            write_trade(data_type, _prev(date_id), prev)
+
+        with FixtureServer() as server:
+            for data_type, module in TRADE_MODULES.items():
+                responses, prev, rows = fixtures[data_type]
+                # 실거래/분양권 fixture가 같은 (구, 월) 키를 쓰므로 data_type마다 서버의 응답을 교체
+                server.public = responses
+                print(f"\n{data_type} x{scale}: {len(responses)} (구, 월), {rows} rows")
+                stages = [
+                    ("fetch", lambda _: fetch_trade(server, months, concurrency)),
+                    ("parse_xml", partial(parse_trade, module)),
+                    ("convert_trade_columns", partial(convert_trade, module, date_id)),
+                    ("process_trade_columns", partial(process_trade, module)),
+                    (
+                        "generate_new_trade_columns",
+                        partial(generate_trade, data_type, date_id, prev),
+                    ),
+                    ("parquet write", partial(write_trade, data_type, date_id)),
+                ]
+                report(run_stages(stages, repeat))
+
+        print(f"\nnotifier trade x{scale}: {len(months)} months")
+        report({"render": measure(render_trade, months, date_id, repeat=repeat)})
+
+
+def bench_listing(scale: int, date_id: str, repeat: int, concurrency: int = None):
+    responses, prev, rows = listing_fixture(scale, date_id)
+    with temp_storage():
+        write_listing(_prev(date_id), prev)
+        with FixtureServer(naver=responses) as server:
+            print(f"\nsales x{scale}: {len(responses)} (단지, 거래 타입), {rows} rows")
+            stages = [
+                ("fetch", lambda _: fetch_listing(server, concurrency)),
+                ("parse_listing_json", parse_listing),
+                ("process_sales_column", partial(process_listing, date_id)),
+                ("parquet write", partial(write_listing, date_id)),
+                ("notifier render", lambda _: notifier.sales_aggregation(date_id)),
+            ]
+            report(run_stages(stages, repeat))
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--scales", nargs="+", default=[1, 10, 100], type=int)
+    parser.add_argument(
+        "--repeat",
+        default=3,
+        type=int,
+        help="1x 기준 반복 횟수, scale배에서는 repeat // scale(최소 1)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        default=None,
+        type=int,
+        help="fetch 동시 요청 수, default APIConfig",
+    )
+    parser.add_argument(
+        "--date_id", default="2024-12-13", help="수집 날짜로 사용할 date_id"
+    )
+    args = parser.parse_args()
+
+    # 단계마다 찍는 INFO 로그가 측정에 섞이지 않도록
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    for scale in args.scales:
+        repeat = max(1, args.repeat // scale)
+        bench_trade(scale, args.date_id, repeat, concurrency=args.concurrency)
+        bench_listing(scale, args.date_id, repeat, concurrency=args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
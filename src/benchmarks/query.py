@@ -0,0 +1,205 @@
+"""notifier 집계 벤치마크
+daily_aggregation(실거래 + 분양권 시군구별 거래수)과 sales_aggregation(매매 매물 가격 통계)의 집계 부분을
+기존 pandas 구현(스냅샷 전체를 DataFrame으로 읽고 groupby), materialized 집계(utils/aggregates.py),
+duckdb 쿼리(utils/query.py)로 비교한다. 모두 date_id와 전일 두 날짜를 집계
+
+    python -m benchmarks.query                      # 가장 최근 date_id
+    python -m benchmarks.query --date_id 2024-12-13
+    python -m benchmarks.query --check              # 세 구현의 집계 결과가 같은지 확인
+"""
+
+import shutil
+import tempfile
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from benchmarks import measure, report
+from utils import (
+    PathConfig,
+    get_sales_aggregates,
+    get_trade_aggregates,
+    list_partitions,
+    read_dataset,
+    refresh_views,
+    sales_summary,
+    trade_counts,
+)
+
+TRADE_COLUMNS = ["시군구코드", "거래수", "해지수", "신규수"]
+SALES_COLUMNS = ["아파트명", "면적구분", "평균", "중앙", "최대", "최저", "매물수"]
+
+
+def _prev(date_id: str):
+    return (datetime.strptime(date_id, "%Y-%m-%d") - timedelta(days=1)).strftime(
+        "%Y-%m-%d"
+    )
+
+
+def _prepare(**kwargs):
+    """snapshot 모드의 prepare_dataframe, 데이터가 없는 파티션(전일 분양권 등)에서 로그 알림을 보내지 않음"""
+    return read_dataset(**kwargs)
+
+
+def legacy_trade(month_id: int, date_id: str):
+    """변경 이전 daily_aggregation의 집계 부분, 날짜마다 실거래/분양권 전체를 읽어서 concat 후 groupby"""
+    df = pd.concat(
+        [
+            _prepare(data_type=data_type, month_id=month_id, date_id=date_id)
+            for data_type in ["trade", "bunyang"]
+        ]
+    )
+    if len(df) == 0:
+        return pd.DataFrame(columns=TRADE_COLUMNS)
+    agg = (
+        df.groupby(df["시군구코드"].astype(str))[["계약일", "계약해지여부", "신규거래"]]
+        .count()
+        .reset_index()
+    )
+    agg.columns = TRADE_COLUMNS
+    return agg
+
+
+def legacy_sales(date_id: str):
+    """변경 이전 sales_aggregation의 집계 부분, 매매 전체를 읽어서 groupby"""
+    df = _prepare(data_type="sales", date_id=date_id)
+    if len(df) == 0:
+        return pd.DataFrame(columns=SALES_COLUMNS)
+    data = df[
+        df["확인날짜"] >= datetime.strptime(date_id, "%Y-%m-%d") - timedelta(days=28)
+    ]
+    agg = (
+        data.groupby([data["아파트명"].astype(str), data["면적구분"].astype(str)])[
+            "가격"
+        ]
+        .agg(["mean", "median", "max", "min", "count"])
+        .reset_index()
+    )
+    agg.columns = SALES_COLUMNS
+    return agg
+
+
+def materialized_trade(month_id: int, date_id: str):
+    """notifier의 _trade_aggregates"""
+    agg = pd.concat(
+        [
+            get_trade_aggregates(data_type, month_id=month_id, date_id=date_id)
+            for data_type in ["trade", "bunyang"]
+        ]
+    )
+    if len(agg) == 0:
+        return pd.DataFrame(columns=TRADE_COLUMNS)
+    return (
+        agg.groupby(agg["시군구코드"].astype(str))[TRADE_COLUMNS[1:]]
+        .sum()
+        .reset_index()
+    )
+
+
+def run(func, dates: list, *args):
+    return [func(*args, date_id) for date_id in dates]
+
+
+def run_cold(func, dates: list, *args):
+    """집계 파일이 없는 상태(처음 알림을 보낼 때)에서 materialized 집계"""
+    shutil.rmtree(PathConfig.aggregates, ignore_errors=True)
+    return run(func, dates, *args)
+
+
+def _normalize(df: pd.DataFrame, keys: list):
+    df = df.astype({key: str for key in keys}).sort_values(keys).reset_index(drop=True)
+    return df.astype({col: "float64" for col in df.columns if col not in keys})[
+        list(df.columns)
+    ]
+
+
+def check(month_id: int, dates: list):
+    for date_id in dates:
+        expected = _normalize(legacy_trade(month_id, date_id), ["시군구코드"])
+        for _, result in [
+            ("materialized", materialized_trade(month_id, date_id)),
+            ("sql", trade_counts(month_id, date_id)),
+        ]:
+            pd.testing.assert_frame_equal(
+                expected, _normalize(result[TRADE_COLUMNS], ["시군구코드"])
+            )
+        print(f"trade {month_id} {date_id}: identical ({len(expected)} 시군구)")
+
+        expected = _normalize(legacy_sales(date_id), ["아파트명", "면적구분"])
+        for _, result in [
+            ("materialized", get_sales_aggregates("sales", date_id=date_id)),
+            ("sql", sales_summary(date_id)),
+        ]:
+            pd.testing.assert_frame_equal(
+                expected, _normalize(result[SALES_COLUMNS], ["아파트명", "면적구분"])
+            )
+        print(f"sales {date_id}: identical ({len(expected)} rows)")
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--date_id", default=None, help="default: 저장된 가장 최근 실거래 date_id"
+    )
+    parser.add_argument("--check", default=False, action="store_true")
+    parser.add_argument("--repeat", default=5, type=int)
+    args = parser.parse_args()
+
+    partitions = sorted(
+        (keys["date_id"], int(keys["month_id"])) for _, keys in list_partitions("trade")
+    )
+    date_id = args.date_id or partitions[-1][0]
+    month_id = max(month for d, month in partitions if d == date_id)
+    dates = [date_id, _prev(date_id)]
+
+    # 저장된 집계를 덮어쓰지 않도록 임시 폴더에 materialize
+    PathConfig.aggregates = tempfile.mkdtemp()
+    refresh_views()
+    try:
+        if args.check:
+            check(month_id, dates)
+            return
+
+        print(f"daily_aggregation {month_id} {dates}")
+        report(
+            {
+                "legacy read + groupby": measure(
+                    run, legacy_trade, dates, month_id, repeat=args.repeat
+                ),
+                "materialized (cold)": measure(
+                    run_cold, materialized_trade, dates, month_id, repeat=args.repeat
+                ),
+                "materialized (warm)": measure(
+                    run, materialized_trade, dates, month_id, repeat=args.repeat
+                ),
+                "duckdb trade_counts": measure(
+                    run, trade_counts, dates, month_id, repeat=args.repeat
+                ),
+            },
+            baseline="legacy read + groupby",
+        )
+        print(f"\nsales_aggregation {dates}")
+        report(
+            {
+                "legacy read + groupby": measure(
+                    run, legacy_sales, dates, repeat=args.repeat
+                ),
+                "materialized (cold)": measure(
+                    run_cold, get_sales_aggregates, dates, "sales", repeat=args.repeat
+                ),
+                "materialized (warm)": measure(
+                    run, get_sales_aggregates, dates, "sales", repeat=args.repeat
+                ),
+                "duckdb sales_summary": measure(
+                    run, sales_summary, dates, repeat=args.repeat
+                ),
+            },
+            baseline="legacy read + groupby",
+        )
+    finally:
+        shutil.rmtree(PathConfig.aggregates, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
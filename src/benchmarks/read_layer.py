@@ -0,0 +1,122 @@
+"""prepare_dataframe 읽기 벤치마크
+notifier/analysis 한 번 실행에서 일어나는 읽기 순서를 그대로 재현해서
+기존 구현(호출마다 pd.read_parquet로 전체 파티션 탐색)과 캐시된 dataset 읽기를 비교한다
+
+    python -m benchmarks.read_layer
+"""
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from benchmarks import measure, report
+from utils import PathConfig, get_funcname, prepare_dataframe
+from utils import dataset
+
+
+def legacy_prepare_dataframe(
+    data_type: str = None, date_id: str = None, month_id: str = None
+):
+    """변경 이전 prepare_dataframe(빈 결과 시 telegram 전송은 제외)"""
+    get_funcname(stack_index=2)
+    fpath = str(getattr(PathConfig, data_type))
+    filters = []
+    if date_id:
+        filters.append(("date_id", "=", date_id))
+    if month_id:
+        if isinstance(month_id, str):
+            month_id = int(month_id.replace("-", ""))
+        filters.append(("month_id", "=", month_id))
+    if filters:
+        return pd.read_parquet(fpath, engine="pyarrow", filters=filters)
+    return pd.read_parquet(fpath, engine="pyarrow")
+
+
+def notifier_reads(date_id: str, months: list):
+    """notifier.py 한 번 실행에서의 (data_type, month_id, date_id) 읽기 순서"""
+    prev_date_id = (
+        datetime.strptime(date_id, "%Y-%m-%d") - timedelta(days=1)
+    ).strftime("%Y-%m-%d")
+    reads = []
+    for month in months:
+        # daily_aggregation
+        reads += [("trade", month, date_id), ("bunyang", month, date_id)]
+        reads += [("trade", month, prev_date_id), ("bunyang", month, prev_date_id)]
+    for month in months:
+        # daily_new_trade
+        reads += [("trade", month, date_id), ("bunyang", month, date_id)]
+    # sales_aggregation
+    reads += [("sales", None, date_id), ("sales", None, prev_date_id)]
+    return reads
+
+
+def analysis_reads():
+    """analysis.py 한 번 실행에서의 읽기 순서(sales/rent x agg_type 4개)"""
+    return [
+        (sales_type, None, None) for sales_type in ["sales", "rent"] for _ in range(4)
+    ]
+
+
+def run(reader, reads: list):
+    for data_type, month_id, date_id in reads:
+        reader(data_type=data_type, month_id=month_id, date_id=date_id)
+
+
+def cold_run(reads: list):
+    """새 프로세스처럼 캐시를 비우고 실행"""
+    dataset.invalidate()
+    dataset._TABLES.clear()
+    run(prepare_dataframe, reads)
+
+
+def latest_complete_reads():
+    """저장된 데이터에서 notifier 읽기가 모두 존재하는 가장 최근 date_id로 읽기 순서를 만든다"""
+    stored = {
+        (data_type, keys.get("month_id"), keys["date_id"])
+        for data_type in ["trade", "bunyang", "sales"]
+        for _, keys in dataset.list_partitions(data_type)
+    }
+    for date_id in sorted({d for _, _, d in stored}, reverse=True):
+        month = int(date_id[:7].replace("-", ""))
+        last_month = int(
+            (datetime.strptime(date_id[:7], "%Y-%m") - timedelta(days=1)).strftime(
+                "%Y%m"
+            )
+        )
+        reads = notifier_reads(date_id, [last_month, month])
+        if all(read in stored for read in reads):
+            return reads
+    raise ValueError("no date_id with complete trade/bunyang/sales partitions")
+
+
+def main():
+    reads = latest_complete_reads()
+    print(f"notifier: {len(reads)} reads")
+    report(
+        {
+            "legacy prepare_dataframe": measure(
+                run, legacy_prepare_dataframe, reads, repeat=3, trace_memory=False
+            ),
+            "prepare_dataframe (per process)": measure(
+                cold_run, reads, repeat=3, trace_memory=False
+            ),
+        },
+        baseline="legacy prepare_dataframe",
+    )
+    reads = analysis_reads()
+    print(f"analysis: {len(reads)} reads")
+    report(
+        {
+            "legacy prepare_dataframe": measure(
+                run, legacy_prepare_dataframe, reads, repeat=3, trace_memory=False
+            ),
+            "prepare_dataframe (per process)": measure(
+                cold_run, reads, repeat=3, trace_memory=False
+            ),
+        },
+        baseline="legacy prepare_dataframe",
+    )
+
+
+if __name__ == "__main__":
+    main()
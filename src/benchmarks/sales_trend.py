@@ -0,0 +1,151 @@
+"""analysis.py 매물 추이 그래프 벤치마크
+기존 구현(그래프마다 전체 데이터를 읽고 row 단위로 전처리, 8번)과
+sales_name별로 한 번 읽고 한 번의 groupby로 집계하는 render_trends를 비교한다
+
+    python -m benchmarks.sales_trend            # 집계만 비교
+    python -m benchmarks.sales_trend --draw     # 그래프 저장까지 비교(matplotlib 필요)
+    python -m benchmarks.sales_trend --check    # 집계 결과가 같은지 확인
+"""
+
+import importlib.util
+import os
+import tempfile
+from argparse import ArgumentParser
+from copy import deepcopy
+
+import numpy as np
+import pandas as pd
+
+import analysis
+from benchmarks import measure, report
+from utils import PathConfig, prepare_dataframe
+
+APT_NAMES = [
+    "헬리오시티",
+    "파크리오",
+    "마포래미안푸르지오",
+    "더클래시",
+    "올림픽파크포레온",
+]
+SALES_NAMES = ["sales", "rent"]
+AGG_TYPES = ["mean", "median", "min", "count"]
+
+
+def legacy_prep(df, apt_names, agg_type):
+    """변경 이전 _sales_trend_prep"""
+    data = deepcopy(df)
+    data["price_range"] = data["가격"].apply(lambda x: int(x / 1e8))
+    data = data[data["면적구분"] == "84"]
+    data["date_id"] = data["date_id"].astype(str)
+    data["기준확인일"] = pd.to_datetime(data["date_id"]) - pd.Timedelta(days=28)
+    data["유효매물"] = np.where(data["확인날짜"] >= data["기준확인일"], True, False)
+    data = data[data["유효매물"]]
+    data = data[data["아파트명"].isin(apt_names)]
+
+    trend = (
+        data.groupby(["아파트명", "date_id"])
+        .agg({"가격": ["mean", "median", "max", "min", "count"]})
+        .reset_index()
+    )
+    trend.columns = ["아파트명", "date_id", "평균", "중앙", "최대", "최저", "매물수"]
+    trend = trend.sort_values(
+        ["date_id", analysis.agg_type_converter[agg_type]], ascending=[True, False]
+    )
+    return trend, trend["아파트명"].drop_duplicates().to_list()
+
+
+def legacy_draw(data, sorted_apt_names, agg_type, sales_name):
+    """변경 이전 sales_trend의 그래프 부분(figure를 닫지 않음)"""
+    analysis.setup_font()
+    from matplotlib import pyplot as plt
+
+    converted_agg_type = analysis.agg_type_converter[agg_type]
+    fig, ax = plt.subplots()
+    ax.set_title(
+        f"아파트별 {analysis.SALES_KO_MAP[sales_name]} 매물 추이({converted_agg_type})"
+    )
+    plt.xticks(rotation=90)
+    for apt_name in sorted_apt_names:
+        panel = data[data["아파트명"] == apt_name]
+        ax.plot(panel["date_id"], panel[converted_agg_type], marker="o", alpha=0.5)
+    ax.grid()
+    ax.legend(sorted_apt_names, framealpha=0.3, loc="right")
+    plt.savefig(os.path.join(PathConfig.graph, f"{sales_name}_trend_{agg_type}.png"))
+
+
+def legacy(draw: bool = False):
+    for sales_name in SALES_NAMES:
+        for agg_type in AGG_TYPES:
+            df = prepare_dataframe(data_type=sales_name)
+            data, sorted_apt_names = legacy_prep(df, APT_NAMES, agg_type)
+            if draw:
+                legacy_draw(data, sorted_apt_names, agg_type, sales_name)
+
+
+def current(draw: bool = False, processes: int = None):
+    if draw:
+        return analysis.render_trends(None, APT_NAMES, processes=processes)
+    return [
+        analysis.sales_trend_data(sales_name, APT_NAMES) for sales_name in SALES_NAMES
+    ]
+
+
+def check():
+    """agg_type마다 기존 집계/정렬 결과와 같은지 확인"""
+    for sales_name in SALES_NAMES:
+        df = prepare_dataframe(data_type=sales_name)
+        trend = analysis.sales_trend_data(sales_name, APT_NAMES)
+        for agg_type in AGG_TYPES:
+            expected, expected_names = legacy_prep(df, APT_NAMES, agg_type)
+            converted = analysis.agg_type_converter[agg_type]
+            result = trend.sort_values(["date_id", converted], ascending=[True, False])
+            expected = expected.assign(아파트명=expected["아파트명"].astype(str))
+            pd.testing.assert_frame_equal(
+                expected.reset_index(drop=True),
+                result.reset_index(drop=True),
+                check_dtype=False,
+            )
+            assert expected_names == result["아파트명"].drop_duplicates().to_list()
+        print(f"{sales_name}: {len(AGG_TYPES)} agg types identical ({len(trend)} rows)")
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--draw", default=False, action="store_true")
+    parser.add_argument("--check", default=False, action="store_true")
+    parser.add_argument("--processes", default=4, type=int)
+    parser.add_argument("--repeat", default=3, type=int)
+    args = parser.parse_args()
+
+    if args.check:
+        check()
+        return
+    if args.draw and importlib.util.find_spec("matplotlib") is None:
+        parser.error(
+            "--draw requires matplotlib, run without --draw to compare the aggregation only"
+        )
+
+    if args.draw:
+        # 저장된 그래프를 덮어쓰지 않도록 임시 폴더에 저장
+        PathConfig.graph = tempfile.mkdtemp()
+    results = {
+        "legacy 8x read + prep": measure(
+            legacy, draw=args.draw, repeat=args.repeat, trace_memory=False
+        ),
+        "render_trends": measure(
+            current, draw=args.draw, repeat=args.repeat, trace_memory=False
+        ),
+    }
+    if args.draw:
+        results[f"render_trends processes={args.processes}"] = measure(
+            current,
+            draw=True,
+            processes=args.processes,
+            repeat=args.repeat,
+            trace_memory=False,
+        )
+    report(results, baseline="legacy 8x read + prep")
+
+
+if __name__ == "__main__":
+    main()
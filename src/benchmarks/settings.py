@@ -0,0 +1,75 @@
+"""환경변수 로딩 벤치마크
+기존 load_env(매 호출마다 repo 전체 os.walk + load_dotenv)와 Settings(한 번 읽고 메모이즈)를 비교한다
+repo root에 임시 env 파일을 만들었다가 측정 후 삭제한다
+
+    python -m benchmarks.settings
+"""
+
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from benchmarks import measure, report
+from utils import PathConfig, Settings
+
+FNAME = ".env.benchmark"
+KEY = "BENCHMARK_API_KEY"
+
+
+def legacy_find_file(fname: str, start_path: str = None):
+    """변경 이전 find_file(가지치기 없는 os.walk)"""
+    if not start_path:
+        start_path = PathConfig.root
+    paths = []
+    for current_path, _, file_list in os.walk(start_path):
+        if fname in file_list:
+            paths.append(os.path.join(current_path, fname))
+    return paths[0] if len(paths) == 1 else paths
+
+
+def legacy_load_env(key: str, fname: str = ".env", start_path: str = None):
+    """변경 이전 load_env"""
+    load_dotenv(legacy_find_file(fname, start_path=start_path))
+    return os.getenv(key, None)
+
+
+def main(calls: int = 100):
+    path = Path(PathConfig.root, FNAME)
+    path.write_text(f"{KEY}=benchmark\n")
+    try:
+        settings = Settings(fname=FNAME)
+
+        def per_call_legacy():
+            for _ in range(calls):
+                legacy_load_env(KEY, FNAME)
+            os.environ.pop(KEY, None)
+
+        def per_call_settings():
+            for _ in range(calls):
+                settings.get(KEY)
+
+        def startup():
+            Settings(fname=FNAME).get(KEY)
+
+        print(f"{calls} lookups")
+        report(
+            {
+                "legacy load_env": measure(
+                    per_call_legacy, repeat=3, trace_memory=False
+                ),
+                "Settings.get (memoized)": measure(
+                    per_call_settings, repeat=3, trace_memory=False
+                ),
+                "Settings startup (1st lookup)": measure(
+                    startup, repeat=3, trace_memory=False
+                ),
+            },
+            baseline="legacy load_env",
+        )
+    finally:
+        path.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""analysis.py 시작 비용 벤치마크
+매 실행마다 새 프로세스에서 import하는 cron 실행을 그대로 재현해서
+기존 import 시점 폰트 설정(시스템 폰트 전체 탐색, matplotlib 캐시 삭제 후 재생성)과
+import만 하는 경우, 저장된 폰트 경로로 setup_font를 실행하는 경우를 비교한다
+
+    python -m benchmarks.startup
+
+matplotlib이 없으면 import만 하는 경우만 측정하고, 폰트 설정 단계는 건너뛴다고 출력한다
+"""
+
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+from argparse import ArgumentParser
+
+from benchmarks import measure, report
+from utils import PathConfig
+
+# 변경 이전 analysis.py의 import 시점 폰트 설정(폰트 파일 복사는 제외)
+LEGACY_SETUP = """
+import utils
+import shutil, os
+import matplotlib as mpl
+from matplotlib import pyplot as plt
+from matplotlib import font_manager as fm
+font_list = fm.findSystemFonts(fontpaths=None, fontext="ttf")
+font_path = [f for f in font_list if "NanumGothic.ttf" in f][0]
+font_name = fm.FontProperties(fname=font_path, size=10).get_name()
+shutil.rmtree(mpl.get_cachedir())
+plt.rc("font", family=font_name)
+"""
+
+
+def run(code: str, fresh_cache: bool = False):
+    """새 python 프로세스에서 code 실행, fresh_cache면 비어있는 matplotlib 캐시 폴더 사용"""
+    env = dict(os.environ)
+    with tempfile.TemporaryDirectory() as tmp:
+        if fresh_cache:
+            # 기존 구현은 매 실행마다 캐시를 지우므로 빈 캐시에서 시작하는 것과 같음
+            env["MPLCONFIGDIR"] = tmp
+        subprocess.run(
+            [sys.executable, "-c", code], cwd=PathConfig.src, env=env, check=True
+        )
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--repeat", default=3, type=int)
+    args = parser.parse_args()
+
+    results = {
+        "import utils": measure(
+            run, "import utils", repeat=args.repeat, trace_memory=False
+        ),
+    }
+    if importlib.util.find_spec("matplotlib") is None:
+        results["import analysis"] = measure(
+            run, "import analysis", repeat=args.repeat, trace_memory=False
+        )
+        report(results)
+        print(
+            "skipped legacy import analysis, import analysis + setup_font: matplotlib is not installed"
+        )
+        return
+
+    # 폰트 경로를 metastore에 저장해두고 측정
+    run("import analysis; analysis.setup_font()")
+    results["legacy import analysis"] = measure(
+        run, LEGACY_SETUP, fresh_cache=True, repeat=args.repeat, trace_memory=False
+    )
+    results["import analysis"] = measure(
+        run, "import analysis", repeat=args.repeat, trace_memory=False
+    )
+    results["import analysis + setup_font"] = measure(
+        run,
+        "import analysis; analysis.setup_font()",
+        repeat=args.repeat,
+        trace_memory=False,
+    )
+    report(results, baseline="legacy import analysis")
+
+
+if __name__ == "__main__":
+    main()
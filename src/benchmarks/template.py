@@ -0,0 +1,146 @@
+"""DAILY_DIFFERENCE 메세지 렌더링 벤치마크
+기존 구현(pandas apply로 평/억 문자열 변환 후 호출마다 Template 컴파일)과
+컴파일된 TelegramTemplate + 템플릿 필터를 큰 payload로 비교한다
+
+    python -m benchmarks.template --rows 100000
+    python -m benchmarks.template --check     # 기존 메세지와 내용이 같은지 확인
+"""
+
+import re
+from argparse import ArgumentParser
+from textwrap import dedent
+
+import numpy as np
+import pandas as pd
+from jinja2 import Template
+
+from benchmarks import measure, report
+from benchmarks.fixtures import load_trade_rows
+from utils import TelegramTemplate
+
+COLUMNS = [
+    "아파트명",
+    "시군구코드",
+    "법정동",
+    "계약일",
+    "전용면적",
+    "층",
+    "거래금액",
+    "거래유형",
+]
+
+# 변경 이전 DAILY_DIFFERENCE(row의 모든 값을 그대로 출력)
+LEGACY_DAILY_DIFFERENCE = dedent(
+    """
+⭐ {{ date_id }}일 기준 실거래 상세 현황
+* {{ month }}월 거래분
+{%- if len(data) == 0 %}
+없음{% else %}
+{%- for row in data %}
+{%- for k, v in row.items() %}
+{% if loop.first %} 🏠 [{{ v }}]
+{%- else %}  - {{ k }}: {{ v }}
+{%- endif %}
+{%- endfor %}
+
+{% endfor %}
+{% endif %}
+"""
+)
+
+
+def legacy_render(df: pd.DataFrame, month: str, date_id: str):
+    """변경 이전 daily_new_trade의 포맷/렌더링 부분"""
+    df = df.copy()
+    df["전용면적"] = df["전용면적"].apply(lambda x: f"{int(x)}({int((x / 3.3) + 7)}평)")
+    labels = {x: f"{round(int(x) / 1e4, 2)}억" for x in df["거래금액"].unique()}
+    df["거래금액"] = df["거래금액"].map(labels)
+    df["계약일"] = df["계약일"].dt.strftime("%Y-%m-%d")
+    data = df[COLUMNS].to_dict(orient="records")
+    return Template(LEGACY_DAILY_DIFFERENCE).render(
+        month=month, date_id=date_id, data=data, len=len
+    )
+
+
+def render(df: pd.DataFrame, month: str, date_id: str):
+    """현재 daily_new_trade의 포맷/렌더링 부분"""
+    df = df.copy()
+    df["계약일"] = df["계약일"].dt.strftime("%Y-%m-%d")
+    data = df[COLUMNS].to_dict(orient="records")
+    return TelegramTemplate.render(
+        "DAILY_DIFFERENCE", month=month, date_id=date_id, data=data
+    )
+
+
+def synthetic_rows(n_rows: int, seed: int = 0):
+    """저장된 스냅샷에서 row를 복원추출해서 n_rows 크기의 payload 생성"""
+    snapshot = load_trade_rows("trade", month_id="202412", date_id="2024-12-13")[
+        COLUMNS
+    ]
+    rng = np.random.default_rng(seed)
+    return snapshot.iloc[rng.integers(0, len(snapshot), n_rows)].reset_index(drop=True)
+
+
+def normalize(message: str):
+    """의도한 변경을 되돌려서 비교할 수 있게 만든 (header, 정렬된 row 블록 리스트)
+    - 거래금액은 소수점 두 자리(18.0억 -> 18.00억)
+    - row는 문자열 전용면적 대신 숫자 전용면적으로 정렬하므로 순서를 무시
+    """
+    message = re.sub(r"(\d+\.\d)억", r"\g<1>0억", message)
+    header, *rows = message.split("\n 🏠 ")
+    return header, sorted(row.strip() for row in rows)
+
+
+def check(n_rows: int):
+    """n_rows payload의 기존/현재 메세지가 normalize 후 같은지 확인"""
+    df = synthetic_rows(n_rows)
+    legacy = normalize(legacy_render(df, month="2024-12", date_id="2024-12-13"))
+    current = normalize(render(df, month="2024-12", date_id="2024-12-13"))
+    assert legacy == current, f"{n_rows} rows: messages differ"
+    empty = df.iloc[:0]
+    assert normalize(legacy_render(empty, "2024-12", "2024-12-13")) == normalize(
+        render(empty, "2024-12", "2024-12-13")
+    )
+    print(f"{n_rows} rows: identical ({len(current[1])} rows)")
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--rows", nargs="+", default=[100, 10_000, 100_000], type=int)
+    parser.add_argument("--repeat", default=3, type=int)
+    parser.add_argument("--check", default=False, action="store_true")
+    args = parser.parse_args()
+
+    if args.check:
+        for n_rows in args.rows:
+            check(n_rows)
+        return
+
+    for n_rows in args.rows:
+        df = synthetic_rows(n_rows)
+        legacy = legacy_render(df, month="2024-12", date_id="2024-12-13")
+        current = render(df, month="2024-12", date_id="2024-12-13")
+        print(f"{n_rows} rows, message {len(legacy)} -> {len(current)} chars")
+        report(
+            {
+                "legacy apply + Template": measure(
+                    legacy_render,
+                    df,
+                    month="2024-12",
+                    date_id="2024-12-13",
+                    repeat=args.repeat,
+                ),
+                "compiled template + filters": measure(
+                    render,
+                    df,
+                    month="2024-12",
+                    date_id="2024-12-13",
+                    repeat=args.repeat,
+                ),
+            },
+            baseline="legacy apply + Template",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""process_trade_columns / generate_new_trade_columns 벤치마크
+기존 row 단위 구현과 현재 벡터화 구현을 비교하고, 저장된 스냅샷에서 결과가 같은지 확인한다
+
+    python -m benchmarks.trade_columns --rows 1000000
+    python -m benchmarks.trade_columns --check
+"""
+
+from argparse import ArgumentParser
+from copy import deepcopy
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import measure, report
+from utils import (
+    ColumnConfig,
+    PathConfig,
+    convert_trade_columns,
+    generate_new_trade_columns,
+    get_lawd_cd,
+    process_trade_columns,
+    to_api_rows,
+)
+
+
+def legacy_process_trade_columns(df: pd.DataFrame, date_id: str = None):
+    """벡터화 이전 구현"""
+    if not date_id:
+        date_id = df["date_id"].max()
+    _df = deepcopy(df)
+    _df = _df[_df["date_id"] == date_id]
+    _df.insert(
+        loc=1,
+        column="계약시점",
+        value=_df["계약년도"].astype(str)
+        + "-"
+        + _df["계약월"].astype(str).apply(lambda x: x.rjust(2, "0"))
+        + "-"
+        + _df["계약일"].astype(str).apply(lambda x: x.rjust(2, "0")),
+    )
+    _df = _df.drop(columns=["계약년도", "계약월", "계약일"], axis=0)
+    _df = _df.rename(columns={"계약시점": "계약일"})
+    lawd_cd = get_lawd_cd()
+    converter = {}
+    for n, c in zip(lawd_cd["sgg_nm"].to_list(), lawd_cd["lawd_cd"].to_list()):
+        converter.update({int(c): n})
+    _df["시군구코드"] = _df["시군구코드"].apply(
+        lambda x: converter[x] if isinstance(x, int) or x.isdigit() else x
+    )
+    _df["신규거래"] = None
+    return _df
+
+
+def legacy_generate_new_trade_columns(df: pd.DataFrame, date_id: str):
+    """벡터화 이전 구현(문자열 pk)"""
+    _df = deepcopy(df)
+    prev_date_id = (
+        datetime.strptime(date_id, "%Y-%m-%d") - timedelta(days=1)
+    ).strftime("%Y-%m-%d")
+    _df = _df.sort_values(
+        [
+            "거래구분",
+            "아파트명",
+            "시군구코드",
+            "법정동",
+            "계약일",
+            "전용면적",
+            "거래금액",
+            "층",
+            "거래유형",
+            "거래구분",
+            "date_id",
+        ]
+    )
+    _df["seq"] = (
+        _df.groupby(
+            ["거래구분", "아파트명", "시군구코드", "법정동", "date_id"]
+        ).cumcount()
+        + 1
+    )
+    _df["pk"] = (
+        _df["거래구분"].str[0]
+        + _df["아파트명"]
+        + _df["시군구코드"]
+        + _df["법정동"]
+        + _df["seq"].astype(str).apply(lambda x: x.rjust(5, "0"))
+    )
+    cur = _df[_df["date_id"] == date_id]
+    prev = _df[_df["date_id"] == prev_date_id]
+    merged = pd.merge(
+        left=cur, right=prev[["date_id", "pk"]], left_on="pk", right_on="pk", how="left"
+    )
+    merged["신규거래"] = np.where(merged["date_id_y"].isna(), "신규", None)
+    merged = merged.drop(columns=["pk", "seq", "date_id_y"], axis=0)
+    return merged.rename(columns={"date_id_x": "date_id"})
+
+
+def to_raw(snapshot: pd.DataFrame):
+    """스냅샷을 수집 직후(convert_trade_columns 이후) 형태로 되돌림"""
+    rows = to_api_rows(snapshot)
+    for col in ["dealYear", "dealMonth", "dealDay", "sggCd", "floor"]:
+        rows[col] = rows[col].astype(int)
+    rows["excluUseAr"] = rows["excluUseAr"].astype(float)
+    rows["ownershipGbn"] = " "
+    rows["tradeGbn"] = snapshot["거래구분"].to_numpy()
+    rows["date_id"] = snapshot["date_id"].astype(str).to_numpy()
+    rows["month_id"] = snapshot["month_id"].astype(str).to_numpy()
+    raw = convert_trade_columns(
+        ColumnConfig.TRADE_DICTIONARY,
+        rows,
+        include_columns=["month_id", "date_id"],
+        sort=True,
+    )
+    return raw.replace(" ", None)
+
+
+def synthetic_month(n_rows: int, seed: int = 0):
+    """저장된 스냅샷에서 row를 복원추출해서 n_rows 크기의 두 date_id(전일, 당일) 데이터 생성"""
+    snapshot = pd.read_parquet(
+        PathConfig.trade, engine="pyarrow", filters=[("date_id", "=", "2024-12-13")]
+    )
+    rng = np.random.default_rng(seed)
+    sampled = snapshot.iloc[rng.integers(0, len(snapshot), n_rows)].reset_index(
+        drop=True
+    )
+    # 아파트명을 늘려서 그룹 수도 같이 커지도록
+    sampled["아파트명"] = sampled["아파트명"].astype(str) + (
+        rng.integers(0, max(n_rows // 1000, 1), n_rows)
+    ).astype(str)
+    sampled["date_id"] = "2024-12-13"
+    sampled["month_id"] = "202412"
+    raw = to_raw(sampled)
+    prev = sampled.sample(frac=0.95, random_state=seed).assign(date_id="2024-12-12")
+    return raw, prev
+
+
+def check_snapshots(data_type: str = "trade"):
+    """저장된 (전일, 당일) 스냅샷 쌍마다 기존/현재 구현 결과가 같은지 확인"""
+    df = pd.read_parquet(getattr(PathConfig, data_type), engine="pyarrow")
+    df["date_id"] = df["date_id"].astype(str)
+    df["month_id"] = df["month_id"].astype(str)
+    checked = 0
+    for (month_id, date_id), snapshot in df.groupby(["month_id", "date_id"]):
+        prev_date_id = (
+            datetime.strptime(date_id, "%Y-%m-%d") - timedelta(days=1)
+        ).strftime("%Y-%m-%d")
+        prev = df[(df["month_id"] == month_id) & (df["date_id"] == prev_date_id)]
+        raw = to_raw(snapshot.reset_index(drop=True))
+
+        legacy = legacy_process_trade_columns(raw)
+        current = process_trade_columns(raw)
+        pd.testing.assert_frame_equal(legacy, current, check_dtype=False)
+
+        concat = pd.concat([prev, legacy])
+        legacy = legacy_generate_new_trade_columns(concat, date_id=date_id)
+        current = generate_new_trade_columns(concat, date_id=date_id)
+        pd.testing.assert_frame_equal(legacy, current, check_dtype=False)
+        checked += 1
+    print(f"{data_type}: {checked} (month_id, date_id) identical")
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--rows", default=1_000_000, type=int)
+    parser.add_argument("--check", default=False, action="store_true")
+    args = parser.parse_args()
+
+    if args.check:
+        check_snapshots("trade")
+        check_snapshots("bunyang")
+        return
+
+    raw, prev = synthetic_month(args.rows)
+    processed = process_trade_columns(raw)
+    concat = pd.concat([prev, processed])
+    print(f"{len(raw)} rows (prev {len(prev)})")
+
+    report(
+        {
+            "legacy process_trade_columns": measure(
+                legacy_process_trade_columns, raw, repeat=1, trace_memory=False
+            ),
+            "process_trade_columns": measure(
+                process_trade_columns, raw, repeat=1, trace_memory=False
+            ),
+        },
+        baseline="legacy process_trade_columns",
+    )
+    report(
+        {
+            "legacy generate_new_trade_columns": measure(
+                legacy_generate_new_trade_columns,
+                concat,
+                date_id="2024-12-13",
+                repeat=1,
+                trace_memory=False,
+            ),
+            "generate_new_trade_columns": measure(
+                generate_new_trade_columns,
+                concat,
+                date_id="2024-12-13",
+                repeat=1,
+                trace_memory=False,
+            ),
+        },
+        baseline="legacy generate_new_trade_columns",
+    )
+
+
+if __name__ == "__main__":
+    main()
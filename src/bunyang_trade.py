@@ -1,104 +1,84 @@
-import os
-from functools import partial
-from concurrent.futures import ThreadPoolExecutor
-from bs4 import BeautifulSoup
+import asyncio
 import pandas as pd
 from loguru import logger
-from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
-from tqdm import tqdm
+from datetime import datetime
 from argparse import ArgumentParser
 
 from utils import (
-    get_public_api_data,
-    get_lawd_cd,
+    fetch_public_api_data,
+    get_region_index,
     parse_xml,
     get_task_id,
+    get_target_months,
     BatchManager,
     ColumnConfig,
-    PathConfig,
     SchemaConfig,
     convert_trade_columns,
     process_trade_columns,
-    generate_new_trade_columns,
-    prepare_dataframe,
+    update_trade_snapshot,
+    save_fingerprints,
+    update_trade_aggregates,
+    conform,
+    save_dataframe,
+    has_partition,
+    get_response_cache,
+    ResponseCache,
+    CacheStats,
+    MockServerConfig,
+    use_mock_server,
 )
 
 
-def _sub_task(lawd_cd, deal_ymd):
-    # API Parameters
-    # ServiceKey
-    # LAWD_CD
-    # DEAL_YMD
-    # pageNo
-    # numOfRows
-    sentinel = get_public_api_data(
-        url_key="분양권실거래",
-        LAWD_CD=lawd_cd,
-        DEAL_YMD=deal_ymd,
-        pageNo=1,
-        numOfRows=1,
-    )
+def _collect(
+    month: int,
+    concurrency: int = None,
+    cache: ResponseCache = None,
+    cache_stats: CacheStats = None,
+):
+    """25개 구의 해당 월 응답을 수집 엔진으로 가져옴
 
-    soup = BeautifulSoup(sentinel.text, "xml")
-    total_cnt = int(soup.totalCount.get_text())  # 전체 건수
-    iteration = (total_cnt // 1000) + 1  # 1000 row마다 request할 때 iteration 수
-
-    if total_cnt > 0:
-        for i in range(1, iteration + 1):
-            response = get_public_api_data(
-                url_key="분양권실거래",
-                LAWD_CD=lawd_cd,
-                DEAL_YMD=deal_ymd,
-                pageNo=i,
-                numOfRows=1000,
-            )
-            if i == 1:
-                result_df = parse_xml(response.text, "items")
-            else:
-                result_df = pd.concat([result_df, parse_xml(response.text, "items")])
-    else:
-        result_df = None
-
-    logger.info(f"{deal_ymd} : {lawd_cd} COMPLETE")
-    return result_df
-
-
-def main_task(month: int, date_id: str):
+    Returns: {(lawd_cd, deal_ymd): [페이지별 response.text]}
     """
-    Threadpool로 돌릴 Main Task 함수
-    Args:
-        month: 연월, yyyyMM 포맷이어야 하며 int 타입이어야함
-        date_id: yyyy-MM-dd 포맷이어야함
+    lawd_cd_list = get_region_index().lawd_cd.tolist()
+    pages = asyncio.run(
+        fetch_public_api_data(
+            url_key="분양권실거래",
+            lawd_cd_list=lawd_cd_list,
+            deal_ymd_list=[month],
+            concurrency=concurrency,
+            cache=cache,
+            cache_stats=cache_stats,
+        )
+    )
+    if cache is not None:
+        cache.evict()
+    return pages
 
-    Returns:
 
-    """
-    logger.info(f"BunYang: {date_id} - {month} Task Start")
+def _parse(pages: dict):
+    """_collect의 응답을 파싱해서 {lawd_cd: 페이지별 DataFrame 리스트}로 반환"""
+    frames = {}
+    for (lawd_cd, deal_ymd), texts in pages.items():
+        frames[lawd_cd] = [parse_xml(text, "items") for text in texts]
+        logger.info(f"{deal_ymd} : {lawd_cd} COMPLETE")
+    return frames
 
-    lawd_cd = get_lawd_cd()
-    lawd_cd_list = lawd_cd["lawd_cd"].to_list()
-    trade_type = "분양권/입주권"
 
-    with ThreadPoolExecutor(max_workers=os.cpu_count()) as p:
-        result = list(
-            tqdm(
-                p.map(partial(_sub_task, deal_ymd=month), lawd_cd_list),
-                total=len(lawd_cd_list),
-            )
-        )
-    result = [ele for ele in result if ele is not None]
-    if not result:
-        logger.info(f"No data in {month}")
-        return
+def convert(result: list, month, date_id: str):
+    """parse_xml 결과 리스트를 합쳐서 한글 컬럼(ColumnConfig.TRADE_DICTIONARY)으로 변환
+
+    Args:
+        result: parse_xml로 파싱한 DataFrame 리스트
+        month: yyyyMM
+        date_id: yyyy-MM-dd
+    """
     concat = pd.concat(result)
-    month = str(month)
     concat["date_id"] = date_id
-    concat["month_id"] = str(month)
+    concat["month_id"] = int(month)
     concat["aptDong"] = " "
     concat["buildYear"] = " "
     concat["rgstDate"] = " "
-    concat["tradeGbn"] = trade_type
+    concat["tradeGbn"] = "분양권/입주권"
 
     # 데이터 전처리 부분
     concat = convert_trade_columns(
@@ -107,70 +87,106 @@ def main_task(month: int, date_id: str):
         include_columns=["month_id", "date_id"],
         sort=True,
     )
-    concat = concat.replace(" ", None)
+    return concat.replace(" ", None)
 
-    # 시군구코드 -> 시군구명으로 변경하기
-    lawd_cd = get_lawd_cd()
-    name = lawd_cd["sgg_nm"].to_list()
-    code = lawd_cd["lawd_cd"].to_list()
 
-    converter = {}
-    for n, c in zip(name, code):
-        converter.update({int(c): n})
-    concat["시군구코드"] = concat["시군구코드"].apply(lambda x: converter[x])
+def process(concat: pd.DataFrame):
+    """convert 결과를 스키마 타입(정수 거래금액, 날짜 계약일 등)의 분양권 DataFrame으로 전처리"""
+    # 시군구코드 -> 시군구명 변환은 process_trade_columns에서 처리
     concat = process_trade_columns(concat)
     concat["건축년도"] = concat["건축년도"].fillna("미정")
-    prev_date_id = (
-        datetime.strptime(date_id, "%Y-%m-%d") - timedelta(days=1)
-    ).strftime("%Y-%m-%d")
-    exist = prepare_dataframe("trade", month_id=month, date_id=prev_date_id)
-    concat = pd.concat([exist, concat])
-    df = generate_new_trade_columns(concat, date_id=date_id)
+    return conform(concat, data_type="trade")
+
+
+def transform(result: list, month, date_id: str):
+    """parse_xml 결과 리스트를 스키마 타입의 분양권 DataFrame으로 전처리(convert + process)"""
+    return process(convert(result, month, date_id))
+
+
+def main_task(month: int, date_id: str, concurrency: int = None):
+    """
+    수집 엔진으로 돌릴 Main Task 함수
+    Args:
+        month: 연월, yyyyMM 포맷이어야 하며 int 타입이어야함
+        date_id: yyyy-MM-dd 포맷이어야함
+        concurrency: API 동시 요청 수, default APIConfig.concurrency
+
+    Returns:
+
+    """
+    logger.info(f"BunYang: {date_id} - {month} Task Start")
+
+    cache, cache_stats = get_response_cache(), CacheStats()
+    pages = _collect(
+        month, concurrency=concurrency, cache=cache, cache_stats=cache_stats
+    )
+    # 직전 실행과 응답이 모두 같고 이미 저장했으면 전처리와 저장을 하지 않음
+    if (
+        cache is not None
+        and cache_stats.changed == 0
+        and has_partition("bunyang", month_id=month, date_id=date_id)
+    ):
+        logger.info(f"BunYang: {month} responses unchanged, skip saving {date_id}")
+        return
+    frames = _parse(pages)
+    if not any(frames.values()):
+        logger.info(f"No data in {month}")
+        return
+    month = str(month)
+    # 구별 fingerprint가 바뀐 구만 전처리하고 신규거래 계산
+    df, fingerprints = update_trade_snapshot(
+        "bunyang", frames, month=month, date_id=date_id, transform=transform
+    )
+    if df is None:
+        logger.info(f"BunYang: {month} no district changed, skip saving {date_id}")
+        return
     logger.info("processing columns completed")
 
     # 스키마 일치시키기
     df = df[list(SchemaConfig.trade.keys())]
     df = df.astype(SchemaConfig.trade)
 
-    # Parquet로 Overwrite 저장
-    path = PathConfig.bunyang
-    df.to_parquet(
-        path=path,
-        engine="pyarrow",
-        partition_cols=["month_id", "date_id"],
-        existing_data_behavior="delete_matching",
-    )
-    logger.info(f"Save the data in '{path}/month_id={month}/date_id={date_id}'")
+    # StorageConfig.mode에 따라 snapshot 또는 delta로 저장
+    save_dataframe(df, data_type="bunyang", month_id=month, date_id=date_id)
+    save_fingerprints("bunyang", month, date_id, fingerprints)
+    # notifier가 읽는 날짜별 집계 갱신
+    update_trade_aggregates("bunyang", df, month_id=month, date_id=date_id)
 
 
 def parse():
     parser = ArgumentParser()
     parser.add_argument("--mode", default="prod", choices=["prod", "test"])
     parser.add_argument("--nonblock", default=True, action="store_false")
+    parser.add_argument("--concurrency", default=None, type=int, action="store")
     parser.add_argument(
         "--date_id", default=datetime.now().strftime("%Y-%m-%d"), action="store"
     )
+    parser.add_argument(
+        "--mock_url",
+        default=MockServerConfig.url,
+        action="store",
+        help="mock_server.py 주소로 수집, ex) http://127.0.0.1:8800",
+    )
     return parser.parse_args()
 
 
 if __name__ == "__main__":
-    this_month = datetime.now().strftime("%Y%m")
-    last_month = (datetime.now() - relativedelta(months=1)).strftime("%Y%m")
-    # 1일이면 해당 월이 아니라 직전월 데이터를 가져옴
-    if datetime.now().day == 1:
-        this_month = (datetime.now() - relativedelta(months=1)).strftime("%Y%m")
-        last_month = (datetime.now() - relativedelta(months=2)).strftime("%Y%m")
-
     args = parse()
+    if args.mock_url:
+        use_mock_server(args.mock_url)
     date_id = args.date_id
     mode = args.mode.lower()
     block = args.nonblock
 
-    bm = BatchManager(
-        task_id=get_task_id(__file__, last_month), key=date_id, block=block
-    )
-    bm(task_type="execute", func=main_task, month=last_month, date_id=date_id)
-    bm = BatchManager(
-        task_id=get_task_id(__file__, this_month), key=date_id, block=block
-    )
-    bm(task_type="execute", func=main_task, month=this_month, date_id=date_id)
+    # scheduler.build_stages와 같은 월, 같은 task_id로 기록(1일이면 한 달씩 앞당김)
+    for month in get_target_months(date_id):
+        bm = BatchManager(
+            task_id=get_task_id(__file__, month), key=date_id, block=block
+        )
+        bm(
+            task_type="execute",
+            func=main_task,
+            month=month,
+            date_id=date_id,
+            concurrency=args.concurrency,
+        )
@@ -1,5 +1,5 @@
 from utils import PathConfig
-from utils import BatchManager, get_task_id
+from utils import BatchManager, Metastore, get_task_id
 from argparse import ArgumentParser
 from git import Repo
 from loguru import logger
@@ -8,6 +8,8 @@ from datetime import datetime
 
 def git_push(date_id: str):
     try:
+        # WAL에 남은 metastore 변경분을 db 파일에 반영한 뒤 commit
+        Metastore().checkpoint()
         repo = Repo(PathConfig.root)
         repo.git.add(".")
         repo.index.commit(message=f"Update on {date_id}")
@@ -0,0 +1,170 @@
+import asyncio
+from loguru import logger
+from datetime import datetime
+from argparse import ArgumentParser
+
+from utils import (
+    fetch_naver_listing_data,
+    parse_listing_json,
+    get_task_id,
+    BatchManager,
+    FilterConfig,
+    process_sales_column,
+    save_listings,
+    update_sales_aggregates,
+    has_partition,
+    get_response_cache,
+    ResponseCache,
+    CacheStats,
+    MockServerConfig,
+    use_mock_server,
+)
+
+# 거래 타입별 저장할 data_type
+DATA_TYPE = {"매매": "sales", "전세": "rent"}
+
+
+def collect(
+    apt_names: list = None,
+    sales_names: list = None,
+    concurrency: int = None,
+    cache: ResponseCache = None,
+    date_id: str = None,
+):
+    """FilterConfig.apt_code 단지들의 매물을 거래 타입별로 한 번에 가져옴
+
+    Args:
+        apt_names: 가져올 아파트명, default FilterConfig.apt_code 전체
+        sales_names: 매매, 전세, default 둘 다
+        concurrency: 동시 요청 수, default APIConfig.naver_concurrency
+        cache: 응답 캐시
+        date_id: cache와 함께 지정하면, 응답이 직전 실행과 모두 같고 date_id가 이미 저장되어 있을 때 파싱하지 않음
+
+    Returns: {거래 타입: 매물 DataFrame}, 파싱하지 않은 경우 빈 dict
+    """
+    if not apt_names:
+        apt_names = list(FilterConfig.apt_code.keys())
+    if not sales_names:
+        sales_names = list(DATA_TYPE.keys())
+    apt_codes = [
+        FilterConfig.apt_code[name]
+        for name in apt_names
+        if name in FilterConfig.apt_code
+    ]
+    pairs = [
+        (apt_code, FilterConfig.sales_code[sales_name])
+        for sales_name in sales_names
+        for apt_code in apt_codes
+    ]
+    cache_stats = CacheStats()
+    pages = asyncio.run(
+        fetch_naver_listing_data(
+            pairs, concurrency=concurrency, cache=cache, cache_stats=cache_stats
+        )
+    )
+    if cache is not None:
+        cache.evict()
+        if (
+            date_id
+            and cache_stats.changed == 0
+            and all(
+                has_partition(DATA_TYPE[sales_name], date_id=date_id)
+                for sales_name in sales_names
+            )
+        ):
+            logger.info(f"Listing: responses unchanged, skip saving {date_id}")
+            return {}
+
+    result = {}
+    for sales_name in sales_names:
+        sales_code = FilterConfig.sales_code[sales_name]
+        result[sales_name] = parse_listing_json(
+            [page for apt_code in apt_codes for page in pages[(apt_code, sales_code)]],
+            price_key=FilterConfig.price_code[sales_name],
+        )
+        logger.info(
+            f"{sales_name}: {len(apt_codes)} complexes, {len(result[sales_name])} articles"
+        )
+    return result
+
+
+def main_task(
+    apt_names: list = None,
+    date_id: str = None,
+    sales_names: list = None,
+    concurrency: int = None,
+):
+    """네이버 매물(매매/전세)을 가져와서 sales, rent로 저장(utils.save_listings)
+
+    Args:
+        apt_names: 가져올 아파트명, default FilterConfig.apt_code 전체
+        date_id: yyyy-MM-dd, default 오늘
+        sales_names: 매매, 전세, default 둘 다
+        concurrency: 동시 요청 수, default APIConfig.naver_concurrency
+    """
+    if not date_id:
+        date_id = datetime.now().strftime("%Y-%m-%d")
+    logger.info(f"Listing: {date_id} Task Start")
+    reverse_sales_code = {v: k for k, v in FilterConfig.sales_code.items()}
+    collected = collect(
+        apt_names,
+        sales_names,
+        concurrency=concurrency,
+        cache=get_response_cache(),
+        date_id=date_id,
+    )
+    for sales_name, concat in collected.items():
+        if concat.empty:
+            logger.info(f"No {sales_name} articles in {date_id}")
+            continue
+        concat["date_id"] = date_id
+        concat["거래유형"] = concat["거래유형"].map(reverse_sales_code)
+        concat = process_sales_column(concat)
+        logger.info("processing columns completed")
+
+        # 매물 변경 로그 저장, StorageConfig.listing_mode가 snapshot이면 전체 매물도 저장
+        save_listings(concat, data_type=DATA_TYPE[sales_name], date_id=date_id)
+        # notifier가 읽는 날짜별 집계 갱신
+        update_sales_aggregates(DATA_TYPE[sales_name], concat, date_id=date_id)
+
+
+def parse():
+    parser = ArgumentParser()
+    parser.add_argument("--mode", default="prod", choices=["prod", "test"])
+    parser.add_argument("--nonblock", default=True, action="store_false")
+    parser.add_argument(
+        "--sales_names",
+        nargs="+",
+        default=list(DATA_TYPE.keys()),
+        choices=list(DATA_TYPE.keys()),
+    )
+    parser.add_argument("--concurrency", default=None, type=int, action="store")
+    parser.add_argument(
+        "--date_id", default=datetime.now().strftime("%Y-%m-%d"), action="store"
+    )
+    parser.add_argument(
+        "--mock_url",
+        default=MockServerConfig.url,
+        action="store",
+        help="mock_server.py 주소로 수집, ex) http://127.0.0.1:8800",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse()
+    if args.mock_url:
+        use_mock_server(args.mock_url)
+    date_id = args.date_id
+    block = args.nonblock
+
+    bm = BatchManager(
+        task_id=get_task_id(__file__, *args.sales_names), key=date_id, block=block
+    )
+    bm(
+        task_type="execute",
+        func=main_task,
+        date_id=date_id,
+        sales_names=args.sales_names,
+        concurrency=args.concurrency,
+    )
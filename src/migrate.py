@@ -0,0 +1,94 @@
+import pandas as pd
+from pathlib import Path
+from loguru import logger
+from argparse import ArgumentParser
+
+from utils import (
+    PathConfig,
+    write_delta,
+    write_listing_events,
+    list_partitions,
+    read_dataset,
+    write_dataset,
+)
+
+
+def snapshot_to_delta(data_type: str, month_id: str = None):
+    """snapshots에 저장된 date_id별 전체 데이터를 base + delta 저장소로 변환
+
+    Args:
+        data_type: trade, bunyang
+        month_id: 특정 month_id만 변환, default 전체
+    """
+    path = Path(getattr(PathConfig, data_type))
+    months = sorted(p.name.split("=", 1)[1] for p in path.glob("month_id=*"))
+    if month_id:
+        months = [m for m in months if m == str(month_id)]
+    for month in months:
+        df = pd.read_parquet(
+            path, engine="pyarrow", filters=[("month_id", "=", int(month))]
+        )
+        df["date_id"] = df["date_id"].astype(str)
+        for date_id, snapshot in df.groupby("date_id", sort=True):
+            write_delta(snapshot, data_type=data_type, month_id=month, date_id=date_id)
+        logger.info(
+            f"{data_type}: {month} converted ({df['date_id'].nunique()} date_id)"
+        )
+
+
+def snapshot_to_events(data_type: str):
+    """snapshots에 저장된 date_id별 매물을 순서대로 비교해서 매물 변경 로그(listing_log)로 변환
+
+    Args:
+        data_type: sales, rent
+    """
+    dates = sorted({keys["date_id"] for _, keys in list_partitions(data_type)})
+    for date_id in dates:
+        df = read_dataset(data_type, date_id=date_id)
+        write_listing_events(
+            df.drop(columns=["date_id"]), data_type=data_type, date_id=date_id
+        )
+    logger.info(f"{data_type}: {len(dates)} date_id converted")
+
+
+def snapshot_to_schema(data_type: str, month_id: str = None):
+    """snapshots에 저장된 파티션을 utils.schema의 타입 스키마(정수 가격, date32 날짜, dictionary 컬럼)로 다시 저장
+
+    Args:
+        data_type: trade, bunyang, sales, rent
+        month_id: 특정 month_id만 변환, default 전체(sales, rent는 무시)
+    """
+    keys = {
+        tuple(sorted(k.items()))
+        for _, k in list_partitions(data_type, month_id=month_id)
+    }
+    for key in sorted(keys):
+        partition = dict(key)
+        df = read_dataset(data_type, **partition)
+        write_dataset(df, data_type)
+        logger.info(f"{data_type}: {partition} rewritten ({len(df)} rows)")
+
+
+def parse():
+    parser = ArgumentParser()
+    parser.add_argument("--to", default="delta", choices=["delta", "schema", "events"])
+    parser.add_argument(
+        "--data_type",
+        nargs="+",
+        default=["trade", "bunyang"],
+        choices=["trade", "bunyang", "sales", "rent"],
+    )
+    parser.add_argument("--month_id", default=None, action="store")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse()
+    for data_type in args.data_type:
+        if args.to == "schema":
+            snapshot_to_schema(data_type, month_id=args.month_id)
+        elif args.to == "events":
+            if data_type in ["sales", "rent"]:
+                snapshot_to_events(data_type)
+        elif data_type in ["trade", "bunyang"]:
+            snapshot_to_delta(data_type, month_id=args.month_id)
@@ -0,0 +1,268 @@
+"""공공데이터(아파트/분양권 실거래)와 네이버 매물 API를 대신 응답하는 로컬 서버
+저장된 스냅샷으로 응답을 만들고, 지연 시간, 에러 비율, 초당 요청 제한(429)을 설정해서
+수집 엔진의 동시 요청 수, 재시도, rate limit을 실제 API 없이 조정할 때 사용한다
+
+    python src/mock_server.py --latency 0.1 --jitter 0.1 --error_rate 0.02 --rate_limit 25
+
+클라이언트에서는 utils.use_mock_server("http://127.0.0.1:8800")로 URLConfig.URL을 이 서버로 바꿈
+    - 아파트/분양권 실거래: 원래 API와 같은 path, LAWD_CD별 스냅샷 한 달치를 numOfRows, pageNo로 나눠서 응답(DEAL_YMD는 무시)
+    - 네이버 매물: 원래 API와 같은 path, complexNumber, tradeTypes별 매물을 page로 나눠서 응답
+      FilterConfig.apt_code에 없는 단지 코드는 스냅샷 단지 중 하나로 응답
+    - GET /stats: endpoint별 응답 status 수
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+import zlib
+from argparse import ArgumentParser
+from collections import Counter
+from urllib.parse import urlsplit
+
+from aiohttp import web
+from loguru import logger
+
+from utils import (
+    MOCK_URL_KEYS,
+    APIConfig,
+    FilterConfig,
+    MockServerConfig,
+    URLConfig,
+    pick_partition,
+    read_dataset,
+    render_response,
+    to_api_rows,
+    to_articles,
+)
+
+# endpoint(URLConfig.URL의 키)별 응답할 데이터
+PUBLIC_DATA_TYPES = {"아파트실거래": "trade", "분양권실거래": "bunyang"}
+
+
+class Throttle:
+    """초당 rate개까지 허용하는 token bucket, 토큰이 없으면 바로 거절
+
+    Args:
+        rate: 초당 요청 수, None이면 제한하지 않음
+    """
+
+    def __init__(self, rate: float = None):
+        self.rate = rate
+        self.tokens = max(1.0, rate) if rate else None
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self):
+        if not self.rate:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                max(1.0, self.rate), self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class MockAPI:
+    """mock 서버의 응답 데이터와 지연/에러/throttle 설정
+
+    Args:
+        latency: 응답 지연 시간(초), default MockServerConfig.latency
+        jitter: latency에 더하는 0~jitter초의 무작위 지연, default MockServerConfig.jitter
+        error_rate: 500으로 응답할 확률, default MockServerConfig.error_rate
+        rate_limit: endpoint별 초당 요청 수, 넘으면 429, default MockServerConfig.rate_limit
+        scale: 구/단지마다 스냅샷 row를 몇 배로 늘려서 응답할지, default MockServerConfig.scale
+        seed: 지연과 에러를 정하는 난수 seed
+    """
+
+    def __init__(
+        self,
+        latency: float = None,
+        jitter: float = None,
+        error_rate: float = None,
+        rate_limit: float = None,
+        scale: int = None,
+        seed: int = None,
+    ):
+        self.latency = MockServerConfig.latency if latency is None else latency
+        self.jitter = MockServerConfig.jitter if jitter is None else jitter
+        self.error_rate = (
+            MockServerConfig.error_rate if error_rate is None else error_rate
+        )
+        rate_limit = MockServerConfig.rate_limit if rate_limit is None else rate_limit
+        self.scale = scale or MockServerConfig.scale
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self.paths = {urlsplit(URLConfig.URL[key]).path: key for key in MOCK_URL_KEYS}
+        self.throttles = {key: Throttle(rate_limit) for key in MOCK_URL_KEYS}
+        self.trade_rows = {
+            data_type: self._load_trade_rows(data_type)
+            for data_type in PUBLIC_DATA_TYPES.values()
+        }
+        self.articles = self._load_articles()
+        self._pages = {}
+
+    def _load_trade_rows(self, data_type: str):
+        """가장 큰 최근 파티션 한 달치의 {LAWD_CD: [xml item record]}"""
+        month_id, date_id = pick_partition(data_type)
+        df = read_dataset(data_type, month_id=month_id, date_id=date_id)
+        rows = to_api_rows(df, data_type)
+        return {
+            lawd_cd: group.to_dict(orient="records") * self.scale
+            for lawd_cd, group in rows.groupby("sggCd")
+        }
+
+    def _load_articles(self):
+        """매매/전세 최근 파티션의 {sales_code: {단지 코드: [article]}}
+        스냅샷 아파트명에 FilterConfig.apt_code의 이름이 들어있으면 그 코드를 사용
+        """
+        articles = {}
+        for data_type in ["sales", "rent"]:
+            _, date_id = pick_partition(data_type)
+            df = read_dataset(data_type, date_id=date_id)
+            for (apt_name, sales_name), group in df.groupby(
+                [df["아파트명"].astype(str), df["거래유형"].astype(str)]
+            ):
+                codes = [
+                    code
+                    for name, code in FilterConfig.apt_code.items()
+                    if name in apt_name
+                ]
+                code = codes[0] if codes else str(zlib.crc32(apt_name.encode()))
+                articles.setdefault(FilterConfig.sales_code[sales_name], {})[code] = (
+                    to_articles(group) * self.scale
+                )
+        return articles
+
+    @web.middleware
+    async def simulate(self, request: web.Request, handler):
+        """throttle(429), 지연, 에러(500)를 적용하고 status를 집계"""
+        key = self.paths.get(request.path)
+        if key is None:
+            return await handler(request)
+        if not self.throttles[key].allow():
+            response = web.Response(
+                status=429, text="LIMITED_NUMBER_OF_SERVICE_REQUESTS_EXCEEDS_ERROR"
+            )
+            response.headers["Retry-After"] = "1"
+        else:
+            await asyncio.sleep(self.latency + self.random.uniform(0, self.jitter))
+            if self.random.random() < self.error_rate:
+                response = web.Response(status=500, text="SERVICE ERROR")
+            else:
+                response = await handler(request)
+        self.stats[(key, response.status)] += 1
+        return response
+
+    def _public_page(
+        self, data_type: str, lawd_cd: str, page_no: int, num_of_rows: int
+    ):
+        key = (data_type, lawd_cd, page_no, num_of_rows)
+        text = self._pages.get(key)
+        if text is None:
+            rows = self.trade_rows[data_type].get(lawd_cd, [])
+            page = rows[(page_no - 1) * num_of_rows : page_no * num_of_rows]
+            text = self._pages[key] = render_response(
+                page, page_no, num_of_rows, len(rows)
+            )
+        return text
+
+    def public_handler(self, data_type: str):
+        async def handler(request: web.Request):
+            query = request.query
+            text = self._public_page(
+                data_type,
+                query.get("LAWD_CD", ""),
+                int(query.get("pageNo", 1)),
+                int(query.get("numOfRows", 10)),
+            )
+            return web.Response(text=text, content_type="text/xml")
+
+        return handler
+
+    async def naver_handler(self, request: web.Request):
+        query = request.query
+        by_code = self.articles.get(query.get("tradeTypes"), {})
+        code = query.get("complexNumber", "")
+        articles = by_code.get(code)
+        if articles is None and by_code:
+            # 모르는 단지는 코드에 따라 정해진 스냅샷 단지로 응답
+            articles = list(by_code.values())[zlib.crc32(code.encode()) % len(by_code)]
+        articles = articles or []
+        page = int(query.get("page", 0))
+        size = APIConfig.naver_page_size
+        body = {
+            "result": {
+                "list": articles[page * size : (page + 1) * size],
+                "totalCount": len(articles),
+            }
+        }
+        return web.Response(
+            text=json.dumps(body, ensure_ascii=False), content_type="application/json"
+        )
+
+    async def stats_handler(self, request: web.Request):
+        stats = {}
+        for (key, status), count in sorted(self.stats.items()):
+            stats.setdefault(key, {})[str(status)] = count
+        return web.json_response(
+            stats, dumps=lambda obj: json.dumps(obj, ensure_ascii=False)
+        )
+
+    def app(self):
+        app = web.Application(middlewares=[self.simulate])
+        for path, key in self.paths.items():
+            handler = (
+                self.public_handler(PUBLIC_DATA_TYPES[key])
+                if key in PUBLIC_DATA_TYPES
+                else self.naver_handler
+            )
+            app.router.add_get(path, handler)
+        app.router.add_get("/stats", self.stats_handler)
+        return app
+
+
+def parse():
+    parser = ArgumentParser()
+    parser.add_argument("--host", default=MockServerConfig.host, action="store")
+    parser.add_argument(
+        "--port", default=MockServerConfig.port, type=int, action="store"
+    )
+    parser.add_argument(
+        "--latency", default=MockServerConfig.latency, type=float, action="store"
+    )
+    parser.add_argument(
+        "--jitter", default=MockServerConfig.jitter, type=float, action="store"
+    )
+    parser.add_argument(
+        "--error_rate", default=MockServerConfig.error_rate, type=float, action="store"
+    )
+    parser.add_argument(
+        "--rate_limit", default=MockServerConfig.rate_limit, type=float, action="store"
+    )
+    parser.add_argument(
+        "--scale", default=MockServerConfig.scale, type=int, action="store"
+    )
+    parser.add_argument("--seed", default=None, type=int, action="store")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse()
+    api = MockAPI(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        scale=args.scale,
+        seed=args.seed,
+    )
+    logger.info(f"Mock server: http://{args.host}:{args.port} {sorted(api.paths)}")
+    web.run_app(api.app(), host=args.host, port=args.port, access_log=None, print=None)
+    logger.info(f"Mock server stats: {dict(api.stats)}")
@@ -1,76 +1,69 @@
 import os.path
 import pandas as pd
-from copy import deepcopy
-from jinja2 import Template
 from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
 from typing import Literal
 from argparse import ArgumentParser
 
 from utils import (
     prepare_dataframe,
     send_message,
-    send_photo,
-    load_env,
+    send_media_group,
+    get_settings,
     get_task_id,
+    get_target_months,
     BatchManager,
     PathConfig,
     FilterConfig,
     SchemaConfig,
     TelegramTemplate,
+    conform,
+    get_trade_aggregates,
+    get_sales_aggregates,
 )
 
 
+def _trade_aggregates(month: str, date_id: str):
+    """실거래 + 분양권의 시군구별 거래수/해지수/신규수(materialized 집계에서 읽음)"""
+    agg = pd.concat(
+        [
+            get_trade_aggregates(data_type, month_id=month, date_id=date_id)
+            for data_type in ["trade", "bunyang"]
+        ]
+    )
+    if len(agg) == 0:
+        return pd.DataFrame(columns=["시군구코드", "거래수", "해지수", "신규수"])
+    return (
+        agg.groupby(agg["시군구코드"].astype(str))[["거래수", "해지수", "신규수"]]
+        .sum()
+        .reset_index()
+    )
+
+
 def daily_aggregation(month: str, date_id: str, sgg_contains: list = None):
     prev_date_id = (
         datetime.strptime(date_id, "%Y-%m-%d") - timedelta(days=1)
     ).strftime("%Y-%m-%d")
-    trade = prepare_dataframe(data_type="trade", month_id=month, date_id=date_id)
-    bunyang = prepare_dataframe(data_type="bunyang", month_id=month, date_id=date_id)
-    # 데이터가 없을 시 처리
-    df = pd.concat([trade, bunyang])
-    if len(df) == 0:
-        df = pd.DataFrame(columns=list(SchemaConfig.trade.keys()))
-        total = 0
-    else:
-        total = df["계약일"].count()
+    agg = _trade_aggregates(month, date_id)
+    total = int(agg["거래수"].sum())
 
     if datetime.strptime(date_id, "%Y-%m-%d").day != 1:
-        last_trade = prepare_dataframe(
-            data_type="trade", month_id=month, date_id=prev_date_id
-        )
-        last_bunyang = prepare_dataframe(
-            data_type="bunyang", month_id=month, date_id=prev_date_id
-        )
-        last_df = pd.concat([last_trade, last_bunyang])
-
-        # 데이터가 없을 시 처리
-        if len(last_df) == 0:
-            last_df = pd.DataFrame(columns=list(SchemaConfig.trade.keys()))
-            last_total = 0
-        else:
-            last_total = last_df["계약일"].count()
+        last_total = int(_trade_aggregates(month, prev_date_id)["거래수"].sum())
         change = total - last_total
     else:
         change = 0
 
-    agg = (
-        df[df["시군구코드"].isin(sgg_contains)]
-        .groupby("시군구코드")[["계약일", "계약해지여부", "신규거래"]]
-        .count()
-        .reset_index()
-    )
+    agg = agg[agg["시군구코드"].isin(sgg_contains)]
 
-    message = Template(TelegramTemplate.DAILY_STATUS).render(
+    message = TelegramTemplate.render(
+        "DAILY_STATUS",
         date_id=date_id,
         month=f"{str(month)[:4]}-{str(month)[4:]}",
         total_trade=total,
         change=change,
         sgg_list=agg["시군구코드"].to_list(),
-        apt_trades=agg["계약일"].to_list(),
-        new_trades=agg["신규거래"].to_list(),
-        apt_trade_cancels=agg["계약해지여부"].to_list(),
-        zip=zip,
+        apt_trades=agg["거래수"].to_list(),
+        new_trades=agg["신규수"].to_list(),
+        apt_trade_cancels=agg["해지수"].to_list(),
     )
     return message
 
@@ -81,18 +74,14 @@ def daily_new_trade(
     trade = prepare_dataframe(data_type="trade", month_id=month, date_id=date_id)
     bunyang = prepare_dataframe(data_type="bunyang", month_id=month, date_id=date_id)
     df = pd.concat([trade, bunyang])
-    # 데이터가 없을 시 처리
+    # 데이터가 없을 시 처리, 아래 .dt 접근을 위해 빈 dataframe도 스키마 타입으로 맞춤
     if len(df) == 0:
-        df = pd.DataFrame(columns=list(SchemaConfig.trade.keys()))
+        df = conform(pd.DataFrame(columns=list(SchemaConfig.trade.keys())), "trade")
 
     if filter_new:
         df = df[df["신규거래"] == "신규"]
     if apt_contains:
         df = pd.concat([df[df["아파트명"].str.contains(name)] for name in apt_contains])
-    df["전용면적"] = df["전용면적"].apply(lambda x: f"{int(x)}({int((x / 3.3) + 7)}평)")
-    df["거래금액"] = df["거래금액"].apply(
-        lambda x: f"{round(int(x.replace(',', '')) / 1e4, 2)}억"
-    )
     cols = [
         "아파트명",
         "시군구코드",
@@ -104,18 +93,18 @@ def daily_new_trade(
         "거래유형",
     ]
     df = df[cols]
-    df = df[
-        df["전용면적"]
-        .astype(str)
-        .str.split("(")
-        .apply(lambda x: x[-1])
-        .str.startswith("3")
-    ]  # 30평대만
+    # 30평대만, 전용면적/거래금액의 평/억 표시는 템플릿 필터에서 처리
+    pyeong = (df["전용면적"] / 3.3 + 7).astype(int)
+    df = df[pyeong.between(30, 39)]
     df = df.sort_values(["아파트명", "전용면적", "계약일", "층"])
-    data = df[cols].to_dict(orient="records")
+    df["계약일"] = df["계약일"].dt.strftime("%Y-%m-%d")
+    data = df.to_dict(orient="records")
 
-    message = Template(TelegramTemplate.DAILY_DIFFERENCE).render(
-        month=f"{str(month)[:4]}-{str(month)[4:]}", date_id=date_id, data=data, len=len
+    message = TelegramTemplate.render(
+        "DAILY_DIFFERENCE",
+        month=f"{str(month)[:4]}-{str(month)[4:]}",
+        date_id=date_id,
+        data=data,
     )
     return message
 
@@ -125,54 +114,33 @@ def sales_aggregation(date_id):
         datetime.strptime(date_id, "%Y-%m-%d") - timedelta(days=1)
     ).strftime("%Y-%m-%d")
 
-    # 현재로부터 7일 전까지 확인된 것
-    def _agg(df, date_id):
-        data = deepcopy(df)
-        day_filter = (
-            datetime.strptime(date_id, "%Y-%m-%d") - timedelta(days=28)
-        ).strftime("%Y-%m-%d")
-        data = data[data["확인날짜"] >= day_filter]
+    # 28일 전까지 확인된 84타입 매물 집계(materialized 집계에서 읽음)
+    def _agg(date_id):
+        data = get_sales_aggregates("sales", date_id=date_id)
+        if len(data) == 0:
+            return pd.DataFrame(
+                columns=["아파트명", "평균", "중앙", "최대", "최저", "매물수"]
+            )
         data = data[data["면적구분"] == "84"]
-
-        grouped = data.groupby("아파트명").agg(
-            {"가격": ["mean", "median", "max", "min", "count"]}
+        grouped = data[["아파트명", "평균", "중앙", "최대", "최저", "매물수"]].astype(
+            {"아파트명": str}
         )
-        grouped.columns = ["평균", "중앙", "최대", "최저", "매물수"]
-        grouped = grouped.reset_index()
-        grouped = grouped.sort_values("평균")
-        return grouped
-
-    def _process_columns(df):
-        res = deepcopy(df)
-        res["매물수"] = res["매물수"].apply(lambda x: str(x) + "개")
-        for col in res.columns[1:-1]:
-            res[col] = res[col].apply(lambda x: f"{x / 1e8:.2f}" + "억")
-        return res
-
-    df = prepare_dataframe(data_type="sales", date_id=date_id)
-    this = _agg(df, date_id)
-
-    # 이건 현재 매물용
-    this_data = _process_columns(this)
-    this_data = this_data.to_dict(orient="records")
-
-    # 전일과 비교
-    prev_df = prepare_dataframe(data_type="sales", date_id=prev_date_id)
-    prev = _agg(prev_df, prev_date_id)
-    merged = this.merge(prev, how="left", on="아파트명")
-
-    merged["평균"] = round((merged["평균_x"] - merged["평균_y"]) / 1e8, 3)
-    merged["중앙"] = round((merged["중앙_x"] - merged["중앙_y"]) / 1e8, 3)
-    merged["최대"] = round((merged["최대_x"] - merged["최대_y"]) / 1e8, 3)
-    merged["최저"] = round((merged["최저_x"] - merged["최저_y"]) / 1e8, 3)
-    merged["매물수"] = merged["매물수_x"] - merged["매물수_y"]
-
-    merged = merged[["아파트명", "평균", "중앙", "최대", "최저", "매물수"]]
-    merged = _process_columns(merged)
-    merged_data = merged.to_dict(orient="records")
-
-    message = Template(TelegramTemplate.SALES_STATUS).render(
-        this_data=this_data, merged_data=merged_data, zip=zip
+        return grouped.sort_values("평균").reset_index(drop=True)
+
+    this = _agg(date_id)
+    this_data = this.to_dict(orient="records")
+
+    # 전일과 비교, 억/개 표시는 템플릿 필터에서 처리
+    prev = _agg(prev_date_id)
+    merged = this.merge(prev, how="left", on="아파트명", suffixes=("", "_prev"))
+    for col in ["평균", "중앙", "최대", "최저", "매물수"]:
+        merged[col] = merged[col] - merged[f"{col}_prev"]
+    merged_data = merged[
+        ["아파트명", "평균", "중앙", "최대", "최저", "매물수"]
+    ].to_dict(orient="records")
+
+    message = TelegramTemplate.render(
+        "SALES_STATUS", this_data=this_data, merged_data=merged_data
     )
 
     return message
@@ -195,54 +163,48 @@ def parse():
     return parser.parse_args()
 
 
-if __name__ == "__main__":
-    this_month = int(datetime.now().strftime("%Y%m"))
-    last_month = int((datetime.now() - relativedelta(months=1)).strftime("%Y%m"))
-    # 매월 1일은 전월꺼로
-    if datetime.now().day == 1:
-        this_month = int((datetime.now() - relativedelta(months=1)).strftime("%Y%m"))
-        last_month = int((datetime.now() - relativedelta(months=2)).strftime("%Y%m"))
+def _chat_ids(mode: str):
+    """(monthly, detail) chat_id, test 모드면 둘 다 테스트 chat_id"""
+    settings = get_settings()
+    if mode == "test":
+        return settings.telegram_test_chat_id, settings.telegram_test_chat_id
+    return settings.telegram_monthly_chat_id, settings.telegram_detail_chat_id
 
-    args = parse()
-    date_id = args.date_id
-    mode = args.mode.lower()
-    block = args.nonblock
-
-    monthly_chat_id = load_env(
-        "TELEGRAM_MONTHLY_CHAT_ID", ".env", start_path=PathConfig.root
-    )
-    detail_chat_id = load_env(
-        "TELEGRAM_DETAIL_CHAT_ID", ".env", start_path=PathConfig.root
-    )
-    test_chat_id = load_env("TELEGRAM_TEST_CHAT_ID", ".env", start_path=PathConfig.root)
 
+def notify_trade(date_id: str, mode: str = "prod", block: bool = True):
+    """실거래/분양권 수집 결과로 월별 계약 현황과 신규 거래 메세지 전송"""
+    monthly_chat_id, detail_chat_id = _chat_ids(mode)
     sgg_contains = FilterConfig.sgg_contains
     apt_contains = FilterConfig.apt_contains
+    months = get_target_months(date_id)
 
     # 월별 계약 현황
-    for month in [last_month, this_month]:
+    for month in months:
         task_id = get_task_id(__file__, month, "monthly")
         msg = daily_aggregation(month, date_id=date_id, sgg_contains=sgg_contains)
-        chat_id = test_chat_id if mode == "test" else monthly_chat_id
 
         bm = BatchManager(task_id=task_id, key=date_id, block=block)
-        bm(task_type="message", func=send_message, text=msg, chat_id=chat_id)
+        bm(task_type="message", func=send_message, text=msg, chat_id=monthly_chat_id)
 
     # 신규 거래
-    for month in [last_month, this_month]:
+    for month in months:
         task_id = get_task_id(__file__, month, "daily_new_trade")
         msg = daily_new_trade(
             month, date_id=date_id, apt_contains=apt_contains, filter_new=True
         )
-        chat_id = test_chat_id if mode == "test" else detail_chat_id
 
         bm = BatchManager(task_id=task_id, key=date_id, block=block)
-        bm(task_type="message", func=send_message, text=msg, chat_id=chat_id)
+        bm(task_type="message", func=send_message, text=msg, chat_id=detail_chat_id)
+
+
+def notify_sales(date_id: str, mode: str = "prod", block: bool = True):
+    """매물 수집 결과로 매물 집계 메세지와 매물 추이 그래프(analysis.py에서 저장) 전송"""
+    monthly_chat_id, _ = _chat_ids(mode)
+    _, this_month = get_target_months(date_id)
 
     # 매물 집계
     task_id = get_task_id(__file__, this_month, "sales_aggregation")
     msg = sales_aggregation(date_id=date_id)
-    chat_id = test_chat_id if mode == "test" else monthly_chat_id
 
     bm = BatchManager(task_id=task_id, key=date_id, block=block)
     bm(
@@ -250,22 +212,37 @@ if __name__ == "__main__":
         task_id=task_id,
         func=send_message,
         text=msg,
-        chat_id=chat_id,
+        chat_id=monthly_chat_id,
     )
 
-    # 매물 그래프
-    sales_types = ["sales", "rent"]
+    # 매물 그래프, 매매/전세별로 앨범 하나씩 전송
+    sales_types = {"sales": "매매", "rent": "전세"}
     agg_types = ["mean", "median", "min", "count"]
-    for sales_type in sales_types:
-        for agg_type in agg_types:
-            bm = BatchManager(
-                task_id=get_task_id(__file__, date_id, f"{sales_type}_{agg_type}"),
-                key=date_id,
-                block=block,
-            )
-            bm(
-                task_type="photo",
-                func=send_photo,
-                photo=sales_trend(sales_type=sales_type, agg_type=agg_type),
-                chat_id=test_chat_id if mode == "test" else monthly_chat_id,
-            )
+    for sales_type, sales_name in sales_types.items():
+        bm = BatchManager(
+            task_id=get_task_id(__file__, date_id, f"{sales_type}_trend"),
+            key=date_id,
+            block=block,
+        )
+        bm(
+            task_type="media_group",
+            func=send_media_group,
+            photos=[
+                sales_trend(sales_type=sales_type, agg_type=agg_type)
+                for agg_type in agg_types
+            ],
+            caption=f"{sales_name} 매물 추이({date_id})",
+            chat_id=monthly_chat_id,
+        )
+
+
+if __name__ == "__main__":
+    args = parse()
+    date_id = args.date_id
+    mode = args.mode.lower()
+    block = args.nonblock
+
+    # scheduler의 notify_trade, notify_sales stage와 같은 task_id로 기록
+    for name, func in [("trade", notify_trade), ("sales", notify_sales)]:
+        bm = BatchManager(task_id=get_task_id(__file__, name), key=date_id, block=block)
+        bm(task_type="execute", func=func, date_id=date_id, mode=mode, block=block)
@@ -0,0 +1,306 @@
+import time
+from argparse import ArgumentParser
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+from loguru import logger
+
+import analysis
+import apt_trade
+import bunyang_trade
+import listing
+import notifier
+from utils import (
+    BatchManager,
+    Metastore,
+    MockServerConfig,
+    SchedulerConfig,
+    get_target_months,
+    get_task_id,
+    use_mock_server,
+)
+
+
+class Stage:
+    """파이프라인의 한 단계
+
+    Args:
+        name: stage 이름, 다른 stage의 depends에서 참조
+        task_id: metastore에서 체크할 task_id, 스크립트의 BatchManager와 같은 get_task_id 값
+        func: 실행할 함수
+        depends: 먼저 끝나야 하는 stage 이름 리스트
+        **kwargs: func의 keyword argument
+    """
+
+    def __init__(self, name: str, task_id: str, func, depends: list = None, **kwargs):
+        self.name = name
+        self.task_id = task_id
+        self.func = func
+        self.depends = depends or []
+        self.kwargs = kwargs
+
+    def __repr__(self):
+        return f"Stage({self.name}, depends={self.depends})"
+
+
+def build_stages(
+    date_id: str, mode: str = "prod", block: bool = True, processes: int = None
+):
+    """date_id 파이프라인의 stage 그래프
+
+    실거래/분양권(지난달, 이번달)과 매물 수집은 서로 독립이라 동시에 실행하고,
+    실거래 알림은 실거래/분양권 수집이 모두 끝난 뒤, 매물 알림은 매물 수집과 추이 그래프가 끝난 뒤 실행
+    수집 stage는 응답 캐시를 공유하지만 응답이 바뀌었는지는 main_task마다 CacheStats로 따로 집계함
+    task_id는 각 스크립트를 직접 실행할 때와 같은 값이라 어느 쪽으로 다시 실행해도 끝난 stage는 건너뜀
+
+    Args:
+        date_id: yyyy-MM-dd
+        mode: prod, test(알림을 테스트 chat_id로 전송)
+        block: notifier 메세지의 반복 전송을 블록킹할지 여부
+        processes: 매물 추이 그래프를 나눠 그릴 process 수
+    """
+    collectors = []
+    for month in get_target_months(date_id):
+        collectors += [
+            Stage(
+                f"trade_{month}",
+                get_task_id(apt_trade.__file__, month),
+                apt_trade.main_task,
+                month=month,
+                date_id=date_id,
+            ),
+            Stage(
+                f"bunyang_{month}",
+                get_task_id(bunyang_trade.__file__, month),
+                bunyang_trade.main_task,
+                month=month,
+                date_id=date_id,
+            ),
+        ]
+    sales_names = list(listing.DATA_TYPE.keys())
+    return collectors + [
+        Stage(
+            "listing",
+            get_task_id(listing.__file__, *sales_names),
+            listing.main_task,
+            date_id=date_id,
+            sales_names=sales_names,
+        ),
+        Stage(
+            "trend",
+            get_task_id(analysis.__file__, date_id, "trend"),
+            analysis.render_trends,
+            depends=["listing"],
+            date_id=date_id,
+            apt_names=analysis.TREND_APT_NAMES,
+            processes=processes,
+        ),
+        Stage(
+            "notify_trade",
+            get_task_id(notifier.__file__, "trade"),
+            notifier.notify_trade,
+            depends=[stage.name for stage in collectors],
+            date_id=date_id,
+            mode=mode,
+            block=block,
+        ),
+        Stage(
+            "notify_sales",
+            get_task_id(notifier.__file__, "sales"),
+            notifier.notify_sales,
+            depends=["listing", "trend"],
+            date_id=date_id,
+            mode=mode,
+            block=block,
+        ),
+    ]
+
+
+def sort_stages(stages: list):
+    """depends 순서대로 정렬, 없는 stage에 의존하거나 순환이 있으면 ValueError"""
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        unknown = set(stage.depends) - set(by_name)
+        if unknown:
+            raise ValueError(
+                f"{stage.name} depends on unknown stages {sorted(unknown)}"
+            )
+    ordered, visiting = {}, set()
+
+    def visit(stage: Stage):
+        if stage.name in ordered:
+            return
+        if stage.name in visiting:
+            raise ValueError(f"cycle detected at {stage.name}")
+        visiting.add(stage.name)
+        for dep in stage.depends:
+            visit(by_name[dep])
+        visiting.discard(stage.name)
+        ordered[stage.name] = stage
+
+    for stage in stages:
+        visit(stage)
+    return list(ordered.values())
+
+
+def run_stage(stage: Stage, date_id: str, block: bool = True):
+    """stage 하나를 실행하고 성공하면 metastore에 task_id를 기록
+    BatchManager와 달리 실행이 끝난 뒤 기록하므로 실패한 stage는 다음 실행 때 다시 시도
+
+    Returns: 실행했으면 True, 이미 실행되어 건너뛰었으면 False
+    """
+    if block and Metastore().contains(key=date_id, task_id=stage.task_id):
+        logger.info(f"{stage.task_id} already executed.")
+        return False
+    start = time.monotonic()
+    stage.func(**stage.kwargs)
+    if block:
+        Metastore().add_task(key=date_id, task_id=stage.task_id)
+    logger.info(f"{stage.name} completed in {time.monotonic() - start:.1f}s")
+    return True
+
+
+def run_pipeline(stages: list, date_id: str, block: bool = True, workers: int = None):
+    """stage 그래프를 thread pool에서 실행, depends가 모두 끝난 stage부터 바로 시작
+    실패한 stage에 의존하는 stage는 실행하지 않음
+
+    Args:
+        stages: Stage 리스트
+        date_id: metastore의 key
+        block: 이미 실행된 stage를 건너뛸지 여부
+        workers: 동시에 실행할 stage 수, default SchedulerConfig.workers
+
+    Returns: {stage 이름: done, failed, skipped}
+    """
+    stages = sort_stages(stages)
+    status, running = {}, {}
+    with ThreadPoolExecutor(
+        max_workers=workers or SchedulerConfig.workers, thread_name_prefix="stage"
+    ) as pool:
+        while True:
+            # 정렬된 순서라 한 번만 훑어도 실패의 전파까지 처리됨
+            for stage in stages:
+                if stage.name in status or stage.name in running.values():
+                    continue
+                deps = [status.get(dep) for dep in stage.depends]
+                if any(dep in ("failed", "skipped") for dep in deps):
+                    status[stage.name] = "skipped"
+                    logger.warning(f"{stage.name} skipped, upstream failed")
+                elif all(dep == "done" for dep in deps):
+                    running[pool.submit(run_stage, stage, date_id, block)] = stage.name
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    status[name] = "failed"
+                    _report_failure(name, date_id, e)
+                else:
+                    status[name] = "done"
+    return status
+
+
+def _report_failure(name: str, date_id: str, error: Exception):
+    msg = f"scheduler {name}({date_id})\n:{repr(error)}"
+    logger.error(msg)
+    try:
+        BatchManager(task_id=name, key=date_id).send_log(
+            text=msg, chat_id=None, token=None
+        )
+    except Exception as e:
+        logger.error(f"send_log failed: {e!r}")
+
+
+def run_once(
+    date_id: str,
+    mode: str = "prod",
+    block: bool = True,
+    workers: int = None,
+    processes: int = None,
+):
+    """date_id 파이프라인을 한 번 실행"""
+    logger.info(f"Scheduler: {date_id} pipeline start")
+    start = time.monotonic()
+    stages = build_stages(date_id, mode=mode, block=block, processes=processes)
+    status = run_pipeline(stages, date_id, block=block, workers=workers)
+    logger.info(
+        f"Scheduler: {date_id} pipeline finished in {time.monotonic() - start:.1f}s {status}"
+    )
+    return status
+
+
+def next_run(now: datetime = None):
+    """now 이후 SchedulerConfig.hours 중 가장 빠른 실행 시각"""
+    now = now or datetime.now()
+    for days in [0, 1]:
+        day = now + timedelta(days=days)
+        for hour in sorted(SchedulerConfig.hours):
+            run_at = day.replace(
+                hour=hour, minute=SchedulerConfig.minute, second=0, microsecond=0
+            )
+            if run_at > now:
+                return run_at
+    raise ValueError("SchedulerConfig.hours is empty")
+
+
+def serve(
+    mode: str = "prod", block: bool = True, workers: int = None, processes: int = None
+):
+    """SchedulerConfig.hours마다 그날의 파이프라인을 실행하는 long-running loop"""
+    while True:
+        run_at = next_run()
+        logger.info(f"Scheduler: next run at {run_at}")
+        time.sleep(max(0.0, (run_at - datetime.now()).total_seconds()))
+        try:
+            run_once(
+                run_at.strftime("%Y-%m-%d"),
+                mode=mode,
+                block=block,
+                workers=workers,
+                processes=processes,
+            )
+        except Exception as e:
+            _report_failure("pipeline", run_at.strftime("%Y-%m-%d"), e)
+
+
+def parse():
+    parser = ArgumentParser()
+    parser.add_argument("--mode", default="prod", choices=["prod", "test"])
+    parser.add_argument("--nonblock", default=True, action="store_false")
+    parser.add_argument("--once", default=False, action="store_true")
+    parser.add_argument(
+        "--date_id", default=datetime.now().strftime("%Y-%m-%d"), action="store"
+    )
+    parser.add_argument("--workers", default=None, type=int, action="store")
+    parser.add_argument(
+        "--processes", default=SchedulerConfig.processes, type=int, action="store"
+    )
+    parser.add_argument(
+        "--mock_url",
+        default=MockServerConfig.url,
+        action="store",
+        help="mock_server.py 주소로 수집, ex) http://127.0.0.1:8800",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse()
+    if args.mock_url:
+        use_mock_server(args.mock_url)
+    mode = args.mode.lower()
+    block = args.nonblock
+
+    if args.once:
+        run_once(
+            args.date_id,
+            mode=mode,
+            block=block,
+            workers=args.workers,
+            processes=args.processes,
+        )
+    else:
+        serve(mode=mode, block=block, workers=args.workers, processes=args.processes)
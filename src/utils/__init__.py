@@ -1,6 +1,19 @@
+from .aggregates import *  # noqa: F403
 from .api import *  # noqa: F403
+from .cache import *  # noqa: F403
+from .client import *  # noqa: F403
 from .config import *  # noqa: F403
+from .dashboard import *  # noqa: F403
+from .dataset import *  # noqa: F403
+from .dispatcher import *  # noqa: F403
+from .listing_log import *  # noqa: F403
 from .metastore import *  # noqa: F403
 from .processing import *  # noqa: F403
+from .query import *  # noqa: F403
+from .region import *  # noqa: F403
+from .responses import *  # noqa: F403
+from .schema import *  # noqa: F403
+from .settings import *  # noqa: F403
+from .storage import *  # noqa: F403
 from .template import *  # noqa: F403
 from .utils import *  # noqa: F403
@@ -0,0 +1,194 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Literal
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from loguru import logger
+
+from .config import PathConfig
+from .processing import prepare_dataframe
+from .schema import SCHEMAS, conform, to_table
+
+# 집계 테이블별 hive 파티션 컬럼, 수집 단위(data_type, month_id, date_id)마다 따로 교체
+AGGREGATE_PARTITIONS = {
+    "trade_daily": ["data_type", "month_id", "date_id"],
+    "sales_daily": ["data_type", "date_id"],
+}
+
+# 매물은 date_id 기준 이 기간 안에 확인된 것만 집계
+VALID_LISTING_DAYS = 28
+
+
+def _aggregate_path(name: str):
+    return Path(PathConfig.aggregates).joinpath(name)
+
+
+def _partition_file(name: str, **keys):
+    """파티션마다 파일 하나만 저장"""
+    path = _aggregate_path(name)
+    for col in AGGREGATE_PARTITIONS[name]:
+        path = path.joinpath(f"{col}={keys[col]}")
+    return path.joinpath("part-0.parquet")
+
+
+def _read_partition(name: str, **keys):
+    """파티션 파일 하나를 바로 읽기(디렉토리 탐색 없음), 파일이 없으면 None"""
+    path = _partition_file(name, **keys)
+    if not path.exists():
+        return None
+    df = pq.read_table(path).to_pandas(date_as_object=False)
+    return conform(df.assign(**keys), name)
+
+
+def aggregate_trade(df: pd.DataFrame):
+    """실거래/분양권 스냅샷 하나를 시군구별 거래수(계약일), 해지수(계약해지여부), 신규수(신규거래)로 집계"""
+    if len(df) == 0:
+        return pd.DataFrame(columns=["시군구코드", "거래수", "해지수", "신규수"])
+    agg = (
+        df[["계약일", "계약해지여부", "신규거래"]]
+        .groupby(df["시군구코드"].astype(str))
+        .count()
+        .reset_index()
+    )
+    agg.columns = ["시군구코드", "거래수", "해지수", "신규수"]
+    return agg
+
+
+def aggregate_sales(df: pd.DataFrame, date_id: str):
+    """매매/전세 스냅샷 하나에서 date_id 기준 VALID_LISTING_DAYS일 안에 확인된 매물을 (아파트명, 면적구분)별로 집계
+
+    Returns: 아파트명, 면적구분, 평균, 중앙, 최대, 최저, 매물수(가격은 원)
+    """
+    columns = ["아파트명", "면적구분", "평균", "중앙", "최대", "최저", "매물수"]
+    if len(df) == 0:
+        return pd.DataFrame(columns=columns)
+    base_date = datetime.strptime(date_id, "%Y-%m-%d") - timedelta(
+        days=VALID_LISTING_DAYS
+    )
+    data = df[df["확인날짜"] >= base_date]
+    agg = (
+        data.groupby([data["아파트명"].astype(str), data["면적구분"].astype(str)])[
+            "가격"
+        ]
+        .agg(["mean", "median", "max", "min", "count"])
+        .reset_index()
+    )
+    agg.columns = columns
+    return agg
+
+
+def write_aggregates(
+    df: pd.DataFrame, name: Literal["trade_daily", "sales_daily"], **keys
+):
+    """집계 결과를 파티션 하나로 저장, 같은 파티션의 기존 파일은 교체
+
+    Args:
+        df: aggregate_trade, aggregate_sales 결과
+        name: trade_daily, sales_daily
+        **keys: 파티션 값(data_type, month_id, date_id)
+    """
+    path = _partition_file(name, **keys)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    schema = pa.schema(
+        [
+            field
+            for field in SCHEMAS[name]
+            if field.name not in AGGREGATE_PARTITIONS[name]
+        ]
+    )
+    # 읽는 쪽에서 반쯤 쓴 파일을 보지 않도록 임시 파일(_로 시작해서 dataset 탐색에서 제외)에 쓰고 교체
+    tmp = path.with_name(f"_{path.name}.tmp")
+    pq.write_table(to_table(df, name, schema=schema), tmp)
+    tmp.replace(path)
+
+
+def read_aggregates(name: Literal["trade_daily", "sales_daily"], **keys):
+    """저장된 집계를 파티션 값으로 필터링해서 읽기
+
+    Args:
+        name: trade_daily, sales_daily
+        **keys: 필터링할 파티션 값(data_type, month_id, date_id)
+
+    Returns: 파티션 컬럼이 붙은 DataFrame, 없으면 빈 DataFrame
+    """
+    path = _aggregate_path(name)
+    if not path.exists():
+        return pd.DataFrame()
+    partitioning = pa.schema(
+        [SCHEMAS[name].field(col) for col in AGGREGATE_PARTITIONS[name]]
+    )
+    dataset = ds.dataset(
+        str(path),
+        format="parquet",
+        partitioning=ds.partitioning(partitioning, flavor="hive"),
+    )
+    expr = None
+    for col, value in keys.items():
+        if value is None:
+            continue
+        cond = ds.field(col) == (int(value) if col == "month_id" else str(value))
+        expr = cond if expr is None else expr & cond
+    df = dataset.to_table(filter=expr).to_pandas(date_as_object=False)
+    return conform(df, name)
+
+
+def update_trade_aggregates(
+    data_type: Literal["trade", "bunyang"], df: pd.DataFrame, month_id, date_id: str
+):
+    """수집 직후 저장한 스냅샷으로 trade_daily의 (data_type, month_id, date_id) 파티션을 갱신"""
+    write_aggregates(
+        aggregate_trade(df),
+        "trade_daily",
+        data_type=data_type,
+        month_id=int(month_id),
+        date_id=date_id,
+    )
+
+
+def update_sales_aggregates(
+    data_type: Literal["sales", "rent"], df: pd.DataFrame, date_id: str
+):
+    """수집 직후 저장한 스냅샷으로 sales_daily의 (data_type, date_id) 파티션을 갱신"""
+    write_aggregates(
+        aggregate_sales(conform(df, data_type), date_id),
+        "sales_daily",
+        data_type=data_type,
+        date_id=date_id,
+    )
+
+
+def get_trade_aggregates(
+    data_type: Literal["trade", "bunyang"], month_id, date_id: str
+):
+    """trade_daily에서 (data_type, month_id, date_id) 집계를 읽기
+    아직 집계하지 않은 파티션(집계 도입 이전 날짜 등)은 스냅샷에서 집계해서 저장한 뒤 반환
+    """
+    keys = {"data_type": data_type, "month_id": int(month_id), "date_id": date_id}
+    agg = _read_partition("trade_daily", **keys)
+    if agg is None:
+        df = prepare_dataframe(data_type=data_type, month_id=month_id, date_id=date_id)
+        if len(df) == 0:
+            return aggregate_trade(df)
+        logger.info(f"Materialize trade_daily for {keys}")
+        update_trade_aggregates(data_type, df, month_id=month_id, date_id=date_id)
+        agg = _read_partition("trade_daily", **keys)
+    return agg
+
+
+def get_sales_aggregates(data_type: Literal["sales", "rent"], date_id: str):
+    """sales_daily에서 (data_type, date_id) 집계를 읽기
+    아직 집계하지 않은 파티션은 스냅샷에서 집계해서 저장한 뒤 반환
+    """
+    keys = {"data_type": data_type, "date_id": date_id}
+    agg = _read_partition("sales_daily", **keys)
+    if agg is None:
+        df = prepare_dataframe(data_type=data_type, date_id=date_id)
+        if len(df) == 0:
+            return aggregate_sales(df, date_id)
+        logger.info(f"Materialize sales_daily for {keys}")
+        update_sales_aggregates(data_type, df, date_id=date_id)
+        agg = _read_partition("sales_daily", **keys)
+    return agg
@@ -1,14 +1,46 @@
 from typing import Literal
-from .utils import load_env
-from .config import URLConfig
-import requests
+from .utils import parse_total_count
+from .settings import Settings, get_settings
+from .config import URLConfig, APIConfig
+from .client import HTTPClient, http_get
+from .cache import CacheStats, ResponseCache
+from functools import partial
+from urllib.parse import urlsplit
+import asyncio
+import json
+import math
 
-def get_public_api_data(url_key: Literal["아파트실거래", "분양권실거래"] = None, serviceKey: str = None, base_url: str = None, **kwargs):
+# mock_server.py가 대신 응답하는 endpoint(URLConfig.URL의 키)와 원래 URL
+MOCK_URL_KEYS = ["아파트실거래", "분양권실거래", "네이버매물"]
+_PRODUCTION_URL = {key: URLConfig.URL[key] for key in MOCK_URL_KEYS}
+
+
+def use_mock_server(url: str = None):
+    """MOCK_URL_KEYS의 URLConfig.URL을 mock_server.py로 바꿈, 원래 URL의 path는 그대로 사용
+    url이 None이면 원래 URL로 되돌림
+
+    Args:
+        url: mock 서버 주소, ex) http://127.0.0.1:8800
+    """
+    for key, production in _PRODUCTION_URL.items():
+        URLConfig.URL[key] = (
+            f"{url.rstrip('/')}{urlsplit(production).path}" if url else production
+        )
+
+
+def get_public_api_data(
+    url_key: Literal["아파트실거래", "분양권실거래"] = None,
+    serviceKey: str = None,
+    base_url: str = None,
+    settings: Settings = None,
+    **kwargs,
+):
     """공공데이터에서 Request 함수처리
 
     Args:
         serviceKey: 발급받은 인증키
         base_url: API의 엔트리포인트 URL
+        settings: serviceKey 기본값을 가져올 Settings, default get_settings()
         params:
             LAWD_CD: 법정동코드
             DEAL_YMD: 거래 연월 YYYYMM
@@ -20,13 +52,19 @@ def get_public_api_data(url_key: Literal["아파트실거래", "분양권실거
     if url_key:
         base_url = URLConfig.URL[url_key]
     if not serviceKey:
-        serviceKey = load_env(key="PUBLIC_DATA_API_KEY", fname=".env")
+        serviceKey = (settings or get_settings()).public_data_api_key
     params = dict(serviceKey=serviceKey)
     params.update(kwargs)
-    response = requests.get(url=base_url, params=params)
+    response = http_get(base_url, params=params)
     return response
 
-def get_naver_sales_api_data(url_key: Literal["네이버매물"] = None, base_url: str = None, headers: dict = None, **kwargs):
+
+def get_naver_sales_api_data(
+    url_key: Literal["네이버매물"] = None,
+    base_url: str = None,
+    headers: dict = None,
+    **kwargs,
+):
     """네이버 front-api에서 데이터 가져오기
 
     Args:
@@ -44,10 +82,257 @@ def get_naver_sales_api_data(url_key: Literal["네이버매물"] = None, base_ur
     if not headers:
         headers = {"User-Agent": URLConfig.FakeAgent}
     params = {
-        "complexNumber": kwargs['apt_code'],
-        "tradeTypes": kwargs['sales_code'],
+        "complexNumber": kwargs["apt_code"],
+        "tradeTypes": kwargs["sales_code"],
+        "userChannelType": "PC",
+        "page": kwargs["page"],
+    }
+    response = http_get(base_url, params=params, headers=headers)
+    return response
+
+
+def _text_getter(
+    client: HTTPClient,
+    cache: ResponseCache = None,
+    endpoint: str = None,
+    stats: CacheStats = None,
+):
+    """요청 함수(url, params) -> 본문 텍스트, cache가 있으면 캐시 정책을 거쳐서 요청하고 stats에 집계"""
+    if cache is None:
+        return client.get_text
+    return partial(cache.get_text, client, endpoint=endpoint, stats=stats)
+
+
+async def _fetch_public_api_pages(
+    get_text,
+    base_url: str,
+    serviceKey: str,
+    lawd_cd: str,
+    deal_ymd: str,
+    num_of_rows: int,
+):
+    """(lawd_cd, deal_ymd) 한 쌍의 모든 페이지를 가져옴
+    첫 페이지를 num_of_rows로 요청해서 totalCount를 읽고, 나머지 페이지만 추가로 요청한다
+    """
+    params = dict(
+        serviceKey=serviceKey,
+        LAWD_CD=str(lawd_cd),
+        DEAL_YMD=str(deal_ymd),
+        numOfRows=num_of_rows,
+    )
+    first = await get_text(base_url, {**params, "pageNo": 1})
+    total_cnt = parse_total_count(first)  # 전체 건수
+    if total_cnt == 0:
+        return []
+    iteration = math.ceil(
+        total_cnt / num_of_rows
+    )  # num_of_rows마다 request할 때 페이지 수
+    rest = await asyncio.gather(
+        *[
+            get_text(base_url, {**params, "pageNo": page_no})
+            for page_no in range(2, iteration + 1)
+        ]
+    )
+    return [first, *rest]
+
+
+async def fetch_public_api_data(
+    url_key: Literal["아파트실거래", "분양권실거래"] = None,
+    lawd_cd_list: list = None,
+    deal_ymd_list: list = None,
+    serviceKey: str = None,
+    base_url: str = None,
+    concurrency: int = None,
+    num_of_rows: int = None,
+    settings: Settings = None,
+    cache: ResponseCache = None,
+    cache_stats: CacheStats = None,
+):
+    """공공데이터 API를 asyncio로 가져오는 수집 엔진
+    하나의 keep-alive 커넥션 풀에서 lawd_cd x deal_ymd 전체 조합을 동시에 요청한다
+
+    Args:
+        url_key: URLConfig.URL의 키
+        lawd_cd_list: 법정동코드 5자리 리스트
+        deal_ymd_list: 거래 연월 YYYYMM 리스트
+        serviceKey: 발급받은 인증키
+        base_url: API의 엔트리포인트 URL
+        concurrency: 동시 요청 수, default APIConfig.concurrency
+        num_of_rows: 페이지당 Row 수, default APIConfig.num_of_rows
+        settings: serviceKey 기본값을 가져올 Settings, default get_settings()
+        cache: 응답 캐시, 지정하면 CacheConfig.policy에 따라 캐시된 응답을 사용
+        cache_stats: 이 호출의 캐시 결과(바뀐 응답 수 등)를 집계할 CacheStats, 호출마다 새로 만들어서 전달
+
+    Returns: {(lawd_cd, deal_ymd): [페이지별 response.text]}, 데이터가 없으면 빈 리스트
+    """
+    if not url_key and not base_url:
+        raise ValueError("one of 'url_key' or 'base_url' should be specified")
+    if url_key:
+        base_url = URLConfig.URL[url_key]
+    if not serviceKey:
+        serviceKey = (settings or get_settings()).public_data_api_key
+    if not concurrency:
+        concurrency = APIConfig.concurrency
+    if not num_of_rows:
+        num_of_rows = APIConfig.num_of_rows
+
+    pairs = [
+        (lawd_cd, deal_ymd) for deal_ymd in deal_ymd_list for lawd_cd in lawd_cd_list
+    ]
+    async with HTTPClient(concurrency=concurrency) as client:
+        get_text = _text_getter(
+            client, cache, endpoint=url_key or base_url, stats=cache_stats
+        )
+        result = await asyncio.gather(
+            *[
+                _fetch_public_api_pages(
+                    get_text,
+                    base_url,
+                    serviceKey,
+                    lawd_cd,
+                    deal_ymd,
+                    num_of_rows,
+                )
+                for lawd_cd, deal_ymd in pairs
+            ]
+        )
+    return dict(zip(pairs, result))
+
+
+async def stream_public_api_data(
+    url_key: Literal["아파트실거래", "분양권실거래"] = None,
+    pairs: list = None,
+    serviceKey: str = None,
+    base_url: str = None,
+    concurrency: int = None,
+    num_of_rows: int = None,
+    settings: Settings = None,
+):
+    """(lawd_cd, deal_ymd) 작업 단위를 concurrency개의 worker가 나눠서 가져오고, 끝난 순서대로 반환
+    전체 결과를 메모리에 모으지 않으므로 여러 해를 받는 backfill처럼 작업 단위가 많을 때 사용
+
+    Args:
+        url_key: URLConfig.URL의 키
+        pairs: [(lawd_cd, deal_ymd)] 작업 단위 리스트
+        serviceKey: 발급받은 인증키
+        base_url: API의 엔트리포인트 URL
+        concurrency: worker 수이자 동시 요청 수, default APIConfig.concurrency
+        num_of_rows: 페이지당 Row 수, default APIConfig.num_of_rows
+        settings: serviceKey 기본값을 가져올 Settings, default get_settings()
+
+    Yields: ((lawd_cd, deal_ymd), 페이지별 response.text 리스트), 실패한 작업 단위는 리스트 대신 Exception
+    """
+    if not url_key and not base_url:
+        raise ValueError("one of 'url_key' or 'base_url' should be specified")
+    if url_key:
+        base_url = URLConfig.URL[url_key]
+    if not serviceKey:
+        serviceKey = (settings or get_settings()).public_data_api_key
+    if not concurrency:
+        concurrency = APIConfig.concurrency
+    if not num_of_rows:
+        num_of_rows = APIConfig.num_of_rows
+
+    todo = asyncio.Queue()
+    for pair in pairs:
+        todo.put_nowait(pair)
+    done = asyncio.Queue()
+    async with HTTPClient(concurrency=concurrency) as client:
+
+        async def worker():
+            while not todo.empty():
+                lawd_cd, deal_ymd = todo.get_nowait()
+                try:
+                    texts = await _fetch_public_api_pages(
+                        client.get_text,
+                        base_url,
+                        serviceKey,
+                        lawd_cd,
+                        deal_ymd,
+                        num_of_rows,
+                    )
+                except Exception as e:
+                    # 어떤 에러든 작업 단위마다 결과를 하나씩 넣어야 소비하는 쪽이 done.get()에서 멈추지 않음
+                    texts = e
+                await done.put(((lawd_cd, deal_ymd), texts))
+
+        workers = [
+            asyncio.create_task(worker()) for _ in range(min(concurrency, len(pairs)))
+        ]
+        try:
+            for _ in range(len(pairs)):
+                yield await done.get()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def _fetch_json(get_text, base_url: str, params: dict):
+    """GET 요청 후 json으로 반환(content-type과 관계없이 본문을 바로 decode)"""
+    return json.loads(await get_text(base_url, params))
+
+
+async def _fetch_naver_listing_pages(
+    get_text,
+    base_url: str,
+    apt_code: str,
+    sales_code: str,
+):
+    """(apt_code, sales_code) 한 쌍의 모든 페이지를 가져옴
+    첫 페이지(page=0)에서 totalCount를 읽고 그 응답도 결과로 사용, 나머지 페이지만 추가로 요청한다
+    """
+    params = {
+        "complexNumber": apt_code,
+        "tradeTypes": sales_code,
         "userChannelType": "PC",
-        "page": kwargs['page']
     }
-    response = requests.get(url=base_url, params=params, headers=headers)
-    return response
\ No newline at end of file
+    first = await _fetch_json(get_text, base_url, {**params, "page": 0})
+    total_cnt = first["result"]["totalCount"]
+    rest = await asyncio.gather(
+        *[
+            _fetch_json(get_text, base_url, {**params, "page": page})
+            for page in range(1, total_cnt // APIConfig.naver_page_size + 1)
+        ]
+    )
+    return [first, *rest]
+
+
+async def fetch_naver_listing_data(
+    pairs: list,
+    url_key: Literal["네이버매물"] = "네이버매물",
+    base_url: str = None,
+    headers: dict = None,
+    concurrency: int = None,
+    cache: ResponseCache = None,
+    cache_stats: CacheStats = None,
+):
+    """네이버 매물 API를 하나의 keep-alive 커넥션 풀에서 (단지, 거래 타입) 전체 조합에 대해 동시에 요청
+
+    Args:
+        pairs: [(apt_code, sales_code)] 리스트, FilterConfig.apt_code와 sales_code의 값
+        url_key: URLConfig.URL의 키
+        base_url: API의 엔트리포인트 URL, 지정하면 url_key보다 우선
+        headers: 요청 헤더, default FakeAgent
+        concurrency: 동시 요청 수, default APIConfig.naver_concurrency
+        cache: 응답 캐시, 지정하면 CacheConfig.policy에 따라 캐시된 응답을 사용
+        cache_stats: 이 호출의 캐시 결과(바뀐 응답 수 등)를 집계할 CacheStats, 호출마다 새로 만들어서 전달
+
+    Returns: {(apt_code, sales_code): [페이지별 json]}
+    """
+    if not base_url:
+        base_url = URLConfig.URL[url_key]
+    if not headers:
+        headers = {"User-Agent": URLConfig.FakeAgent}
+    if not concurrency:
+        concurrency = APIConfig.naver_concurrency
+
+    async with HTTPClient(concurrency=concurrency, headers=headers) as client:
+        get_text = _text_getter(client, cache, endpoint=url_key, stats=cache_stats)
+        result = await asyncio.gather(
+            *[
+                _fetch_naver_listing_pages(get_text, base_url, apt_code, sales_code)
+                for apt_code, sales_code in pairs
+            ]
+        )
+    return dict(zip(pairs, result))
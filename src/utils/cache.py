@@ -0,0 +1,267 @@
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from loguru import logger
+
+from .client import HTTPClient
+from .config import CacheConfig, PathConfig
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+"""
+
+# 캐시 key에서 제외할 파라미터(인증키가 바뀌어도 같은 응답)
+_IGNORED_PARAMS = {"serviceKey"}
+
+
+class CacheStats:
+    """수집 한 번(fetch 호출 하나)의 캐시 결과 집계, 호출하는 쪽에서 만들어서 ResponseCache.get_text에 전달
+    ResponseCache는 프로세스에서 공유하므로 수집마다 따로 집계해야 다른 수집의 결과와 섞이지 않음
+
+    Attributes:
+        hits: ttl 안이라 요청하지 않고 캐시에서 반환한 수
+        not_modified: 304 또는 본문 digest가 같아서 변경되지 않은 응답 수
+        changed: 새로 생겼거나 본문이 바뀐 응답 수
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.not_modified = 0
+        self.changed = 0
+
+
+class ResponseCache:
+    """API 응답 본문을 sha256으로 저장하는 디스크 캐시
+
+    응답 본문은 objects/{digest[:2]}/{digest}.gz에 한 번만 저장하고(content-addressed),
+    (url, 파라미터)별로 마지막 응답의 digest를 index.sqlite에 기록한다
+    같은 요청의 새 응답 digest가 이전과 같으면 변경되지 않은 것으로 기록(CacheStats)
+    여러 thread의 수집이 같은 인스턴스를 공유하므로 index 접근은 lock으로 직렬화
+
+    Args:
+        path: 캐시 폴더, default PathConfig.cache
+    """
+
+    def __init__(self, path: str = None):
+        self.path = Path(path or PathConfig.cache)
+        self._conn = None
+        self._lock = threading.RLock()
+
+    @property
+    def db(self):
+        with self._lock:
+            if self._conn is None:
+                os.makedirs(self.path, exist_ok=True)
+                self._conn = sqlite3.connect(
+                    self.path.joinpath("index.sqlite"),
+                    check_same_thread=False,
+                    isolation_level=None,
+                )
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.executescript(_SCHEMA)
+            return self._conn
+
+    def _execute(self, sql: str, params: tuple = ()):
+        """index에 sql을 실행해서 결과 row 리스트를 반환"""
+        with self._lock:
+            return self.db.execute(sql, params).fetchall()
+
+    @staticmethod
+    def make_key(url: str, params: dict = None):
+        """url과 파라미터(순서 무관, 인증키 제외)로 만든 캐시 key"""
+        params = {
+            k: str(v) for k, v in (params or {}).items() if k not in _IGNORED_PARAMS
+        }
+        raw = json.dumps([url, sorted(params.items())], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get_policy(endpoint: str):
+        return CacheConfig.policy.get(endpoint, CacheConfig.default_policy)
+
+    def get_ttl(self, endpoint: str, params: dict = None):
+        """endpoint 정책의 ttl, 이번 달 이전 DEAL_YMD는 past_ttl 사용"""
+        policy = self.get_policy(endpoint)
+        deal_ymd = str((params or {}).get("DEAL_YMD", ""))
+        if deal_ymd and deal_ymd < datetime.now().strftime("%Y%m"):
+            return policy.get("past_ttl", policy["ttl"])
+        return policy["ttl"]
+
+    def _blob_path(self, digest: str):
+        return self.path.joinpath("objects", digest[:2], f"{digest}.gz")
+
+    def _read(self, digest: str):
+        path = self._blob_path(digest)
+        if not path.exists():
+            return None
+        return gzip.decompress(path.read_bytes()).decode("utf-8")
+
+    def _write(self, digest: str, body: bytes):
+        path = self._blob_path(digest)
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(gzip.compress(body, compresslevel=6))
+        os.replace(tmp, path)
+
+    def _lookup(self, key: str):
+        rows = self._execute(
+            "SELECT digest, etag, last_modified, fetched_at FROM responses WHERE key = ?",
+            (key,),
+        )
+        return rows[0] if rows else None
+
+    async def get_text(
+        self,
+        client: HTTPClient,
+        url: str,
+        params: dict = None,
+        endpoint: str = None,
+        stats: CacheStats = None,
+    ):
+        """캐시 정책에 따라 client로 요청하거나 캐시된 응답을 반환
+
+        - ttl 안이면 요청하지 않고 캐시된 본문 반환
+        - ttl이 지났으면 ETag/Last-Modified가 있을 때 조건부 요청, 304면 캐시된 본문 반환
+        - 새 본문은 digest를 비교해서 이전과 같으면 변경되지 않은 것으로 기록
+
+        Args:
+            client: 요청에 사용할 HTTPClient
+            url: 요청 url
+            params: 요청 파라미터
+            endpoint: 정책을 찾을 이름(URLConfig.URL의 키), default url
+            stats: 결과를 집계할 호출별 CacheStats
+        """
+        stats = stats or CacheStats()
+        endpoint = endpoint or url
+        key = self.make_key(url, params)
+        row = self._lookup(key)
+        now = time.time()
+        cached = None
+        if row is not None:
+            digest, etag, last_modified, fetched_at = row
+            cached = self._read(digest)
+            if cached is not None and now - fetched_at < self.get_ttl(endpoint, params):
+                stats.hits += 1
+                self._touch(key, now)
+                return cached
+
+        headers = {}
+        if cached is not None:
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        response = await client.get(url, params=params, headers=headers or None)
+        if response.status == 304 and cached is not None:
+            stats.not_modified += 1
+            self._touch(key, now, fetched=True)
+            return cached
+
+        body = response.text.encode("utf-8")
+        new_digest = hashlib.sha256(body).hexdigest()
+        if cached is not None and new_digest == digest:
+            stats.not_modified += 1
+        else:
+            stats.changed += 1
+        with self._lock:
+            self._write(new_digest, body)
+            self._execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, endpoint, digest, size, etag, last_modified, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    endpoint,
+                    new_digest,
+                    len(body),
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    now,
+                    now,
+                ),
+            )
+        return response.text
+
+    def _touch(self, key: str, now: float, fetched: bool = False):
+        if fetched:
+            self._execute(
+                "UPDATE responses SET accessed_at = ?, fetched_at = ? WHERE key = ?",
+                (now, now, key),
+            )
+        else:
+            self._execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+
+    def evict(self):
+        """endpoint별 max_age가 지난 응답을 지우고, 전체 크기가 max_bytes를 넘으면 오래 사용하지 않은 응답부터 삭제
+        더 이상 참조되지 않는 본문 파일도 삭제
+
+        Returns: 삭제한 응답 수
+        """
+        now = time.time()
+        with self._lock:
+            before = self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            endpoints = [
+                e for (e,) in self.db.execute("SELECT DISTINCT endpoint FROM responses")
+            ]
+            for endpoint in endpoints:
+                max_age = self.get_policy(endpoint)["max_age"]
+                self.db.execute(
+                    "DELETE FROM responses WHERE endpoint = ? AND accessed_at < ?",
+                    (endpoint, now - max_age),
+                )
+            total = 0
+            for key, size in self.db.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at DESC"
+            ).fetchall():
+                total += size
+                if total > CacheConfig.max_bytes:
+                    self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            after = self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+            # 다른 수집이 본문을 저장하고 index에 기록하는 사이에 지우지 않도록 lock 안에서 정리
+            alive = {
+                d for (d,) in self.db.execute("SELECT DISTINCT digest FROM responses")
+            }
+            for path in self.path.joinpath("objects").glob("*/*.gz"):
+                if path.name[: -len(".gz")] not in alive:
+                    path.unlink()
+        if before != after:
+            logger.info(f"Evicted {before - after} cached responses")
+        return before - after
+
+
+_CACHES: dict = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_response_cache(path: str = None):
+    """프로세스에서 path마다 하나씩 공유하는 ResponseCache, CacheConfig.enabled가 False면 None"""
+    if not CacheConfig.enabled:
+        return None
+    path = str(path or PathConfig.cache)
+    cache = _CACHES.get(path)
+    if cache is None:
+        with _CACHES_LOCK:
+            cache = _CACHES.setdefault(path, ResponseCache(path))
+    return cache
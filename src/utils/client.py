@@ -0,0 +1,349 @@
+import asyncio
+import random
+import threading
+import time
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+from loguru import logger
+
+from .config import HTTPConfig
+
+# 재시도할 HTTP status, 429/503은 서버가 요청을 줄이라는 신호로 보고 rate도 낮춤
+RETRY_STATUS = {429, 500, 502, 503, 504}
+THROTTLE_STATUS = {429, 503}
+
+
+class HTTPResponse(NamedTuple):
+    status: int
+    text: str
+    headers: dict
+
+
+class CircuitOpenError(RuntimeError):
+    """연속 실패로 host의 circuit이 열려 있어서 요청하지 않음"""
+
+
+class TokenBucket:
+    """초당 rate개의 토큰을 채우는 token bucket, 여러 thread와 event loop에서 같이 사용
+
+    토큰이 모자라면 음수로 예약하고 그만큼 기다리므로 요청 순서대로 rate에 맞춰 나감
+    429/503을 받으면 rate를 절반으로 줄이고, 성공할 때마다 설정값까지 조금씩 회복
+
+    Args:
+        rate: 초당 요청 수, None이면 제한하지 않음
+        capacity: 한 번에 몰아서 보낼 수 있는 최대 요청 수, default rate
+    """
+
+    def __init__(self, rate: float = None, capacity: float = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity or (max(1.0, rate) if rate else None)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """토큰 하나를 가져가고 기다려야 하는 시간(초)을 반환"""
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self):
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self):
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    def throttle(self):
+        if self.rate:
+            with self._lock:
+                self.rate = max(
+                    self.max_rate * HTTPConfig.min_rate_ratio, self.rate / 2
+                )
+
+    def recover(self):
+        if self.rate and self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(
+                    self.max_rate, self.rate + self.max_rate * HTTPConfig.recover_ratio
+                )
+
+
+class CircuitBreaker:
+    """연속 실패가 threshold번 이상이면 reset_timeout초 동안 요청을 막고, 그 뒤 다시 요청을 보내서 확인(half-open)
+
+    Args:
+        threshold: circuit을 여는 연속 실패 횟수
+        reset_timeout: circuit을 열어두는 시간(초)
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        return self.state != "open"
+
+    def record(self, ok: bool):
+        if ok:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.failures >= self.threshold:
+            # half-open에서 다시 실패하면 처음부터 다시 기다림
+            self.opened_at = time.monotonic()
+
+
+class HostState:
+    """host별 rate limit, circuit breaker, 요청 통계"""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.bucket = TokenBucket(HTTPConfig.rate_limit.get(host))
+        self.breaker = CircuitBreaker(
+            HTTPConfig.breaker_threshold, HTTPConfig.breaker_reset
+        )
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.throttled = 0
+        self.latency = 0.0
+        self.max_latency = 0.0
+
+    def check(self):
+        if not self.breaker.allow():
+            raise CircuitOpenError(
+                f"circuit for '{self.host}' is open after {self.breaker.failures} failures"
+            )
+
+    def record(self, latency: float, ok: bool, status: int = None):
+        """요청 하나의 결과를 기록, status가 None이면 커넥션 에러나 timeout"""
+        self.requests += 1
+        self.latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        if ok:
+            self.breaker.record(True)
+            self.bucket.recover()
+            return
+        self.errors += 1
+        # 잘못된 인증키나 파라미터(4xx)는 요청 하나의 문제라 host 전체의 circuit을 열지 않음
+        if status is None or status >= 500 or status in RETRY_STATUS:
+            self.breaker.record(False)
+        if status in THROTTLE_STATUS:
+            self.throttled += 1
+            self.bucket.throttle()
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "mean_latency": self.latency / self.requests if self.requests else 0.0,
+            "max_latency": self.max_latency,
+            "rate": self.bucket.rate,
+            "circuit": self.breaker.state,
+        }
+
+
+_HOSTS: dict = {}
+_HOSTS_LOCK = threading.Lock()
+
+
+def get_host_state(url: str):
+    """url의 host 상태, 프로세스에서 host마다 하나만 생성해서 모든 client가 공유"""
+    host = urlsplit(url).netloc
+    state = _HOSTS.get(host)
+    if state is None:
+        with _HOSTS_LOCK:
+            state = _HOSTS.setdefault(host, HostState(host))
+    return state
+
+
+def get_http_stats():
+    """host별 요청 수, 에러/재시도/throttle 횟수, 평균/최대 latency(초), 현재 rate, circuit 상태"""
+    return {host: state.stats() for host, state in _HOSTS.items()}
+
+
+def reset_http_stats():
+    """host 상태(통계, 줄어든 rate, 열린 circuit)를 초기화"""
+    with _HOSTS_LOCK:
+        _HOSTS.clear()
+
+
+def _backoff(attempt: int, retry_after: str = None):
+    """attempt번째 재시도 전에 기다릴 시간(초), Retry-After가 있으면 우선하고 없으면 jitter를 준 지수 backoff"""
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), HTTPConfig.backoff_max)
+    delay = min(HTTPConfig.backoff_max, HTTPConfig.backoff_base * 2**attempt)
+    return random.uniform(delay / 2, delay)
+
+
+class HTTPClient:
+    """host별 rate limit, timeout, 재시도, circuit breaker를 적용하는 aiohttp client
+
+    Args:
+        concurrency: 동시 요청 수(커넥션 풀 크기)
+        headers: 모든 요청에 붙일 헤더
+        timeout: 요청 하나의 전체 timeout(초), default HTTPConfig.timeout
+        retries: 최대 재시도 횟수, default HTTPConfig.retries
+
+    Examples:
+        async with HTTPClient(concurrency=8) as client:
+            text = await client.get_text(url, params={...})
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        headers: dict = None,
+        timeout: float = None,
+        retries: int = None,
+    ):
+        self.concurrency = concurrency
+        self.headers = headers
+        self.timeout = timeout or HTTPConfig.timeout
+        self.retries = HTTPConfig.retries if retries is None else retries
+        self.session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency, keepalive_timeout=HTTPConfig.keepalive_timeout
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def get_text(self, url: str, params: dict = None):
+        """GET 요청 후 본문 텍스트를 반환"""
+        return (await self.get(url, params=params)).text
+
+    async def get(self, url: str, params: dict = None, headers: dict = None):
+        """GET 요청 후 HTTPResponse(status, 본문 텍스트, 응답 헤더)를 반환
+        재시도할 수 없는 에러(429를 제외한 4xx 등)는 바로, 재시도를 모두 실패하면 마지막 에러를 raise
+        304 Not Modified는 그대로 반환, circuit breaker에는 5xx, 429, 커넥션 에러와 timeout만 실패로 기록
+        """
+        state = get_host_state(url)
+        for attempt in range(self.retries + 1):
+            state.check()
+            status, retry_after = None, None
+            try:
+                async with self._semaphore:
+                    # 토큰과 latency는 동시 요청 수 대기열을 통과한 뒤부터(대기 중에 토큰을 써버리거나 대기 시간이 latency에 섞이지 않도록)
+                    await state.bucket.acquire()
+                    start = time.monotonic()
+                    async with self.session.get(
+                        url, params=params, headers=headers
+                    ) as response:
+                        status = response.status
+                        retry_after = response.headers.get("Retry-After")
+                        response.raise_for_status()
+                        result = HTTPResponse(
+                            status, await response.text(), dict(response.headers)
+                        )
+            except aiohttp.ClientResponseError as e:
+                error, retryable = e, e.status in RETRY_STATUS
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error, retryable = e, True
+            else:
+                state.record(time.monotonic() - start, ok=True)
+                return result
+            state.record(time.monotonic() - start, ok=False, status=status)
+            if not retryable or attempt == self.retries:
+                raise error
+            state.retries += 1
+            delay = _backoff(attempt, retry_after)
+            logger.warning(
+                f"{state.host} {status or repr(error)}, retry {attempt + 1} in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+
+
+_SESSION = threading.local()
+
+
+def _session():
+    """thread마다 하나씩 재사용하는 requests.Session"""
+    session = getattr(_SESSION, "session", None)
+    if session is None:
+        session = _SESSION.session = requests.Session()
+    return session
+
+
+def http_get(
+    url: str,
+    params: dict = None,
+    headers: dict = None,
+    timeout: float = None,
+    retries: int = None,
+):
+    """HTTPClient.get_text와 같은 정책(rate limit, timeout, 재시도, circuit breaker)으로 동기 GET 요청
+
+    Returns: requests.Response, 재시도할 수 없는 status의 응답은 그대로 반환
+    """
+    timeout = timeout or HTTPConfig.timeout
+    retries = HTTPConfig.retries if retries is None else retries
+    state = get_host_state(url)
+    for attempt in range(retries + 1):
+        state.check()
+        state.bucket.acquire_sync()
+        start = time.monotonic()
+        try:
+            response = _session().get(
+                url, params=params, headers=headers, timeout=timeout
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            state.record(time.monotonic() - start, ok=False)
+            if attempt == retries:
+                raise
+            error, status, retry_after = e, None, None
+        else:
+            state.record(
+                time.monotonic() - start, ok=response.ok, status=response.status_code
+            )
+            if response.status_code not in RETRY_STATUS or attempt == retries:
+                return response
+            error, status, retry_after = (
+                None,
+                response.status_code,
+                response.headers.get("Retry-After"),
+            )
+        state.retries += 1
+        delay = _backoff(attempt, retry_after)
+        logger.warning(
+            f"{state.host} {status or repr(error)}, retry {attempt + 1} in {delay:.1f}s"
+        )
+        time.sleep(delay)
@@ -8,7 +8,11 @@ class PathConfig:
         cls.src: apt_trade/src
         cls.data: apt_trade/src/data
         cls.snapshot: apt_trade/src/data/snapshots
+        cls.deltas: apt_trade/src/data/deltas
+        cls.listing_log: apt_trade/src/data/listing_log
         cls.history: apt_trade/src/data/history
+        cls.cache: apt_trade/src/data/cache
+        cls.aggregates: apt_trade/src/data/aggregates
     """
 
     root: str = str(Path(__file__).parent.parent.parent)  # apt_trade
@@ -23,7 +27,15 @@ class PathConfig:
     )  # apt_trade/src/data/snpashots/bunyang
     sales: str = Path(snapshots).joinpath("sales")  # apt_trade/src/data/snpashots/sales
     rent: str = Path(snapshots).joinpath("rent")  # apt_trade/src/data/snpashots/rent
+    deltas: str = str(Path(data).joinpath("deltas"))  # apt_trade/src/data/deltas
+    listing_log: str = str(
+        Path(data).joinpath("listing_log")
+    )  # apt_trade/src/data/listing_log
     history: str = str(Path(data).joinpath("history"))  # apt_trade/src/data/history
+    cache: str = str(Path(data).joinpath("cache"))  # apt_trade/src/data/cache
+    aggregates: str = str(
+        Path(data).joinpath("aggregates")
+    )  # apt_trade/src/data/aggregates
     metastore: str = str(Path(src).joinpath("metastore"))  # apt_trade/src/metastore
     graph: str = str(Path(data).joinpath("graph"))  # apt_trade/src/metastore
 
@@ -35,10 +47,179 @@ class URLConfig:
         "분양권실거래": "http://apis.data.go.kr/1613000/RTMSDataSvcSilvTrade/getRTMSDataSvcSilvTrade",
         "네이버매물": "https://fin.land.naver.com/front-api/v1/complex/article/list",
         "전세자금대출금리": "http://apis.data.go.kr/B551408/rent-loan-rate-info/rate-list",
+        "텔레그램": "https://api.telegram.org/bot",
     }
     FakeAgent: str = "u'Mozilla/5.0 (Windows NT 6.2; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/32.0.1667.0 Safari/537.36'"
 
 
+class MockServerConfig:
+    """mock_server.py(공공데이터/네이버 매물 API 로컬 대체 서버) 기본값
+
+    Attributes:
+        cls.host: 서버 host
+        cls.port: 서버 port
+        cls.latency: 응답 지연 시간(초)
+        cls.jitter: latency에 더하는 0~jitter초의 무작위 지연
+        cls.error_rate: 500으로 응답할 확률
+        cls.rate_limit: endpoint별 초당 요청 수, 넘으면 429(Retry-After), None이면 제한하지 않음
+        cls.scale: 구/단지마다 스냅샷 row를 몇 배로 늘려서 응답할지(페이지 수 조절)
+        cls.url: 수집 스크립트와 scheduler의 --mock_url 기본값, 지정하면 시작할 때 use_mock_server(url)로 API를 바꿈
+    """
+
+    host: str = "127.0.0.1"
+    port: int = 8800
+    latency: float = 0.05
+    jitter: float = 0.05
+    error_rate: float = 0.0
+    rate_limit: float = None
+    scale: int = 1
+    url: str = None
+
+
+class StorageConfig:
+    """
+    Attributes:
+        cls.mode: 실거래/분양권 저장 방식
+            "snapshot": date_id마다 해당 월 전체를 snapshots에 저장
+            "delta": 월별 base 테이블 + date_id별 변경분(insert/cancel/update/delete)만 deltas에 저장
+        cls.listing_mode: 매매/전세 매물 저장 방식, 변경 로그(listing_log)는 항상 저장
+            "snapshot": 변경 로그와 함께 date_id마다 전체 매물을 snapshots에도 저장
+            "events": 변경 로그만 저장하고, 읽을 때 date_id 시점으로 복원
+        cls.cache_size: 프로세스에서 메모리에 유지할 parquet 파일(pyarrow Table) 수
+    """
+
+    mode: str = "snapshot"
+    listing_mode: str = "snapshot"
+    cache_size: int = 256
+
+
+class APIConfig:
+    """
+    Attributes:
+        cls.concurrency: 공공데이터 API 동시 요청 수
+        cls.num_of_rows: 페이지당 Row 수(API 최대값 1000)
+        cls.naver_concurrency: 네이버 매물 API 동시 요청 수
+        cls.naver_page_size: 네이버 매물 API 페이지당 매물 수(API 고정값)
+    """
+
+    concurrency: int = 8
+    num_of_rows: int = 1000
+    naver_concurrency: int = 4
+    naver_page_size: int = 30
+
+
+class HTTPConfig:
+    """외부 API 공통 HTTP 정책(utils.client)
+
+    Attributes:
+        cls.timeout: 요청 하나의 전체 timeout(초)
+        cls.retries: 실패한 요청(커넥션 에러, timeout, 429/5xx)의 최대 재시도 횟수
+        cls.backoff_base: 첫 재시도 대기 시간(초), 재시도마다 2배씩 늘리고 jitter 적용
+        cls.backoff_max: 재시도 대기 시간 상한(초)
+        cls.rate_limit: host별 초당 요청 수, 없는 host는 제한하지 않음
+        cls.min_rate_ratio: 429/503으로 rate를 줄일 때의 하한(rate_limit 대비 비율)
+        cls.recover_ratio: 성공할 때마다 회복하는 rate(rate_limit 대비 비율)
+        cls.breaker_threshold: 연속 실패가 이 횟수 이상이면 circuit open
+        cls.breaker_reset: circuit을 열어두는 시간(초)
+        cls.keepalive_timeout: keep-alive 커넥션 유지 시간(초)
+    """
+
+    timeout: float = 30
+    retries: int = 4
+    backoff_base: float = 0.5
+    backoff_max: float = 30
+    rate_limit: dict = {
+        "apis.data.go.kr": 25,
+        "fin.land.naver.com": 5,
+        "api.telegram.org": 20,
+    }
+    min_rate_ratio: float = 0.1
+    recover_ratio: float = 0.05
+    breaker_threshold: int = 10
+    breaker_reset: float = 30
+    keepalive_timeout: int = 30
+
+
+class CacheConfig:
+    """API 응답 캐시(utils.cache) 정책
+
+    Attributes:
+        cls.enabled: 수집할 때 응답 캐시를 사용할지 여부
+        cls.policy: endpoint(URLConfig.URL의 키)별 정책
+            "ttl": 다시 요청하지 않고 캐시된 응답을 사용할 시간(초), 0이면 매번 요청하고 본문 hash로 변경 여부만 확인
+            "past_ttl": DEAL_YMD가 이번 달 이전인 요청의 ttl(지난 달 데이터는 거의 바뀌지 않음)
+            "max_age": 마지막으로 사용한 지 이 시간(초)이 지난 응답은 삭제
+        cls.default_policy: policy에 없는 endpoint의 정책
+        cls.max_bytes: 캐시 전체 크기 상한, 넘으면 오래 사용하지 않은 응답부터 삭제
+    """
+
+    enabled: bool = True
+    policy: dict = {
+        "아파트실거래": {"ttl": 0, "past_ttl": 6 * 3600, "max_age": 7 * 86400},
+        "분양권실거래": {"ttl": 0, "past_ttl": 6 * 3600, "max_age": 7 * 86400},
+        "네이버매물": {"ttl": 0, "max_age": 2 * 86400},
+    }
+    default_policy: dict = {"ttl": 0, "max_age": 86400}
+    max_bytes: int = 256 * 1024**2
+
+
+class TelegramConfig:
+    """텔레그램 전송(utils.dispatcher) 정책, 전체 요청 수는 HTTPConfig.rate_limit의 api.telegram.org를 따름
+
+    Attributes:
+        cls.connection_pool_size: Bot이 재사용하는 커넥션 풀 크기
+        cls.chat_rate_limit: 개인 채팅 하나에 보내는 초당 요청 수
+        cls.group_rate_limit: 그룹/채널(음수 chat_id) 하나에 보내는 초당 요청 수(분당 20개)
+        cls.group_burst: 그룹/채널에 한 번에 몰아서 보낼 수 있는 요청 수
+        cls.media_group_size: send_media_group 한 번에 보낼 사진 수(API 최대값 10)
+        cls.flush_timeout: 프로세스 종료 시 큐에 남은 메세지를 기다리는 시간(초)
+    """
+
+    connection_pool_size: int = 8
+    chat_rate_limit: float = 1
+    group_rate_limit: float = 20 / 60
+    group_burst: int = 20
+    media_group_size: int = 10
+    flush_timeout: float = 120
+
+
+class PlotConfig:
+    """
+    Attributes:
+        cls.font_file: 차트에 사용할 한글 폰트 파일명(시스템 폰트 폴더에서 탐색)
+    """
+
+    font_file: str = "NanumGothic.ttf"
+
+
+class SchedulerConfig:
+    """scheduler.py 실행 정책
+
+    Attributes:
+        cls.hours: 파이프라인을 실행할 시각(기존 cron의 8-24/3)
+        cls.minute: 실행할 분
+        cls.workers: 동시에 실행할 stage 수
+        cls.processes: 매물 추이 그래프를 나눠 그릴 process 수, None이면 scheduler process에서 그림
+    """
+
+    hours: list = [8, 11, 14, 17, 20, 23]
+    minute: int = 0
+    workers: int = 4
+    processes: int = None
+
+
+class QueryConfig:
+    """utils/query.py의 duckdb 실행 설정
+
+    Attributes:
+        cls.threads: 쿼리에 사용할 thread 수, None이면 duckdb 기본값(코어 수)
+        cls.memory_limit: duckdb 메모리 한도(예: "2GB"), 넘으면 디스크로 내려서 처리, None이면 duckdb 기본값
+    """
+
+    threads: int = None
+    memory_limit: str = None
+
+
 class ColumnConfig:
     LAWD_CD_DICTIONARY = {
         "region_cd": "지역코드",
@@ -79,6 +260,21 @@ class ColumnConfig:
         "tradeGbn": "거래구분",
     }
 
+    # 네이버 매물 json의 representativeArticleInfo 아래 경로, 가격은 FilterConfig.price_code의 키로 교체
+    LISTING_DICTIONARY = {
+        "아파트명": ("complexName",),
+        "동": ("dongName",),
+        "거래유형": ("tradeType",),
+        "면적": ("spaceInfo", "exclusiveSpace"),
+        "면적타입": ("spaceInfo", "exclusiveSpaceName"),
+        "확인날짜": ("verificationInfo", "exposureStartDate"),
+        "인증": ("verificationInfo", "verificationType"),
+        "층": ("articleDetail", "floorInfo"),
+        "비고": ("articleDetail", "articleFeatureDescription"),
+        "가격": ("priceInfo", "dealPrice"),
+        "가격변화": ("priceInfo", "priceChangeStatus"),
+    }
+
 
 class FilterConfig:
     sgg_contains: list = [
@@ -133,12 +329,13 @@ class FilterConfig:
 
 
 class SchemaConfig:
+    # 실거래/분양권의 pandas 타입, 저장되는 파일 스키마는 utils.schema.TRADE_SCHEMA
     trade = {
-        "아파트명": "object",
-        "계약일": "object",
+        "아파트명": "category",
+        "계약일": "datetime64[ms]",
         "건축년도": "object",
         "전용면적": "float32",
-        "거래금액": "object",
+        "거래금액": "int64",
         "층": "int32",
         "동": "object",
         "거래유형": "object",
@@ -149,10 +346,20 @@ class SchemaConfig:
         "매수자": "object",
         "매도자": "object",
         "중개사소재지": "object",
-        "시군구코드": "object",
-        "법정동": "object",
+        "시군구코드": "category",
+        "법정동": "category",
         "거래구분": "object",
         "신규거래": "object",
         "month_id": "int32",
         "date_id": "object",
     }
+
+    # 공공데이터 API xml 태그별 타입, 정의되지 않은 태그는 문자열로 파싱
+    trade_xml = {
+        "excluUseAr": trade["전용면적"],
+        "floor": trade["층"],
+        "dealYear": "int32",
+        "dealMonth": "int32",
+        "dealDay": "int32",
+        "sggCd": "int64",
+    }
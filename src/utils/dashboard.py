@@ -0,0 +1,229 @@
+import os
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .config import PathConfig, StorageConfig
+from .dataset import list_partitions, read_history, read_table
+from .schema import conform
+from .storage import delta_files, list_delta_partitions, read_delta
+
+# 대시보드에 표시하는 컬럼, 파일에서는 이 컬럼만 읽음(month_id는 파티션 컬럼)
+DASHBOARD_COLUMNS = [
+    "아파트명",
+    "시군구코드",
+    "법정동",
+    "계약일",
+    "전용면적",
+    "층",
+    "거래금액",
+    "거래유형",
+    "계약해지여부",
+]
+
+
+def latest_partitions(
+    data_type: Literal["trade", "bunyang"], start: int = None, end: int = None
+):
+    """month_id마다 가장 최근 date_id(해당 월의 최신 전체 데이터)의 파일 목록
+
+    Args:
+        data_type: trade, bunyang
+        start: 시작 yyyyMM(포함)
+        end: 끝 yyyyMM(포함)
+
+    Returns: {month_id: (date_id, [파일 경로])}, delta 모드면 base와 date_id까지의 delta 파일
+    """
+    files = {}
+    if StorageConfig.mode == "delta":
+        latest = {}
+        for month_id, date_id in list_delta_partitions(data_type):
+            latest[int(month_id)] = max(date_id, latest.get(int(month_id), ""))
+        for month_id, date_id in latest.items():
+            files[month_id] = (
+                date_id,
+                [str(path) for path in delta_files(data_type, month_id, date_id)],
+            )
+    else:
+        for path, keys in list_partitions(data_type):
+            month_id, date_id = int(keys["month_id"]), keys["date_id"]
+            if date_id > files.get(month_id, ("", []))[0]:
+                files[month_id] = (date_id, [])
+            if date_id == files[month_id][0]:
+                files[month_id][1].append(path)
+    return {
+        month_id: value
+        for month_id, value in sorted(files.items())
+        if (not start or month_id >= int(start)) and (not end or month_id <= int(end))
+    }
+
+
+def _history_files(data_type: str):
+    """backfill로 저장한 history의 {month_id: [파일 경로]}"""
+    path = Path(PathConfig.history).joinpath(data_type)
+    if not path.exists():
+        return {}
+    files = {}
+    for part in path.glob("month_id=*/*.parquet"):
+        files.setdefault(int(part.parent.name.split("=", 1)[1]), []).append(str(part))
+    return files
+
+
+def available_months(data_type: Literal["trade", "bunyang"]):
+    """스냅샷 또는 history에 있는 month_id 목록(오름차순)"""
+    return sorted(set(latest_partitions(data_type)) | set(_history_files(data_type)))
+
+
+def partition_fingerprint(
+    data_type: Literal["trade", "bunyang"], start: int = None, end: int = None
+):
+    """start~end 데이터를 만드는 파일의 (경로, mtime, 크기) 튜플
+    새 date_id가 저장되거나 파일이 교체되면 값이 바뀌므로 st.cache_data의 키로 사용
+
+    Args:
+        data_type: trade, bunyang
+        start: 시작 yyyyMM(포함)
+        end: 끝 yyyyMM(포함)
+    """
+    paths = [
+        path
+        for _, files in latest_partitions(data_type, start, end).values()
+        for path in files
+    ]
+    paths += [
+        path
+        for month_id, files in _history_files(data_type).items()
+        if (not start or month_id >= int(start)) and (not end or month_id <= int(end))
+        for path in files
+    ]
+    fingerprint = []
+    for path in sorted(paths):
+        stat = os.stat(path)
+        fingerprint.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+
+def load_trades(
+    data_type: Literal["trade", "bunyang"],
+    start: int = None,
+    end: int = None,
+    columns: list = None,
+):
+    """start~end 월의 거래를 month_id마다 최신 date_id 데이터로 읽고, 스냅샷이 없는 월은 history에서 읽음
+
+    Args:
+        data_type: trade, bunyang
+        start: 시작 yyyyMM(포함)
+        end: 끝 yyyyMM(포함)
+        columns: 읽을 컬럼, default DASHBOARD_COLUMNS
+
+    Returns: columns와 month_id 컬럼의 DataFrame, 데이터가 없으면 빈 DataFrame
+    """
+    columns = list(columns or DASHBOARD_COLUMNS)
+    latest = latest_partitions(data_type, start, end)
+    frames = []
+    if StorageConfig.mode == "delta":
+        for month_id, (date_id, _) in latest.items():
+            df = read_delta(data_type, month_id=month_id, date_id=date_id)
+            if len(df):
+                frames.append(df[columns].assign(month_id=month_id))
+    else:
+        tables = []
+        for month_id, (_, files) in latest.items():
+            for path in files:
+                table = read_table(path, columns=columns)
+                tables.append(
+                    table.append_column(
+                        "month_id",
+                        pa.array(np.full(table.num_rows, month_id, dtype="int32")),
+                    )
+                )
+        if tables:
+            frames.append(
+                pa.concat_tables(tables, promote_options="permissive").to_pandas(
+                    date_as_object=False
+                )
+            )
+
+    history_months = [
+        month_id for month_id in _history_files(data_type) if month_id not in latest
+    ]
+    if history_months:
+        history = read_history(
+            data_type, start=start, end=end, columns=columns + ["month_id"]
+        )
+        frames.append(history[history["month_id"].isin(history_months)])
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        return pd.DataFrame(columns=columns + ["month_id"])
+    df = pd.concat(frames, ignore_index=True)
+    df["month_id"] = df["month_id"].astype("int32")
+    return conform(df, data_type)
+
+
+def filter_trades(
+    df: pd.DataFrame,
+    sgg_names: list = None,
+    apt_name: str = None,
+    area_range: tuple = None,
+    exclude_cancelled: bool = False,
+):
+    """대시보드 조건으로 거래를 필터링
+
+    Args:
+        df: load_trades 결과
+        sgg_names: 시군구명 리스트
+        apt_name: 아파트명에 포함된 문자열
+        area_range: (최소, 최대) 전용면적
+        exclude_cancelled: 계약해지된 거래 제외 여부
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if sgg_names:
+        mask &= df["시군구코드"].isin(sgg_names).to_numpy()
+    if apt_name:
+        # category는 unique 값만 비교
+        names = df["아파트명"].astype("category")
+        matched = names.cat.categories.str.contains(apt_name, regex=False)
+        mask &= np.isin(names.cat.codes.to_numpy(), np.flatnonzero(matched))
+    if area_range:
+        mask &= df["전용면적"].between(*area_range).to_numpy()
+    if exclude_cancelled:
+        mask &= df["계약해지여부"].isna().to_numpy()
+    return df[mask]
+
+
+def summarize_trades(df: pd.DataFrame, by: list = None):
+    """by(default month_id, 시군구코드)별 거래수, 해지수, 거래금액 중앙값/평균(만원)"""
+    by = by or ["month_id", "시군구코드"]
+    if len(df) == 0:
+        return pd.DataFrame(columns=by + ["거래수", "해지수", "중앙값", "평균"])
+    summary = df.groupby(by, observed=True).agg(
+        거래수=("거래금액", "size"),
+        해지수=("계약해지여부", "count"),
+        중앙값=("거래금액", "median"),
+        평균=("거래금액", "mean"),
+    )
+    return summary.reset_index()
+
+
+def paginate(
+    df: pd.DataFrame,
+    page: int,
+    page_size: int,
+    sort_by: str = "계약일",
+    ascending: bool = False,
+):
+    """sort_by로 정렬한 page번째(1부터) page_size개 row와 전체 page 수
+
+    Returns: (page DataFrame, 전체 page 수)
+    """
+    pages = max(1, -(-len(df) // page_size))
+    page = min(max(1, page), pages)
+    # 화면에 보낼 row만 잘라서 반환, 정렬은 DataFrame 전체가 아니라 정렬 컬럼 하나로
+    order = np.argsort(df[sort_by].to_numpy(), kind="stable")
+    if not ascending:
+        order = order[::-1]
+    return df.iloc[order[(page - 1) * page_size : page * page_size]], pages
@@ -0,0 +1,249 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .config import PathConfig, StorageConfig
+from .schema import HISTORY_SCHEMA, conform, to_table
+
+
+# data_type별 hive 파티션 스키마
+PARTITIONING = {
+    "trade": pa.schema([("month_id", pa.int32()), ("date_id", pa.string())]),
+    "bunyang": pa.schema([("month_id", pa.int32()), ("date_id", pa.string())]),
+    "sales": pa.schema([("date_id", pa.string())]),
+    "rent": pa.schema([("date_id", pa.string())]),
+}
+
+_DATASETS: dict = {}
+_TABLES: OrderedDict = OrderedDict()
+# scheduler에서 여러 stage가 동시에 읽으므로 LRU 갱신은 lock 안에서
+_TABLES_LOCK = threading.Lock()
+
+
+def get_dataset(
+    data_type: Literal["trade", "bunyang", "sales", "rent"], refresh: bool = False
+):
+    """data_type의 pyarrow dataset, 파티션 탐색은 프로세스에서 한 번만 하고 재사용
+
+    Args:
+        data_type: trade, bunyang, sales, rent
+        refresh: 파티션을 다시 탐색할지 여부
+    """
+    path = Path(PathConfig.snapshots).joinpath(data_type)
+    dataset = _DATASETS.get(data_type)
+    if dataset is None or refresh or dataset[0] != path:
+        if not path.exists():
+            return None
+        dataset = (
+            path,
+            ds.dataset(
+                str(path),
+                format="parquet",
+                partitioning=ds.partitioning(PARTITIONING[data_type], flavor="hive"),
+            ),
+        )
+        _DATASETS[data_type] = dataset
+    return dataset[1]
+
+
+def invalidate(data_type: str = None):
+    """새 파티션을 저장한 뒤 호출, 다음 조회 때 파티션을 다시 탐색
+    파일 단위 캐시는 mtime이 키에 포함되므로 따로 비우지 않음
+    """
+    if data_type:
+        _DATASETS.pop(data_type, None)
+    else:
+        _DATASETS.clear()
+
+
+def _partition_filter(data_type: str, month_id=None, date_id: str = None):
+    expr = None
+    names = PARTITIONING[data_type].names
+    if month_id and "month_id" in names:
+        if isinstance(month_id, str):
+            month_id = int(month_id.replace("-", ""))
+        expr = ds.field("month_id") == month_id
+    if date_id:
+        cond = ds.field("date_id") == str(date_id)
+        expr = cond if expr is None else expr & cond
+    return expr
+
+
+def list_partitions(data_type: str, month_id=None, date_id: str = None):
+    """조건에 맞는 파티션 파일만 골라서 [(파일 경로, {파티션 키: 값})]로 반환
+
+    Args:
+        data_type: trade, bunyang, sales, rent
+        month_id: yyyyMM
+        date_id: yyyy-MM-dd
+    """
+    expr = _partition_filter(data_type, month_id=month_id, date_id=date_id)
+    for refresh in [False, True]:
+        dataset = get_dataset(data_type, refresh=refresh)
+        if dataset is None:
+            return []
+        fragments = (
+            dataset.get_fragments(filter=expr)
+            if expr is not None
+            else dataset.get_fragments()
+        )
+        partitions = sorted(
+            (fragment.path, ds.get_partition_keys(fragment.partition_expression))
+            for fragment in fragments
+        )
+        # 캐시된 탐색 결과에 없으면 그 사이에 저장된 파티션일 수 있으므로 한 번 다시 탐색
+        if partitions or expr is None:
+            return partitions
+    return partitions
+
+
+def read_table(path: str, columns: list = None):
+    """parquet 파일 하나를 읽어서 pyarrow Table로 반환, (경로, mtime, 컬럼)을 키로 LRU 캐시
+
+    Args:
+        path: parquet 파일 경로
+        columns: 읽을 컬럼, default 전체
+    """
+    key = (str(path), os.path.getmtime(path), tuple(columns) if columns else None)
+    with _TABLES_LOCK:
+        table = _TABLES.get(key)
+        if table is not None:
+            _TABLES.move_to_end(key)
+            return table
+    table = pq.read_table(path, columns=columns)
+    with _TABLES_LOCK:
+        _TABLES[key] = table
+        while len(_TABLES) > StorageConfig.cache_size:
+            _TABLES.popitem(last=False)
+    return table
+
+
+def read_dataset(
+    data_type: Literal["trade", "bunyang", "sales", "rent"],
+    month_id=None,
+    date_id: str = None,
+    columns: list = None,
+):
+    """파티션을 먼저 고르고 해당 파일만 읽어서 DataFrame으로 반환
+    파일마다 따로 읽으므로 파티션마다 스키마(결측 컬럼의 null 타입 등)가 달라도 읽을 수 있음
+
+    Args:
+        data_type: trade, bunyang, sales, rent
+        month_id: yyyyMM
+        date_id: yyyy-MM-dd
+        columns: 읽을 컬럼, default 전체
+
+    Returns: 파티션 컬럼(month_id, date_id)이 category로 붙은 DataFrame, 데이터가 없으면 빈 DataFrame
+    """
+    names = PARTITIONING[data_type].names
+    file_columns = [c for c in columns if c not in names] if columns else None
+    tables = []
+    for path, keys in list_partitions(data_type, month_id=month_id, date_id=date_id):
+        table = read_table(path, columns=file_columns)
+        for name in names:
+            if not columns or name in columns:
+                # 파티션 값은 dictionary(값 1개)로 붙여서 pandas에서 category가 되도록
+                value = pa.array([keys[name]], PARTITIONING[data_type].field(name).type)
+                indices = pa.array(np.zeros(table.num_rows, dtype="int32"))
+                table = table.append_column(
+                    name, pa.DictionaryArray.from_arrays(indices, value)
+                )
+        tables.append(table)
+    if not tables:
+        return pd.DataFrame()
+    try:
+        # 파티션마다 다른 타입(전부 결측인 null 컬럼 등)은 공통 타입으로 맞춘 뒤 한 번에 변환
+        df = pa.concat_tables(tables, promote_options="permissive").to_pandas(
+            date_as_object=False
+        )
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # 스키마 적용 이전 파티션과 섞여 있는 경우(문자열 거래금액, int/string 동 등)는 pandas에서 합침
+        df = pd.concat([table.to_pandas(date_as_object=False) for table in tables])
+        for name in names:
+            if name in df.columns:
+                df[name] = df[name].astype("category")
+    # 스키마 적용 이전에 저장된 파티션도 같은 타입으로
+    df = conform(df, data_type, exclude=names)
+    return df.reset_index(drop=True)
+
+
+def write_dataset(
+    df: pd.DataFrame, data_type: Literal["trade", "bunyang", "sales", "rent"]
+):
+    """df를 data_type 스키마로 변환해서 파티션별로 저장, 같은 파티션의 기존 파일은 교체
+
+    Args:
+        df: 저장할 dataframe, 파티션 컬럼(month_id, date_id) 포함
+        data_type: trade, bunyang, sales, rent
+    """
+    path = Path(PathConfig.snapshots).joinpath(data_type)
+    pq.write_to_dataset(
+        to_table(df, data_type),
+        root_path=str(path),
+        partition_cols=PARTITIONING[data_type].names,
+        existing_data_behavior="delete_matching",
+    )
+    invalidate(data_type)
+
+
+def _history_path(data_type: str):
+    return Path(PathConfig.history).joinpath(data_type)
+
+
+def read_history(
+    data_type: Literal["trade", "bunyang"],
+    start: int = None,
+    end: int = None,
+    columns: list = None,
+):
+    """backfill로 저장한 과거 거래 데이터를 month_id 범위로 읽기
+
+    Args:
+        data_type: trade, bunyang
+        start: 시작 yyyyMM(포함), default 처음부터
+        end: 끝 yyyyMM(포함), default 끝까지
+
+    Returns: month_id 컬럼이 붙은 DataFrame, 데이터가 없으면 빈 DataFrame
+    """
+    path = _history_path(data_type)
+    if not path.exists():
+        return pd.DataFrame()
+    # _로 시작하는 폴더(backfill 중간 파일)는 pyarrow가 탐색하지 않음
+    dataset = ds.dataset(
+        str(path),
+        format="parquet",
+        partitioning=ds.partitioning(
+            pa.schema([HISTORY_SCHEMA.field("month_id")]), flavor="hive"
+        ),
+    )
+    expr = None
+    if start:
+        expr = ds.field("month_id") >= int(start)
+    if end:
+        cond = ds.field("month_id") <= int(end)
+        expr = cond if expr is None else expr & cond
+    df = dataset.to_table(filter=expr, columns=columns).to_pandas(date_as_object=False)
+    return conform(df, data_type)
+
+
+def write_history(df: pd.DataFrame, data_type: Literal["trade", "bunyang"]):
+    """df를 HISTORY_SCHEMA로 변환해서 month_id 파티션마다 파일 하나로 저장, 같은 month_id의 기존 파일은 교체
+
+    Args:
+        df: 저장할 dataframe, month_id 포함
+        data_type: trade, bunyang
+    """
+    pq.write_to_dataset(
+        to_table(df, data_type, schema=HISTORY_SCHEMA),
+        root_path=str(_history_path(data_type)),
+        partition_cols=["month_id"],
+        existing_data_behavior="delete_matching",
+    )
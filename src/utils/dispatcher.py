@@ -0,0 +1,245 @@
+import asyncio
+import atexit
+import threading
+import time
+from concurrent.futures import Future
+from datetime import timedelta
+
+import telegram
+from loguru import logger
+from telegram.error import BadRequest, NetworkError, RetryAfter
+from telegram.request import HTTPXRequest
+
+from .client import TokenBucket, _backoff, get_host_state
+from .config import HTTPConfig, TelegramConfig, URLConfig
+
+
+def _chat_bucket(chat_id: str):
+    """chat_id별 rate limit, 음수 chat_id(그룹/채널)는 분당 20개"""
+    if str(chat_id).startswith("-"):
+        return TokenBucket(
+            TelegramConfig.group_rate_limit, capacity=TelegramConfig.group_burst
+        )
+    return TokenBucket(TelegramConfig.chat_rate_limit)
+
+
+def _seconds(retry_after):
+    return (
+        retry_after.total_seconds()
+        if isinstance(retry_after, timedelta)
+        else float(retry_after)
+    )
+
+
+class TelegramDispatcher:
+    """Bot 하나와 커넥션 풀을 재사용해서 텔레그램 메세지를 보내는 dispatcher
+
+    별도 thread의 event loop에서 chat_id마다 큐와 worker를 두고 순서대로 전송
+    chat_id별 rate limit과 전체 rate limit(HTTPConfig.rate_limit)을 지키고,
+    RetryAfter(429)는 알려준 시간만큼, 네트워크 에러는 backoff 후 재시도
+    send_* 함수는 기다리지 않고 concurrent.futures.Future를 반환
+
+    Args:
+        token: bot의 token
+
+    Examples:
+        dispatcher = get_dispatcher(token)
+        dispatcher.send_message("hello", chat_id)
+        dispatcher.send_media_group([png, ...], chat_id)
+        dispatcher.flush()
+    """
+
+    def __init__(self, token: str):
+        self.token = token
+        self.url = URLConfig.URL["텔레그램"]
+        self.request = HTTPXRequest(
+            connection_pool_size=TelegramConfig.connection_pool_size,
+            read_timeout=HTTPConfig.timeout,
+            write_timeout=HTTPConfig.timeout,
+            connect_timeout=HTTPConfig.timeout,
+            pool_timeout=HTTPConfig.timeout,
+            media_write_timeout=HTTPConfig.timeout,
+        )
+        self.bot = telegram.Bot(token=token, base_url=self.url, request=self.request)
+        self.loop = asyncio.new_event_loop()
+        self._queues = {}
+        self._workers = {}
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="telegram-dispatcher", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, chat_id: str, call) -> Future:
+        """chat_id 큐에 전송 작업을 추가
+
+        Args:
+            chat_id: telegram channel id
+            call: bot을 받아서 전송하는 coroutine 함수, 재시도할 때 다시 호출
+
+        Returns: 전송 결과(telegram.Message 등)를 담을 Future
+        """
+        if self._closed:
+            raise RuntimeError("dispatcher is closed")
+        future = Future()
+        self.loop.call_soon_threadsafe(self._enqueue, str(chat_id), call, future)
+        return future
+
+    def send_message(self, text: str, chat_id: str) -> Future:
+        return self.submit(
+            chat_id, lambda bot: bot.send_message(chat_id=chat_id, text=text)
+        )
+
+    def send_photo(self, photo: str, chat_id: str) -> Future:
+        """photo: 전송할 이미지의 Path"""
+        return self.submit(
+            chat_id, lambda bot: bot.send_photo(chat_id=chat_id, photo=photo)
+        )
+
+    def send_media_group(self, photos: list, chat_id: str, caption: str = None) -> list:
+        """사진 여러 장을 앨범으로 전송, TelegramConfig.media_group_size장씩 나눠서 보냄
+
+        Args:
+            photos: 전송할 이미지의 Path 리스트
+            chat_id: telegram channel id
+            caption: 앨범 설명(첫 사진에 붙임)
+
+        Returns: 앨범마다 하나씩 Future 리스트
+        """
+        size = TelegramConfig.media_group_size
+        futures = []
+        for i in range(0, len(photos), size):
+            chunk = photos[i : i + size]
+            if len(chunk) == 1:
+                futures.append(self.send_photo(chunk[0], chat_id))
+                continue
+            media = [
+                telegram.InputMediaPhoto(
+                    media=photo, caption=caption if i == j == 0 else None
+                )
+                for j, photo in enumerate(chunk)
+            ]
+            futures.append(
+                self.submit(
+                    chat_id,
+                    lambda bot, media=media: bot.send_media_group(
+                        chat_id=chat_id, media=media
+                    ),
+                )
+            )
+        return futures
+
+    def _enqueue(self, chat_id: str, call, future: Future):
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = asyncio.Queue()
+            self._workers[chat_id] = self.loop.create_task(self._worker(chat_id, queue))
+        queue.put_nowait((call, future))
+
+    async def _worker(self, chat_id: str, queue: asyncio.Queue):
+        bucket = _chat_bucket(chat_id)
+        while True:
+            call, future = await queue.get()
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        result = await self._send(call, bucket)
+                    except Exception as e:
+                        future.set_exception(e)
+                    else:
+                        future.set_result(result)
+            finally:
+                queue.task_done()
+
+    async def _send(self, call, bucket: TokenBucket):
+        state = get_host_state(self.url)
+        retries = HTTPConfig.retries
+        for attempt in range(retries + 1):
+            state.check()
+            await bucket.acquire()
+            await state.bucket.acquire()
+            start = time.monotonic()
+            try:
+                result = await call(self.bot)
+            except RetryAfter as e:
+                state.record(time.monotonic() - start, ok=False, status=429)
+                error, delay = e, _seconds(e.retry_after)
+            except BadRequest:
+                # 잘못된 요청은 재시도해도 같은 결과
+                state.record(time.monotonic() - start, ok=True)
+                raise
+            except NetworkError as e:
+                state.record(time.monotonic() - start, ok=False)
+                error, delay = e, _backoff(attempt)
+            else:
+                state.record(time.monotonic() - start, ok=True)
+                return result
+            if attempt == retries:
+                raise error
+            state.retries += 1
+            logger.warning(
+                f"{state.host} {error!r}, retry {attempt + 1} in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+
+    async def _join(self):
+        await asyncio.gather(*(queue.join() for queue in list(self._queues.values())))
+
+    def flush(self, timeout: float = None):
+        """큐에 있는 메세지를 모두 보낼 때까지 기다림"""
+        if self._closed:
+            return
+        timeout = TelegramConfig.flush_timeout if timeout is None else timeout
+        asyncio.run_coroutine_threadsafe(self._join(), self.loop).result(timeout)
+
+    async def _shutdown(self):
+        for worker in self._workers.values():
+            worker.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        await self.request.shutdown()
+
+    def close(self, timeout: float = None):
+        """남은 메세지를 보내고 커넥션 풀과 event loop를 정리"""
+        if self._closed:
+            return
+        try:
+            self.flush(timeout)
+        except Exception as e:
+            logger.error(f"telegram dispatcher flush failed: {e!r}")
+        self._closed = True
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(
+            HTTPConfig.timeout
+        )
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(HTTPConfig.timeout)
+        self.loop.close()
+
+
+_DISPATCHERS: dict = {}
+_DISPATCHERS_LOCK = threading.Lock()
+
+
+def get_dispatcher(token: str):
+    """프로세스에서 token마다 하나씩 공유하는 TelegramDispatcher, 프로세스 종료 시 남은 메세지를 보내고 닫음"""
+    dispatcher = _DISPATCHERS.get(token)
+    if dispatcher is None:
+        with _DISPATCHERS_LOCK:
+            dispatcher = _DISPATCHERS.get(token)
+            if dispatcher is None:
+                if not _DISPATCHERS:
+                    atexit.register(close_dispatchers)
+                dispatcher = _DISPATCHERS[token] = TelegramDispatcher(token)
+    return dispatcher
+
+
+def close_dispatchers():
+    """모든 dispatcher의 남은 메세지를 보내고 닫음"""
+    with _DISPATCHERS_LOCK:
+        dispatchers = list(_DISPATCHERS.values())
+        _DISPATCHERS.clear()
+    for dispatcher in dispatchers:
+        dispatcher.close()
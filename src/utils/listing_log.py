@@ -0,0 +1,396 @@
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from loguru import logger
+
+from .config import PathConfig, StorageConfig
+from .dataset import write_dataset
+from .schema import SCHEMAS, conform, to_table
+
+# 매물 하나를 구분하는 컬럼, 확인날짜(노출 시작일)가 바뀌면 재확인(reverify)된 매물
+LISTING_KEY_COLUMNS = ["아파트명", "동", "면적타입", "층", "확인날짜"]
+# 같은 집(재확인 전후 매물을 짝지을 때 사용)
+LISTING_UNIT_COLUMNS = ["아파트명", "동", "면적타입", "층"]
+# 가격 외에 바뀌면 update로 기록할 컬럼, 나머지 컬럼(면적구분, 단지 등)은 이 값들에서 계산됨
+LISTING_VALUE_COLUMNS = ["거래유형", "면적", "인증", "비고", "가격변화"]
+# 같은 key의 매물이 여러 개일 때 순번을 매기는 정렬 순서
+_SEQ_SORT_COLUMNS = ["가격", "비고", "인증"]
+LISTING_EVENTS = ["appear", "disappear", "price_change", "reverify", "update"]
+
+
+def _log_path(data_type: str):
+    return Path(PathConfig.listing_log).joinpath(data_type)
+
+
+def _partition_file(data_type: str, date_id: str):
+    return _log_path(data_type).joinpath(f"date_id={date_id}", "part-0.parquet")
+
+
+def _hash_columns(df: pd.DataFrame, columns: list):
+    """columns 값으로 row별 uint64 hash 계산(컬럼별 hash를 섞음)"""
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+def generate_listing_pk(df: pd.DataFrame):
+    """매물 row의 pk와 unit(같은 집) hash 생성
+    LISTING_KEY_COLUMNS가 같은 매물이 여러 개면 _SEQ_SORT_COLUMNS 순서의 순번(seq)을 같이 hash
+
+    Args:
+        df: sales 스키마로 conform된 매물 dataframe
+
+    Returns: df와 같은 순서의 (pk, unit) uint64 배열
+    """
+    key = _hash_columns(df, LISTING_KEY_COLUMNS)
+    order = pd.DataFrame(
+        {"key": key, **{col: df[col].to_numpy() for col in _SEQ_SORT_COLUMNS}}
+    ).sort_values(["key", *_SEQ_SORT_COLUMNS], kind="stable")
+    seq = np.empty(len(df), dtype="uint64")
+    seq[order.index.to_numpy()] = order.groupby("key", sort=False).cumcount().to_numpy()
+    pk = pd.util.hash_pandas_object(
+        pd.DataFrame({"key": key, "seq": seq}), index=False
+    ).to_numpy()
+    return pk, _hash_columns(df, LISTING_UNIT_COLUMNS)
+
+
+def _keyed(df: pd.DataFrame, data_type: str):
+    """pk, unit, 값 hash(_hash) 컬럼을 붙인 dataframe"""
+    df = conform(df, data_type).reset_index(drop=True)
+    pk, unit = generate_listing_pk(df)
+    # None / NaN이 섞여 있어도 같은 값으로 비교되도록 빈 문자열로 통일
+    values = df[LISTING_VALUE_COLUMNS].astype(object).fillna("").astype(str)
+    return df.assign(
+        pk=pk,
+        _unit=unit,
+        _hash=pd.util.hash_pandas_object(values, index=False).to_numpy(),
+    )
+
+
+def diff_listings(
+    prev: pd.DataFrame, cur: pd.DataFrame, data_type: Literal["sales", "rent"]
+):
+    """직전 매물(prev)과 오늘 매물(cur)을 pk로 hash join해서 변경 이벤트를 만든다
+
+    - appear: 새로 올라온 매물
+    - disappear: 내려간 매물(직전 값 그대로)
+    - price_change: 가격이 바뀐 매물, 이전가격에 직전 가격
+    - reverify: 같은 집(LISTING_UNIT_COLUMNS)의 매물이 확인날짜만 바뀌어 다시 올라온 경우, 이전키에 직전 매물의 pk
+    - update: 가격 외의 값(비고, 인증 등)만 바뀐 매물
+
+    Args:
+        prev: 직전 date_id의 매물, 없으면 빈 dataframe(모두 appear)
+        cur: 오늘 매물
+        data_type: sales, rent
+
+    Returns: LISTING_EVENT_SCHEMA 컬럼(date_id 제외)의 dataframe
+    """
+    cur = _keyed(cur, data_type)
+    prev = _keyed(prev, data_type) if len(prev) else cur.iloc[:0]
+    merged = cur[["pk", "가격", "_hash"]].merge(
+        prev[["pk", "가격", "_hash"]],
+        on="pk",
+        how="outer",
+        suffixes=("", "_prev"),
+        indicator=True,
+    )
+    appeared = cur[cur["pk"].isin(merged.loc[merged["_merge"] == "left_only", "pk"])]
+    disappeared = prev[
+        prev["pk"].isin(merged.loc[merged["_merge"] == "right_only", "pk"])
+    ]
+    both = merged[merged["_merge"] == "both"]
+    price_changed = both.loc[both["가격"] != both["가격_prev"], ["pk", "가격_prev"]]
+    updated = both.loc[
+        (both["가격"] == both["가격_prev"]) & (both["_hash"] != both["_hash_prev"]),
+        "pk",
+    ]
+
+    # 같은 집의 appear와 disappear를 가격 순서대로 하나씩 짝지어서 reverify로
+    sort = ["_unit", "가격", "pk"]
+    a = appeared[sort].sort_values(sort)
+    d = disappeared[sort].sort_values(sort)
+    pairs = a.assign(_n=a.groupby("_unit").cumcount()).merge(
+        d.assign(_n=d.groupby("_unit").cumcount()),
+        on=["_unit", "_n"],
+        suffixes=("", "_prev"),
+    )
+
+    columns = [
+        field.name for field in SCHEMAS["listing_events"] if field.name != "date_id"
+    ]
+    # int 0과 합치면 float가 되어 pk가 깨지므로 uint64로
+    none = np.uint64(0)
+    reverified = cur.merge(pairs[["pk", "pk_prev", "가격_prev"]], on="pk")
+    events = [
+        appeared[~appeared["pk"].isin(pairs["pk"])].assign(
+            이전키=none, 이전가격=None, event="appear"
+        ),
+        disappeared[~disappeared["pk"].isin(pairs["pk_prev"])].assign(
+            이전키=none, 이전가격=None, event="disappear"
+        ),
+        cur.merge(price_changed, on="pk").assign(이전키=none, event="price_change"),
+        reverified.assign(이전키=reverified["pk_prev"], event="reverify"),
+        cur[cur["pk"].isin(updated)].assign(이전키=none, 이전가격=None, event="update"),
+    ]
+    events = [
+        event.rename(columns={"가격_prev": "이전가격"}).reindex(columns=columns)
+        for event in events
+        if len(event)
+    ]
+    if not events:
+        return pd.DataFrame(columns=columns)
+    return conform(pd.concat(events, ignore_index=True), "listing_events")
+
+
+def list_listing_dates(data_type: Literal["sales", "rent"]):
+    """변경 로그가 저장된 date_id 목록(오름차순)"""
+    path = _log_path(data_type)
+    if not path.exists():
+        return []
+    return sorted(
+        p.name.split("=", 1)[1] for p in path.iterdir() if p.name.startswith("date_id=")
+    )
+
+
+def read_listing_events(
+    data_type: Literal["sales", "rent"],
+    date_id: str = None,
+    start: str = None,
+    end: str = None,
+    events: list = None,
+):
+    """변경 로그를 date_id 파티션과 event로 필터링해서 읽기
+    "오늘 가격이 내린 매물" 같은 조회는 해당 date_id 파티션만 읽음
+
+    Args:
+        data_type: sales, rent
+        date_id: 이 date_id만
+        start: 시작 date_id(포함)
+        end: 끝 date_id(포함)
+        events: appear, disappear, price_change, reverify, update 중 읽을 event
+
+    Returns: date_id 컬럼이 붙은 DataFrame, 없으면 빈 DataFrame
+    """
+    path = _log_path(data_type)
+    if not path.exists():
+        return pd.DataFrame()
+    dataset = ds.dataset(
+        str(path),
+        format="parquet",
+        partitioning=ds.partitioning(
+            pa.schema([SCHEMAS["listing_events"].field("date_id")]), flavor="hive"
+        ),
+    )
+    conditions = []
+    if date_id:
+        conditions.append(ds.field("date_id") == str(date_id))
+    if start:
+        conditions.append(ds.field("date_id") >= str(start))
+    if end:
+        conditions.append(ds.field("date_id") <= str(end))
+    if events:
+        conditions.append(ds.field("event").isin(events))
+    expr = None
+    for cond in conditions:
+        expr = cond if expr is None else expr & cond
+    df = dataset.to_table(filter=expr).to_pandas(date_as_object=False)
+    return conform(df, "listing_events")
+
+
+def listing_price_drops(data_type: Literal["sales", "rent"], date_id: str):
+    """date_id에 가격이 내린 매물(price_change, reverify), 해당 날짜의 변경분만 읽음"""
+    df = read_listing_events(
+        data_type, date_id=date_id, events=["price_change", "reverify"]
+    )
+    if len(df) == 0:
+        return df
+    return df[df["가격"] < df["이전가격"]].reset_index(drop=True)
+
+
+def apply_listing_events(state: pd.DataFrame, events: pd.DataFrame):
+    """pk가 있는 매물 상태에 하루치 변경 로그를 반영"""
+    removed = pd.concat(
+        [
+            events.loc[events["event"] == "disappear", "pk"],
+            events.loc[events["event"] == "reverify", "이전키"],
+        ]
+    )
+    upserts = events[events["event"] != "disappear"]
+    if state is None:
+        return upserts.reset_index(drop=True)
+    # 같은 key 매물의 순번은 그날의 매물 구성에 따라 달라지므로, 로그를 만들 때(diff_listings)처럼 직전 상태에서 pk를 다시 계산
+    state = state.assign(pk=generate_listing_pk(state)[0])
+    state = state[~state["pk"].isin(removed) & ~state["pk"].isin(upserts["pk"])]
+    return pd.concat([state, upserts], ignore_index=True)
+
+
+def _replay(data_type: str, end: str = None):
+    """변경 로그를 date_id 순서대로 반영하면서 (date_id, 매물 상태)를 yield
+
+    Args:
+        end: 이 date_id까지(포함)
+    """
+    events = read_listing_events(data_type, end=end)
+    if len(events) == 0:
+        return
+    state = None
+    for date_id, day in events.groupby("date_id", sort=True):
+        state = apply_listing_events(state, day)
+        yield date_id, state
+
+
+def _to_listings(state: pd.DataFrame, data_type: str, date_id: str):
+    columns = [field.name for field in SCHEMAS[data_type] if field.name != "date_id"]
+    return conform(state[columns], data_type).assign(date_id=date_id)
+
+
+def read_listings(
+    data_type: Literal["sales", "rent"],
+    date_id: str = None,
+    columns: list = None,
+):
+    """변경 로그로 date_id 시점의 매물(snapshot과 같은 형태)을 복원
+
+    Args:
+        data_type: sales, rent
+        date_id: 복원할 date_id, default 로그가 있는 모든 date_id
+        columns: 반환할 컬럼, default 전체
+
+    Returns: date_id 컬럼이 category로 붙은 DataFrame, date_id의 로그가 없으면 빈 DataFrame
+    """
+    if date_id:
+        if date_id not in list_listing_dates(data_type):
+            return pd.DataFrame()
+        state = _read_state(data_type, date_id)
+        frames = [] if state is None else [_to_listings(state, data_type, date_id)]
+    else:
+        frames = [
+            _to_listings(state, data_type, day) for day, state in _replay(data_type)
+        ]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    df["date_id"] = df["date_id"].astype("category")
+    if columns:
+        df = df[columns]
+    return df
+
+
+def _state_file(data_type: str):
+    # _로 시작하는 폴더는 dataset 탐색에서 제외
+    return _log_path(data_type).joinpath("_state", "state.parquet")
+
+
+def _read_state(data_type: str, date_id: str):
+    """date_id 시점의 매물 상태(pk 포함)
+    마지막으로 저장한 상태(_state)가 date_id 시점이면 로그를 처음부터 반영하지 않고 그대로 사용
+
+    Returns: 로그가 없으면 None
+    """
+    path = _state_file(data_type)
+    if path.exists():
+        state = pq.read_table(path).to_pandas(date_as_object=False)
+        if len(state) and state["date_id"].iloc[0] == date_id:
+            return conform(state, "listing_events")
+    state = None
+    for _, state in _replay(data_type, end=date_id):
+        pass
+    return state
+
+
+def _write_state(state: pd.DataFrame, data_type: str, date_id: str):
+    path = _state_file(data_type)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"_{path.name}.tmp")
+    pq.write_table(to_table(state.assign(date_id=date_id), "listing_events"), tmp)
+    tmp.replace(path)
+
+
+def _write_events(
+    df: pd.DataFrame, data_type: str, date_id: str, prev: pd.DataFrame = None
+):
+    """date_id의 전체 매물(df)을 직전 상태(prev)와 비교한 변경 로그를 date_id 파티션에 저장"""
+    events = diff_listings(
+        pd.DataFrame() if prev is None else _to_listings(prev, data_type, date_id),
+        df,
+        data_type,
+    )
+
+    path = _partition_file(data_type, date_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    schema = pa.schema(
+        [field for field in SCHEMAS["listing_events"] if field.name != "date_id"]
+    )
+    # 읽는 쪽에서 반쯤 쓴 파일을 보지 않도록 임시 파일(_로 시작해서 dataset 탐색에서 제외)에 쓰고 교체
+    tmp = path.with_name(f"_{path.name}.tmp")
+    pq.write_table(to_table(events, "listing_events", schema=schema), tmp)
+    tmp.replace(path)
+    counts = events["event"].value_counts().to_dict() if len(events) else {}
+    logger.info(f"Save the listing events in '{path}' {counts}")
+    return events
+
+
+def write_listing_events(
+    df: pd.DataFrame, data_type: Literal["sales", "rent"], date_id: str
+):
+    """date_id의 전체 매물(df)을 직전 date_id의 상태와 비교해서 변경분만 저장, 같은 date_id는 교체
+    반영한 마지막 상태도 같이 저장해서 다음 date_id는 로그 전체를 다시 반영하지 않음
+    이후 date_id의 로그가 이미 있으면 그 시점의 매물을 복원해두고 date_id부터 순서대로 로그를 다시 계산
+
+    Args:
+        df: date_id 시점의 전체 매물
+        data_type: sales, rent
+        date_id: yyyy-MM-dd
+
+    Returns: date_id에 저장한 변경 로그
+    """
+    dates = list_listing_dates(data_type)
+    before = [d for d in dates if d < date_id]
+    later = [d for d in dates if d > date_id]
+    # 로그를 덮어쓰기 전에 이후 date_id의 매물과 직전 상태를 읽어둠
+    snapshots = (
+        {
+            d: _to_listings(state, data_type, d)
+            for d, state in _replay(data_type)
+            if d in later
+        }
+        if later
+        else {}
+    )
+    prev = _read_state(data_type, before[-1]) if before else None
+
+    events = _write_events(df, data_type, date_id, prev)
+    state = apply_listing_events(prev, events)
+    for d, snapshot in snapshots.items():
+        logger.info(f"Replay the listing events of {d} after rewriting {date_id}")
+        state = apply_listing_events(
+            state, _write_events(snapshot, data_type, d, state)
+        )
+    _write_state(state, data_type, later[-1] if later else date_id)
+    return events
+
+
+def save_listings(
+    df: pd.DataFrame,
+    data_type: Literal["sales", "rent"],
+    date_id: str,
+    mode: Literal["snapshot", "events"] = None,
+):
+    """StorageConfig.listing_mode에 따라 매매/전세 매물을 저장, 변경 로그는 항상 저장
+
+    Args:
+        df: date_id 시점의 전체 매물, date_id 컬럼 포함
+        data_type: sales, rent
+        date_id: yyyy-MM-dd
+        mode: 저장 방식, default StorageConfig.listing_mode
+    """
+    if not mode:
+        mode = StorageConfig.listing_mode
+    write_listing_events(df, data_type=data_type, date_id=date_id)
+    if mode == "snapshot":
+        # 스키마에 맞춰 Parquet로 Overwrite 저장
+        write_dataset(df, data_type=data_type)
+        logger.info(f"Save the data in '{data_type}/date_id={date_id}'")
@@ -1,13 +1,96 @@
 import os
+import pickle
+import sqlite3
+import threading
+from contextlib import contextmanager
 from typing import Union, Any
 from datetime import datetime
 
-from sqlitedict import SqliteDict
-
 from .config import PathConfig
 
 
+# 프로세스 안에서 dbpath별로 하나의 connection과 task 캐시만 사용
+_STORES: dict = {}
+_LOCK = threading.RLock()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    date_key TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (date_key, task_id)
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value BLOB
+);
+"""
+
+
+class _Store:
+    """dbpath 하나에 대한 connection, task 캐시, 트랜잭션 깊이"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.cache: dict = {}
+        self.depth = 0
+
+
+def _connect(dbpath: str):
+    """dbpath의 connection을 프로세스 생애 동안 재사용
+    처음 연결할 때 WAL 모드와 테이블을 준비하고, 기존 sqlitedict 테이블(unnamed)이 있으면 옮겨옴
+    """
+    with _LOCK:
+        store = _STORES.get(dbpath)
+        if store is None:
+            os.makedirs(os.path.dirname(dbpath) or ".", exist_ok=True)
+            conn = sqlite3.connect(
+                dbpath, check_same_thread=False, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            _import_sqlitedict(conn)
+            store = _Store(conn)
+            _STORES[dbpath] = store
+        return store
+
+
+def _import_sqlitedict(conn: sqlite3.Connection):
+    """sqlitedict로 저장된 {date_key: [task_id, ...]} 데이터를 tasks / state 테이블로 이동"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'unnamed'"
+    ).fetchone()
+    if not exists:
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for key, value in conn.execute("SELECT key, value FROM unnamed").fetchall():
+            value = pickle.loads(value)
+            if isinstance(value, list):
+                conn.executemany(
+                    "INSERT OR IGNORE INTO tasks (date_key, task_id, seq) VALUES (?, ?, ?)",
+                    [(key, task_id, seq) for seq, task_id in enumerate(value)],
+                )
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+                    (key, pickle.dumps(value)),
+                )
+        conn.execute("DROP TABLE unnamed")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
 class Metastore:
+    """실행된 task를 date_key별로 저장하는 sqlite metastore
+
+    tasks(date_key, task_id) 테이블에 task마다 한 row씩 저장하고, list가 아닌 값(dict 등)은 state 테이블에 pickle로 저장
+    connection은 프로세스에서 하나만 열고, 조회한 date_key의 task 목록은 메모리에 캐시함
+    """
+
     def __init__(self, dbpath: str = None):
         if not dbpath:
             dbpath = os.path.join(PathConfig.metastore, "metastore.sqlite")
@@ -15,25 +98,113 @@ class Metastore:
 
     @property
     def db(self):
-        return SqliteDict(self.dbpath)
+        return _connect(self.dbpath).conn
+
+    @property
+    def _cache(self):
+        return _connect(self.dbpath).cache
+
+    @contextmanager
+    def transaction(self):
+        """블록 안의 쓰기를 하나의 트랜잭션으로 묶어서 한 번에 commit"""
+        store = _connect(self.dbpath)
+        conn = store.conn
+        with _LOCK:
+            if store.depth == 0:
+                conn.execute("BEGIN IMMEDIATE")
+            store.depth += 1
+            try:
+                yield conn
+            except Exception:
+                store.depth -= 1
+                if store.depth == 0:
+                    conn.execute("ROLLBACK")
+                    store.cache.clear()
+                raise
+            store.depth -= 1
+            if store.depth == 0:
+                conn.execute("COMMIT")
 
     def close(self):
-        self.db.close()
+        with _LOCK:
+            store = _STORES.pop(self.dbpath, None)
+            if store is not None:
+                store.conn.close()
+
+    def checkpoint(self):
+        """WAL 파일의 내용을 db 파일에 반영(db 파일을 복사하거나 git에 올리기 전에 호출)"""
+        self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
 
     def commit(self):
-        self.db.commit()
+        """쓰기는 transaction 단위로 바로 commit되므로 호환을 위해 남겨둠"""
+        pass
 
     def get_keys(self):
-        return list(self.db.keys())
+        keys = self.db.execute(
+            "SELECT DISTINCT date_key FROM tasks UNION SELECT key FROM state ORDER BY 1"
+        ).fetchall()
+        return [k for (k,) in keys]
 
     def get_values(self):
-        return list(self.db.values())
+        return [self.get(key) for key in self.get_keys()]
 
     def get_all(self):
-        return {k: v for k, v in self.db.items()}
+        return {key: self.get(key) for key in self.get_keys()}
+
+    def _tasks(self, key: str):
+        """date_key의 task 목록(실행 순서), 메모리 캐시 사용"""
+        tasks = self._cache.get(key)
+        if tasks is None:
+            rows = self.db.execute(
+                "SELECT task_id FROM tasks WHERE date_key = ? ORDER BY seq", (key,)
+            ).fetchall()
+            tasks = {task_id: None for (task_id,) in rows}
+            self._cache[key] = tasks
+        return tasks
+
+    def _state(self, key: str):
+        row = self.db.execute(
+            "SELECT value FROM state WHERE key = ?", (key,)
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def contains(self, key: str, task_id: str):
+        """date_key에 task_id가 실행되었는지 확인"""
+        if task_id in self._tasks(key):
+            return True
+        # 다른 프로세스에서 추가했을 수 있으므로 캐시에 없으면 인덱스로 한 번 더 확인
+        row = self.db.execute(
+            "SELECT 1 FROM tasks WHERE date_key = ? AND task_id = ?", (key, task_id)
+        ).fetchone()
+        if row:
+            self._cache.pop(key, None)
+        return row is not None
+
+    def add_task(self, key: str, task_id: str):
+        """date_key에 task_id를 추가, 이미 있으면 False 반환
+
+        Args:
+            key: date_key
+            task_id: 추가할 task_id
+
+        Returns:
+            새로 추가했으면 True
+        """
+        with self.transaction() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO tasks (date_key, task_id, seq) "
+                "SELECT ?, ?, COALESCE(MAX(seq) + 1, 0) FROM tasks WHERE date_key = ?",
+                (key, task_id, key),
+            )
+        added = cur.rowcount > 0
+        if added and key in self._cache:
+            self._cache[key][task_id] = None
+        elif not added:
+            self._cache.pop(key, None)
+        return added
 
     def delete(self, key: str = None, value: Union[list, str] = None):
-        """sqlitedict db metastore의 key의 특정 value를 삭제
+        """metastore의 key의 특정 value를 삭제
 
         Args:
             key: 삭제할 key default to datetime.now()
@@ -44,49 +215,66 @@ class Metastore:
             key = datetime.now().strftime("%Y-%m-%d")
         if not value:
             raise ValueError("parameter 'value' should be passed")
-        with self.db as db:
-            tasks = db[key]
-            if isinstance(value, list):
-                for v in value:
-                    tasks.remove(v)
-            if isinstance(value, str):
-                tasks.remove(value)
-            db[key] = tasks
-            db.commit()
+        values = [value] if isinstance(value, str) else list(value)
+        missing = [v for v in values if not self.contains(key, v)]
+        if missing:
+            raise ValueError(f"{missing} not in {key}")
+        with self.transaction() as conn:
+            conn.executemany(
+                "DELETE FROM tasks WHERE date_key = ? AND task_id = ?",
+                [(key, v) for v in values],
+            )
+        self._cache.pop(key, None)
 
     def get(self, key: str):
-        return self.db.get(key, [])
+        tasks = self._tasks(key)
+        if tasks:
+            return list(tasks)
+        state = self._state(key)
+        return [] if state is None else state
 
     def add(self, key: str, value: Any):
-        with self.db as db:
-            if isinstance(value, str):
-                tmp = db.get(key, [])
-                tmp.append(value)
-            if isinstance(value, list):
-                tmp = db.setdefault(key, [])
-                tmp = tmp + value
-            if isinstance(value, dict):
-                tmp = db.setdefault(key, {})
+        if isinstance(value, str):
+            self.add_task(key, value)
+        if isinstance(value, list):
+            with self.transaction():
+                for v in value:
+                    self.add_task(key, v)
+        if isinstance(value, dict):
+            with self.transaction() as conn:
+                tmp = self._state(key) or {}
                 tmp.update(value)
-            db[key] = tmp
-            db.commit()
+                conn.execute(
+                    "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+                    (key, pickle.dumps(tmp)),
+                )
 
     def setdefault(self, key: str, value: Any):
-        with self.db as db:
-            db.setdefault(key, value)
-            db.commit()
+        if self.get(key):
+            return
+        if isinstance(value, list):
+            self.add(key, value)
+        else:
+            with self.transaction() as conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO state (key, value) VALUES (?, ?)",
+                    (key, pickle.dumps(value)),
+                )
 
     def __len__(self):
         return len(self.get_keys())
 
+    def __contains__(self, key: str):
+        return bool(self.get(key))
+
     def __getitem__(self, key: str):
-        return self.db.get(key, [])
+        return self.get(key)
 
     def __setitem__(self, key: str, value: Any):
-        with self.db as db:
-            db.setdefault(key, value)
-            db.commit()
+        self.setdefault(key, value)
 
     def clear(self):
-        self.db.clear()
-        self.commit()
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM tasks")
+            conn.execute("DELETE FROM state")
+        self._cache.clear()
@@ -4,52 +4,74 @@ from copy import deepcopy
 from datetime import datetime, timedelta
 from loguru import logger
 import re
-from pathlib import Path
 from typing import Literal
 import os
 import asyncio
-
-from .utils import PathConfig, get_lawd_cd, send_log, get_funcname
+import hashlib
+
+from .utils import send_log, get_funcname
+from .region import get_region_index
+from .config import StorageConfig
+from .metastore import Metastore
+from .schema import conform
+from .storage import (
+    generate_trade_pk,
+    read_delta,
+    list_delta_partitions,
+    has_partition,
+    trade_sort_order,
+)
+from .dataset import read_dataset
+from .listing_log import read_listings
 
 
 def prepare_dataframe(
-    data_type: Literal["trade", "bunyang", "sales"] = None,
+    data_type: Literal["trade", "bunyang", "sales", "rent"] = None,
     date_id: str = None,
     month_id: str = None,
+    columns: list = None,
 ):
-    """df가 주어지면 해당 dataframe에서 date_id, month_id를 필터링, 아니면 전체를 불러옴
+    """data_type의 저장된 데이터에서 date_id, month_id 파티션만 불러옴, 조건이 없으면 전체를 불러옴
+    파티션 탐색과 파일 읽기는 utils.dataset에서 프로세스 단위로 캐시됨
 
     Args:
-        data_type:
-        date_id:
-        df:
-        month_id:
+        data_type: trade, bunyang, sales, rent
+        date_id: yyyy-MM-dd
+        month_id: yyyyMM
+        columns: 읽을 컬럼, default 전체
 
-    Returns:
+    Returns: 데이터가 없으면 빈 dataframe
 
     """
-    func_name = get_funcname(stack_index=2)
-    fpath = str(Path(PathConfig.snapshots).joinpath(data_type))
-    if date_id or month_id:
-        filters = []
+    if isinstance(month_id, str):
+        month_id = int(month_id.replace("-", ""))
+    if data_type in ["trade", "bunyang"] and StorageConfig.mode == "delta":
+        # base + delta로 date_id 시점의 데이터를 복원
+        partitions = list_delta_partitions(data_type, month_id=month_id)
         if date_id:
-            filters.append(("date_id", "=", date_id))
-        if month_id:
-            if isinstance(month_id, str):
-                month_id = int(month_id.replace("-", ""))
-            filters.append(("month_id", "=", month_id))
-    if filters:
-        df = pd.read_parquet(fpath, engine="pyarrow", filters=filters)
+            partitions = [(m, d) for m, d in partitions if d == date_id]
+        df = pd.concat(
+            [pd.DataFrame()]
+            + [read_delta(data_type, month_id=m, date_id=d) for m, d in partitions]
+        )
+        if columns and len(df):
+            df = df[columns]
+    elif data_type in ["sales", "rent"] and StorageConfig.listing_mode == "events":
+        # 변경 로그로 date_id 시점의 매물을 복원
+        df = read_listings(data_type, date_id=date_id, columns=columns)
     else:
-        df = pd.read_parquet(fpath, engine="pyarrow")
+        df = read_dataset(
+            data_type, month_id=month_id, date_id=date_id, columns=columns
+        )
 
     if len(df) == 0:
-        if data_type:
-            if month_id:
-                fpath = os.path.join(os.path.basename(fpath), str(month_id))
-            if date_id:
-                fpath = os.path.join(fpath, date_id)
-            error_msg = f"No data found for {fpath}"
+        fpath = str(data_type)
+        if month_id:
+            fpath = os.path.join(fpath, str(month_id))
+        if date_id:
+            fpath = os.path.join(fpath, date_id)
+        error_msg = f"No data found for {fpath}"
+        func_name = get_funcname(stack_index=2)
         logger.error(f"function_name: {func_name}\n{error_msg}")
         asyncio.run(send_log(error_msg))
         return pd.DataFrame()
@@ -120,35 +142,28 @@ def process_trade_columns(df: pd.DataFrame, date_id: str = None):
     if not date_id:
         date_id = df["date_id"].max()
 
-    _df = deepcopy(df)
-    _df = _df[_df["date_id"] == date_id]
+    _df = df[df["date_id"] == date_id].copy()
     logger.info(f"date_id will be processed: {date_id}")
 
-    # 계약일 yyyy-MM-dd 형태로 추가
+    # 계약일 yyyy-MM-dd 형태로 추가, yyyyMMdd 정수로 합친 뒤 unique 날짜만 문자열로 변환
+    ymd = (
+        _df["계약년도"].astype("int64") * 10000
+        + _df["계약월"].astype("int64") * 100
+        + _df["계약일"].astype("int64")
+    )
+    codes, uniques = pd.factorize(ymd)
+    labels = [f"{x // 10000}-{x // 100 % 100:02d}-{x % 100:02d}" for x in uniques]
     _df.insert(
         loc=1,
         column="계약시점",
-        value=_df["계약년도"].astype(str)
-        + "-"
-        + _df["계약월"].astype(str).apply(lambda x: x.rjust(2, "0"))
-        + "-"
-        + _df["계약일"].astype(str).apply(lambda x: x.rjust(2, "0")),
+        value=np.asarray(labels, dtype=object)[codes],
     )
     _df = _df.drop(columns=["계약년도", "계약월", "계약일"], axis=0)
     _df = _df.rename(columns={"계약시점": "계약일"})
     logger.info("Completed generating '계약일' column.")
 
-    # 시군구코드 -> 시군구명으로 변경하기
-    lawd_cd = get_lawd_cd()
-    name = lawd_cd["sgg_nm"].to_list()
-    code = lawd_cd["lawd_cd"].to_list()
-
-    converter = {}
-    for n, c in zip(name, code):
-        converter.update({int(c): n})
-    _df["시군구코드"] = _df["시군구코드"].apply(
-        lambda x: converter[x] if isinstance(x, int) or x.isdigit() else x
-    )
+    # 시군구코드 -> 시군구명으로 변경하기, unique 값(구 단위 25개)에만 변환 적용
+    _df["시군구코드"] = get_region_index().to_names(_df["시군구코드"])
     logger.info("Completed converting '시군구코드' column.")
 
     _df["신규거래"] = None
@@ -169,40 +184,137 @@ def generate_new_trade_columns(df: pd.DataFrame, date_id: str):
     Returns:
 
     """
-    _df = deepcopy(df)
     logger.info(f"date_id will be processed on: {date_id}")
     prev_date_id = (
         datetime.strptime(date_id, "%Y-%m-%d") - timedelta(days=1)
     ).strftime("%Y-%m-%d")
-    logger.info("generating seq, pk columns")
-    _df = _df.sort_values(["거래구분", "아파트명", "시군구코드", "법정동", "계약일", "전용면적", "거래금액", "층", "거래유형", "거래구분", "date_id"])
-    _df["seq"] = (
-        _df.groupby(
-            ["거래구분", "아파트명", "시군구코드", "법정동", "date_id"]
-        ).cumcount()
-        + 1
-    )
-    _df["pk"] = (
-        _df["거래구분"].str[0]
-        + _df["아파트명"]
-        + _df["시군구코드"]
-        + _df["법정동"]
-        + _df["seq"].astype(str).apply(lambda x: x.rjust(5, "0"))
+    logger.info("generating pk columns")
+    pk, order = generate_trade_pk(df, with_order=True)
+    pk = pk.to_numpy()
+    date_ids = df["date_id"].to_numpy()
+    is_cur = date_ids == date_id
+    prev_pk = pk[date_ids == prev_date_id]
+    # 당일 row만 정렬된 순서로 가져옴
+    cur_order = order[is_cur[order]]
+    cur = df.take(cur_order).reset_index(drop=True)
+
+    # 전일 pk에 없으면 신규
+    cur["신규거래"] = np.where(np.isin(pk[cur_order], prev_pk), None, "신규")
+    logger.info("updated '신규거래' columns")
+    return cur
+
+
+def fingerprint_rows(frames: list):
+    """한 구의 API 응답을 파싱한 DataFrame 리스트로 만든 fingerprint
+    값을 공백 제거한 문자열로 정규화하고 row별 hash를 정렬해서 합치므로 컬럼 순서와 row 순서에 영향받지 않음
+
+    Args:
+        frames: parse_xml로 파싱한 페이지별 DataFrame 리스트
+
+    Returns: 16 bytes hex 문자열, row가 없으면 "empty"
+    """
+    frames = [df for df in frames if len(df)]
+    if not frames:
+        return "empty"
+    df = pd.concat(frames, ignore_index=True)
+    df = df[sorted(df.columns)].astype(object).fillna("").astype(str)
+    df = df.apply(lambda s: s.str.strip())
+    rows = np.sort(pd.util.hash_pandas_object(df, index=False).to_numpy())
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("\x1f".join(df.columns).encode("utf-8"))
+    digest.update(rows.tobytes())
+    return digest.hexdigest()
+
+
+def get_fingerprint_key(data_type: str, month):
+    """구별 fingerprint를 저장할 metastore key, 값은 {lawd_cd: [fingerprint, 저장한 date_id]}"""
+    return f"fingerprint_{data_type}_{month}"
+
+
+def save_fingerprints(data_type: str, month, date_id: str, fingerprints: dict):
+    """date_id로 저장한 구별 fingerprint를 metastore에 기록"""
+    Metastore().add(
+        get_fingerprint_key(data_type, month),
+        {lawd_cd: [fp, date_id] for lawd_cd, fp in fingerprints.items()},
     )
-    cur = _df[_df["date_id"] == date_id]
-    prev = _df[_df["date_id"] == prev_date_id]
 
-    merged = pd.merge(
-        left=cur, right=prev[["date_id", "pk"]], left_on="pk", right_on="pk", how="left"
+
+def update_trade_snapshot(
+    data_type: Literal["trade", "bunyang"],
+    frames: dict,
+    month,
+    date_id: str,
+    transform,
+):
+    """구별 fingerprint를 직전 실행과 비교해서 바뀐 구만 전처리하고 신규거래를 계산한 date_id 시점의 월 전체 데이터
+    pk는 구 안에서만 정해지므로(시군구코드가 pk 그룹에 포함) 바뀐 구만 계산해도 월 전체를 계산한 결과와 같음
+
+    바뀌지 않은 구의 row는 fingerprint를 기록한 날짜의 데이터를 그대로 사용
+    - date_id(같은 날 재실행): 신규거래 표시까지 그대로
+    - 전일: 전일 pk와 모두 같으므로 신규거래 없음
+
+    Args:
+        data_type: trade, bunyang
+        frames: {lawd_cd: parse_xml로 파싱한 페이지별 DataFrame 리스트}
+        month: yyyyMM
+        date_id: yyyy-MM-dd
+        transform: 파싱한 DataFrame 리스트를 스키마 타입으로 전처리하는 함수(apt_trade.transform 등)
+
+    Returns: (월 전체 DataFrame, 구별 fingerprint), 바뀐 구가 없고 date_id가 이미 저장되어 있으면 DataFrame 대신 None
+    """
+    month = str(month)
+    prev_date_id = (
+        datetime.strptime(date_id, "%Y-%m-%d") - timedelta(days=1)
+    ).strftime("%Y-%m-%d")
+    fingerprints = {
+        lawd_cd: fingerprint_rows(pages) for lawd_cd, pages in frames.items()
+    }
+    saved = Metastore().get(get_fingerprint_key(data_type, month))
+    saved = saved if isinstance(saved, dict) else {}
+    available = {
+        d: has_partition(data_type, month_id=month, date_id=d)
+        for d in [date_id, prev_date_id]
+    }
+
+    # fingerprint가 같고 그 날짜의 데이터가 남아있는 구만 재사용
+    reuse = {}
+    for lawd_cd, fp in fingerprints.items():
+        prev = saved.get(lawd_cd)
+        if prev and prev[0] == fp and available.get(prev[1]):
+            reuse[lawd_cd] = prev[1]
+    changed = [lawd_cd for lawd_cd in fingerprints if lawd_cd not in reuse]
+    logger.info(
+        f"{data_type}: {month} {len(changed)} of {len(fingerprints)} districts changed"
     )
+    if not changed and all(d == date_id for d in reuse.values()):
+        return None, fingerprints
+
+    names = get_region_index().code_to_name
+    parts = []
+    for source in sorted(set(reuse.values())):
+        districts = [names[int(c)] for c, d in reuse.items() if d == source]
+        part = prepare_dataframe(data_type, month_id=month, date_id=source)
+        part = part[part["시군구코드"].isin(districts)].copy()
+        if source != date_id:
+            part["신규거래"] = None
+            part["date_id"] = date_id
+        parts.append(part)
+
+    result = [df for lawd_cd in changed for df in frames[lawd_cd] if len(df)]
+    if result:
+        cur = transform(result, month=month, date_id=date_id)
+        exist = prepare_dataframe(data_type, month_id=month, date_id=prev_date_id)
+        if len(exist):
+            exist = exist[exist["시군구코드"].isin([names[int(c)] for c in changed])]
+        parts.append(
+            generate_new_trade_columns(pd.concat([exist, cur]), date_id=date_id)
+        )
 
-    merged["신규거래"] = np.where(merged["date_id_y"].isna(), "신규", None)
-    logger.info("updated '신규거래' columns")
-    # seq / pk 제거
-    merged = merged.drop(columns=["pk", "seq", "date_id_y"], axis=0)
-    merged = merged.rename(columns={"date_id_x": "date_id"})
-    logger.info("dropped seq, pk columns")
-    return merged
+    if not parts:
+        return pd.DataFrame(), fingerprints
+    df = conform(pd.concat(parts, ignore_index=True), data_type)
+    df = df.take(trade_sort_order(df)).reset_index(drop=True)
+    return df, fingerprints
 
 
 def delete_latest_history(
@@ -241,17 +353,16 @@ def process_sales_column(df):
     )
     data["floor"] = data["층"].apply(lambda x: x.split("/")[0])
     data["집주인"] = np.where(data["인증"] == "OWNER", "집주인", None)
-    data["가격요약"] = data["가격"].apply(lambda x: f"{x/1e8:.1f}억")
+    data["가격요약"] = data["가격"].apply(lambda x: f"{x / 1e8:.1f}억")
     data = data.drop_duplicates()
 
     return data
 
 
 def filter_sales_column(df):
-    prev_7day = (
-        datetime.strptime(df["확인날짜"].max(), "%Y-%m-%d") - timedelta(days=7)
-    ).strftime("%Y-%m-%d")
-    data = df[df["확인날짜"] >= prev_7day]
+    checked = pd.to_datetime(df["확인날짜"])
+    prev_7day = checked.max() - timedelta(days=7)
+    data = df[checked >= prev_7day]
 
     def _convert_number(string):
         max_length = 10
@@ -0,0 +1,231 @@
+import threading
+from pathlib import Path
+from typing import Literal
+
+import pyarrow as pa
+
+from .aggregates import AGGREGATE_PARTITIONS, VALID_LISTING_DAYS
+from .config import PathConfig, QueryConfig
+from .dataset import PARTITIONING
+from .schema import SCHEMAS
+
+# 스냅샷 view 이름(data_type)과 hive 파티션 컬럼
+SNAPSHOT_VIEWS = {
+    data_type: partitioning.names for data_type, partitioning in PARTITIONING.items()
+}
+
+_CONNECTION = None
+_CONNECTION_LOCK = threading.Lock()
+_LOCAL = threading.local()
+
+
+def _duckdb_type(dtype: pa.DataType):
+    if pa.types.is_dictionary(dtype) or pa.types.is_string(dtype):
+        return "VARCHAR"
+    if pa.types.is_date(dtype):
+        return "DATE"
+    if pa.types.is_floating(dtype):
+        return "FLOAT" if dtype.bit_width == 32 else "DOUBLE"
+    return {8: "TINYINT", 16: "SMALLINT", 32: "INTEGER", 64: "BIGINT"}[
+        dtype.bit_width
+    ].join(["U", ""] if pa.types.is_unsigned_integer(dtype) else ["", ""])
+
+
+def _select(schema: pa.Schema, source: dict, partitions: list):
+    """파일 컬럼 타입(source)을 스키마 타입으로 맞추는 select 목록
+    스키마 적용 이전 파티션과 섞여서 VARCHAR가 된 컬럼(쉼표 포함 거래금액 등)도 conform과 같은 값으로 변환
+    """
+    columns = []
+    for field in schema:
+        name, target = field.name, _duckdb_type(field.type)
+        if field.name in partitions:
+            columns.append(f'"{name}"')
+        elif name not in source:
+            columns.append(f'NULL::{target} AS "{name}"')
+        elif source[name] == target:
+            columns.append(f'"{name}"')
+        elif pa.types.is_integer(field.type) and source[name] == "VARCHAR":
+            columns.append(
+                f"CAST(replace(trim(\"{name}\"), ',', '') AS {target}) AS \"{name}\""
+            )
+        else:
+            columns.append(f'CAST("{name}" AS {target}) AS "{name}"')
+    return ", ".join(columns)
+
+
+def _source(conn, path: Path, schema: pa.Schema, partitions: list, **keys):
+    """path 아래 hive 파티션 parquet을 스키마 타입으로 읽는 subquery, 파일이 없으면 같은 스키마의 빈 결과
+
+    Args:
+        path: data_type 폴더
+        schema: SCHEMAS의 스키마
+        partitions: hive 파티션 컬럼
+        **keys: 읽을 파티션 값(partitions 앞에서부터), 주면 해당 폴더만 탐색
+    """
+    for col in partitions:
+        if col not in keys:
+            break
+        path = path.joinpath(f"{col}={keys[col]}")
+    if not path.exists() or next(path.rglob("*.parquet"), None) is None:
+        empty = ", ".join(
+            f'NULL::{_duckdb_type(field.type)} AS "{field.name}"' for field in schema
+        )
+        return f"(SELECT {empty} WHERE false)"
+    hive_types = ", ".join(
+        f"'{col}': {_duckdb_type(schema.field(col).type)}" for col in partitions
+    )
+    source = (
+        f"read_parquet('{path.as_posix()}/**/*.parquet', hive_partitioning = true, "
+        f"union_by_name = true, hive_types = {{{hive_types}}})"
+    )
+    types = {
+        row[0]: row[1]
+        for row in conn.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()
+    }
+    return f"(SELECT {_select(schema, types, partitions)} FROM {source})"
+
+
+def refresh_views(conn=None):
+    """스냅샷(trade, bunyang, sales, rent)과 집계(trade_daily, sales_daily) view를 다시 등록
+    저장소 경로(PathConfig)가 바뀌었거나 처음으로 데이터가 저장된 data_type이 있을 때 호출
+    """
+    conn = conn or get_connection()
+    views = [
+        (name, Path(PathConfig.snapshots).joinpath(name), partitions)
+        for name, partitions in SNAPSHOT_VIEWS.items()
+    ]
+    views += [
+        (name, Path(PathConfig.aggregates).joinpath(name), partitions)
+        for name, partitions in AGGREGATE_PARTITIONS.items()
+    ]
+    for name, path, partitions in views:
+        # 파일 목록은 쿼리할 때마다 다시 읽으므로 새로 저장된 date_id도 바로 조회되고, 파티션 컬럼 조건은 파일 선택에 사용됨
+        conn.execute(
+            f'CREATE OR REPLACE VIEW "{name}" AS SELECT * FROM {_source(conn, path, SCHEMAS[name], partitions)}'
+        )
+
+
+def partition(data_type: str, **keys):
+    """data_type 스냅샷의 파티션 하나(또는 month_id 등 앞쪽 파티션 값으로 좁힌 범위)를 읽는 subquery
+    view는 쿼리마다 전체 파일 목록과 스키마를 확인하므로, 파티션이 정해진 쿼리는 해당 폴더만 읽는 편이 빠름
+
+    Args:
+        data_type: trade, bunyang, sales, rent
+        **keys: 파티션 값(month_id, date_id)
+
+    Examples:
+        query(f"SELECT count(*) AS n FROM {partition('trade', month_id=202412, date_id='2024-12-13')}")
+    """
+    path = Path(PathConfig.snapshots).joinpath(data_type)
+    return _source(
+        _cursor(), path, SCHEMAS[data_type], SNAPSHOT_VIEWS[data_type], **keys
+    )
+
+
+def get_connection():
+    """프로세스에서 하나만 만드는 in-memory duckdb connection, 처음 만들 때 view를 등록
+    duckdb는 선택 의존성이므로 사용할 때 import
+    """
+    global _CONNECTION
+    if _CONNECTION is None:
+        with _CONNECTION_LOCK:
+            if _CONNECTION is None:
+                import duckdb
+
+                conn = duckdb.connect(":memory:")
+                if QueryConfig.threads:
+                    conn.execute(f"SET threads = {int(QueryConfig.threads)}")
+                if QueryConfig.memory_limit:
+                    conn.execute(f"SET memory_limit = '{QueryConfig.memory_limit}'")
+                refresh_views(conn)
+                _CONNECTION = conn
+    return _CONNECTION
+
+
+def _cursor():
+    """thread마다 따로 쓰는 cursor(duckdb connection은 thread 간에 공유하지 않음)"""
+    conn = get_connection()
+    if getattr(_LOCAL, "conn", None) is not conn:
+        _LOCAL.cursor = conn.cursor()
+        _LOCAL.conn = conn
+    return _LOCAL.cursor
+
+
+def query(sql: str, **params):
+    """view에 sql을 실행해서 DataFrame으로 반환, thread마다 cursor를 따로 사용
+
+    Args:
+        sql: trade, bunyang, sales, rent, trade_daily, sales_daily view를 사용하는 쿼리
+        **params: sql의 $name 파라미터
+
+    Examples:
+        query("SELECT count(*) AS n FROM trade WHERE month_id = $month_id", month_id=202412)
+    """
+    return _cursor().execute(sql, params or None).df()
+
+
+# 실거래 + 분양권 파티션({trade}, {bunyang})의 시군구별 거래수/해지수/신규수(aggregate_trade와 같은 값)
+TRADE_COUNTS_SQL = """
+SELECT
+    "시군구코드",
+    sum("거래수")::BIGINT AS "거래수",
+    sum("해지수")::BIGINT AS "해지수",
+    sum("신규수")::BIGINT AS "신규수"
+FROM (
+    SELECT "시군구코드", count("계약일") AS "거래수", count("계약해지여부") AS "해지수", count("신규거래") AS "신규수"
+    FROM {trade} GROUP BY ALL
+    UNION ALL
+    SELECT "시군구코드", count("계약일"), count("계약해지여부"), count("신규거래")
+    FROM {bunyang} GROUP BY ALL
+)
+GROUP BY "시군구코드"
+ORDER BY "시군구코드"
+"""
+
+# 매물 파티션({listings})에서 date_id 기준 VALID_LISTING_DAYS일 안에 확인된 매물의 (아파트명, 면적구분)별 가격 통계(aggregate_sales와 같은 값)
+SALES_SUMMARY_SQL = f"""
+SELECT
+    "아파트명",
+    "면적구분",
+    avg("가격") AS "평균",
+    median("가격")::DOUBLE AS "중앙",
+    max("가격") AS "최대",
+    min("가격") AS "최저",
+    count("가격") AS "매물수"
+FROM {{listings}}
+WHERE "확인날짜" >= CAST($date_id AS DATE) - INTERVAL {VALID_LISTING_DAYS} DAY
+GROUP BY ALL
+ORDER BY "아파트명", "면적구분"
+"""
+
+
+def trade_counts(month_id, date_id: str):
+    """notifier의 daily_aggregation에서 쓰는 시군구별 거래수/해지수/신규수를 스냅샷에서 바로 집계
+
+    Args:
+        month_id: yyyyMM
+        date_id: yyyy-MM-dd
+
+    Returns: 시군구코드, 거래수, 해지수, 신규수 컬럼의 DataFrame
+    """
+    keys = {"month_id": int(month_id), "date_id": str(date_id)}
+    return query(
+        TRADE_COUNTS_SQL.format(
+            trade=partition("trade", **keys), bunyang=partition("bunyang", **keys)
+        )
+    )
+
+
+def sales_summary(date_id: str, data_type: Literal["sales", "rent"] = "sales"):
+    """notifier의 sales_aggregation에서 쓰는 (아파트명, 면적구분)별 매물 가격 통계를 스냅샷에서 바로 집계
+
+    Args:
+        date_id: yyyy-MM-dd
+        data_type: sales, rent
+
+    Returns: 아파트명, 면적구분, 평균, 중앙, 최대, 최저, 매물수(가격은 원) 컬럼의 DataFrame
+    """
+    if data_type not in ["sales", "rent"]:
+        raise ValueError(f"invalid data_type '{data_type}'")
+    listings = partition(data_type, date_id=str(date_id))
+    return query(SALES_SUMMARY_SQL.format(listings=listings), date_id=str(date_id))
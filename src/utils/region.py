@@ -0,0 +1,87 @@
+import os
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from .config import PathConfig
+
+
+class RegionIndex:
+    """법정동코드 파일에서 만든 시군구(구 단위) 인덱스, 프로세스에서 한 번만 만들어서 공유
+
+    Attributes:
+        lawd_cd: 시군구 법정동코드 5자리 배열(str)
+        sgg_nm: 시군구명 배열, lawd_cd와 같은 순서
+        code_to_name: {int(lawd_cd): sgg_nm}
+        name_to_code: {sgg_nm: lawd_cd}
+        dtype: 시군구명 CategoricalDtype
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.lawd_cd = df["lawd_cd"].to_numpy(dtype=object)
+        self.sgg_nm = df["sgg_nm"].to_numpy(dtype=object)
+        self.code_to_name = {int(c): n for c, n in zip(self.lawd_cd, self.sgg_nm)}
+        self.name_to_code = {n: c for c, n in zip(self.lawd_cd, self.sgg_nm)}
+        self.dtype = pd.CategoricalDtype(categories=pd.unique(self.sgg_nm))
+
+    @classmethod
+    def from_csv(cls, path: str):
+        """법정동코드를 다운받아서 서울특별시 코드 5자리만 파싱
+        https://www.code.go.kr/stdcode/regCodeL.do 에서 [법정동 코드 전체 자료] 다운로드 후 사용
+        """
+        # int로 추론됨, str로 변경 필요
+        df = pd.read_csv(path).astype(str)
+        # umd_cd, ri_cd가 0으로 되어야 구 레벨의 코드
+        df = df[df["region_cd"] == df["sido_cd"] + df["sgg_cd"] + "00000"]
+        # 도 레벨(서울특별시) 코드 제거
+        df = df[df["sgg_cd"] != "000"]
+
+        # API에 넣을 법정동 코드 파싱하여, 시군구명과 함께 저장
+        df["lawd_cd"] = df["region_cd"].str[:5]
+        df = df[["locallow_nm", "lawd_cd"]]
+        df.columns = ["sgg_nm", "lawd_cd"]
+        return cls(df)
+
+    def frame(self):
+        """[시군구명, 법정동코드 5자리] DataFrame(새로 만든 복사본)"""
+        return pd.DataFrame({"sgg_nm": self.sgg_nm, "lawd_cd": self.lawd_cd})
+
+    def to_names(self, codes: pd.Series):
+        """시군구코드 Series를 시군구명으로 변환, 숫자가 아닌 값(이미 시군구명 등)은 그대로 둠
+        unique 값에만 변환을 적용하고 코드로 펼침
+        """
+        values, uniques = pd.factorize(codes)
+        names = [self._to_name(x) for x in uniques] + [np.nan]
+        # factorize의 결측 코드 -1은 마지막 원소(np.nan)를 가리킴
+        return pd.Series(
+            np.asarray(names, dtype=object)[values], index=codes.index, name=codes.name
+        )
+
+    def _to_name(self, code: Union[int, str]):
+        if isinstance(code, (int, np.integer)) or str(code).isdigit():
+            return self.code_to_name[int(code)]
+        return code
+
+
+_REGION_INDEX: dict = {}
+
+
+def _region_path(fname: str):
+    path = os.path.join(PathConfig.data, fname)
+    if os.path.exists(path):
+        return path
+    # data 폴더에 없을 때만 repo 전체 검색
+    from .utils import find_file
+
+    return find_file(fname)
+
+
+def get_region_index(fname: str = "lawd_cd.csv"):
+    """fname으로 만든 RegionIndex, 파일이 바뀌지 않았으면 캐시된 인덱스를 반환"""
+    path = _region_path(fname)
+    mtime = os.path.getmtime(path)
+    cached = _REGION_INDEX.get(fname)
+    if cached is None or cached[0] != (path, mtime):
+        cached = _REGION_INDEX[fname] = ((path, mtime), RegionIndex.from_csv(path))
+    return cached[1]
@@ -0,0 +1,108 @@
+"""저장된 스냅샷으로 공공데이터 API 응답(xml)과 네이버 매물 API 응답(article)을 재현
+mock_server.py와 benchmarks의 fixture에서 사용
+"""
+
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from .config import ColumnConfig, FilterConfig
+from .dataset import list_partitions
+from .utils import get_lawd_cd
+
+# 수집 단계에서 코드가 직접 채우는 컬럼은 API 응답에 없음(apt_trade.convert, bunyang_trade.convert)
+_GENERATED_TAGS = {
+    "trade": ["ownershipGbn", "tradeGbn"],
+    "bunyang": ["aptDong", "buildYear", "rgstDate", "tradeGbn"],
+}
+
+
+def pick_partition(data_type: str, days: int = 7):
+    """가장 최근 date_id부터 days일 안의 파티션 중 row가 가장 많은 (month_id, date_id), 매물은 month_id가 None"""
+    rows = {}
+    for path, keys in list_partitions(data_type):
+        key = (keys.get("month_id"), keys["date_id"])
+        rows[key] = rows.get(key, 0) + pq.ParquetFile(path).metadata.num_rows
+    latest = max(date_id for _, date_id in rows)
+    since = (datetime.strptime(latest, "%Y-%m-%d") - timedelta(days=days)).strftime(
+        "%Y-%m-%d"
+    )
+    return max((key for key in rows if key[1] >= since), key=lambda key: rows[key])
+
+
+def to_api_rows(df: pd.DataFrame, data_type: str = "trade"):
+    """스냅샷 컬럼(한글)을 API xml 태그 컬럼으로 되돌림"""
+    reverse = {v: k for k, v in ColumnConfig.TRADE_DICTIONARY.items()}
+    lawd_cd = get_lawd_cd()
+    name_to_code = dict(zip(lawd_cd["sgg_nm"], lawd_cd["lawd_cd"]))
+
+    contract = df["계약일"].astype(str).str.split("-", expand=True)
+    rows = pd.DataFrame(
+        {
+            "dealYear": contract[0],
+            "dealMonth": contract[1].astype(int).astype(str),
+            "dealDay": contract[2].astype(int).astype(str),
+        }
+    )
+    for col, tag in reverse.items():
+        if (
+            tag in _GENERATED_TAGS[data_type]
+            or tag in rows.columns
+            or col not in df.columns
+        ):
+            continue
+        rows[tag] = df[col].astype(object)
+    rows["sggCd"] = df["시군구코드"].astype(str).map(name_to_code)
+    rows["excluUseAr"] = df["전용면적"].astype(float).round(4)
+    return rows.astype(object).where(rows.notna(), " ").astype(str)
+
+
+def render_response(rows, page_no: int, num_of_rows: int, total_cnt: int):
+    """API 응답 포맷의 xml 문자열 생성
+
+    Args:
+        rows: to_api_rows 결과 DataFrame 또는 record(dict) 리스트
+    """
+    records = rows.to_dict(orient="records") if isinstance(rows, pd.DataFrame) else rows
+    items = "".join(
+        "<item>"
+        + "".join(f"<{k}>{escape(v)}</{k}>" for k, v in row.items())
+        + "</item>"
+        for row in records
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        "<response><header><resultCode>000</resultCode><resultMsg>OK</resultMsg></header>"
+        f"<body><items>{items}</items><numOfRows>{num_of_rows}</numOfRows>"
+        f"<pageNo>{page_no}</pageNo><totalCount>{total_cnt}</totalCount></body></response>"
+    )
+
+
+def to_articles(df: pd.DataFrame):
+    """매물 스냅샷을 네이버 매물 API의 article(representativeArticleInfo) 리스트로 되돌림"""
+    articles = []
+    sales_code = FilterConfig.sales_code
+    for row in df.to_dict(orient="records"):
+        info = {}
+        paths = {
+            **ColumnConfig.LISTING_DICTIONARY,
+            "가격": ("priceInfo", FilterConfig.price_code[row["거래유형"]]),
+        }
+        for col, path in paths.items():
+            value = row[col]
+            if col == "거래유형":
+                value = sales_code[value]
+            elif col == "확인날짜":
+                value = pd.Timestamp(value).strftime("%Y-%m-%d")
+            elif pd.isna(value):
+                value = None
+            elif hasattr(value, "item"):
+                value = value.item()
+            node = info
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+            node[path[-1]] = value
+        articles.append({"representativeArticleInfo": info})
+    return articles
@@ -0,0 +1,206 @@
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+def _dictionary():
+    return pa.dictionary(pa.int32(), pa.string())
+
+
+# 실거래/분양권 스냅샷 스키마, month_id와 date_id는 hive 파티션 컬럼(파일에는 저장되지 않음)
+TRADE_SCHEMA = pa.schema(
+    [
+        ("아파트명", _dictionary()),
+        ("계약일", pa.date32()),
+        ("건축년도", pa.string()),
+        ("전용면적", pa.float32()),
+        ("거래금액", pa.int64()),  # 만원
+        ("층", pa.int32()),
+        ("동", pa.string()),
+        ("거래유형", pa.string()),
+        ("계약해지여부", pa.string()),
+        ("계약해지사유발생일", pa.string()),
+        ("등기일자", pa.string()),
+        ("권리구분", pa.string()),
+        ("매수자", pa.string()),
+        ("매도자", pa.string()),
+        ("중개사소재지", pa.string()),
+        ("시군구코드", _dictionary()),
+        ("법정동", _dictionary()),
+        ("거래구분", pa.string()),
+        ("신규거래", pa.string()),
+        ("month_id", pa.int32()),
+        ("date_id", pa.string()),
+    ]
+)
+
+# 네이버 매매/전세 매물 스키마, date_id는 hive 파티션 컬럼
+SALES_SCHEMA = pa.schema(
+    [
+        ("아파트명", _dictionary()),
+        ("동", pa.string()),
+        ("거래유형", pa.string()),
+        ("면적", pa.float64()),
+        ("면적타입", pa.string()),
+        ("확인날짜", pa.date32()),
+        ("인증", pa.string()),
+        ("층", pa.string()),
+        ("비고", pa.string()),
+        ("가격", pa.int64()),  # 원
+        ("가격변화", pa.int64()),
+        ("면적구분", pa.string()),
+        ("단지", pa.string()),
+        ("floor", pa.string()),
+        ("집주인", pa.string()),
+        ("가격요약", pa.string()),
+        ("date_id", pa.string()),
+    ]
+)
+
+# 과거 실거래/분양권 history 스키마, 수집 시점(date_id)과 신규거래 표시가 없고 month_id는 hive 파티션 컬럼
+HISTORY_SCHEMA = pa.schema(
+    [field for field in TRADE_SCHEMA if field.name not in ["신규거래", "date_id"]]
+)
+
+# 날짜별 실거래/분양권 집계(utils.aggregates), data_type/month_id/date_id는 hive 파티션 컬럼
+TRADE_DAILY_SCHEMA = pa.schema(
+    [
+        ("시군구코드", _dictionary()),
+        ("거래수", pa.int64()),
+        ("해지수", pa.int64()),
+        ("신규수", pa.int64()),
+        ("data_type", pa.string()),
+        ("month_id", pa.int32()),
+        ("date_id", pa.string()),
+    ]
+)
+
+# 날짜별 매매/전세 매물 집계(utils.aggregates), data_type/date_id는 hive 파티션 컬럼
+SALES_DAILY_SCHEMA = pa.schema(
+    [
+        ("아파트명", _dictionary()),
+        ("면적구분", pa.string()),
+        ("평균", pa.float64()),  # 원
+        ("중앙", pa.float64()),
+        ("최대", pa.int64()),
+        ("최저", pa.int64()),
+        ("매물수", pa.int64()),
+        ("data_type", pa.string()),
+        ("date_id", pa.string()),
+    ]
+)
+
+# 매매/전세 매물 변경 로그(utils.listing_log), date_id는 hive 파티션 컬럼
+# event: appear, disappear, price_change, reverify, update
+# 이전키는 reverify로 대체된 매물의 pk(그 외 0), 이전가격은 price_change, reverify의 직전 가격
+LISTING_EVENT_SCHEMA = pa.schema(
+    [field for field in SALES_SCHEMA if field.name != "date_id"]
+    + [
+        ("pk", pa.uint64()),
+        ("이전키", pa.uint64()),
+        ("이전가격", pa.int64()),
+        ("event", pa.string()),
+        ("date_id", pa.string()),
+    ]
+)
+
+SCHEMAS = {
+    "trade": TRADE_SCHEMA,
+    "bunyang": TRADE_SCHEMA,
+    "sales": SALES_SCHEMA,
+    "rent": SALES_SCHEMA,
+    "trade_daily": TRADE_DAILY_SCHEMA,
+    "sales_daily": SALES_DAILY_SCHEMA,
+    "listing_events": LISTING_EVENT_SCHEMA,
+}
+
+
+def _to_string(s: pd.Series):
+    """결측은 유지하고 나머지 값은 문자열로(int로 저장된 동 등)"""
+    if pd.api.types.is_string_dtype(s) and not isinstance(s.dtype, pd.CategoricalDtype):
+        return s
+    return (
+        s.astype(object)
+        .where(s.notna(), None)
+        .map(lambda x: x if x is None else str(x))
+        .astype(object)
+    )
+
+
+def _to_int(s: pd.Series, dtype: str):
+    """'101,500' 같은 쉼표 포함 문자열도 정수로"""
+    if pd.api.types.is_integer_dtype(s):
+        return s.astype(dtype)
+    if not pd.api.types.is_numeric_dtype(s):
+        s = pd.to_numeric(_to_string(s).str.replace(",", "", regex=False).str.strip())
+    return s.astype(dtype) if s.notna().all() else s
+
+
+def _to_date(s: pd.Series):
+    """yyyy-MM-dd 문자열 또는 날짜를 datetime64[ms]로"""
+    if pd.api.types.is_datetime64_dtype(s):
+        return s.astype("datetime64[ms]")
+    return pd.to_datetime(_to_string(s), format="%Y-%m-%d").astype("datetime64[ms]")
+
+
+def _to_category(s: pd.Series):
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s
+    return _to_string(s).astype("category")
+
+
+def conform(
+    df: pd.DataFrame,
+    data_type: Literal["trade", "bunyang", "sales", "rent"],
+    exclude: list = None,
+):
+    """df의 컬럼 타입을 data_type 스키마에 맞춤, 이미 맞는 컬럼은 그대로 둠
+    스키마 적용 이전에 저장된 파티션(문자열 거래금액/계약일 등)도 같은 타입으로 읽히도록 reader와 writer가 공통으로 사용
+
+    Args:
+        df: 변환할 dataframe
+        data_type: trade, bunyang, sales, rent
+        exclude: 변환하지 않을 컬럼(읽을 때의 파티션 컬럼 등)
+
+    Returns: 스키마 타입으로 변환된 dataframe(스키마에 없는 컬럼은 그대로 유지)
+    """
+    _df = df.copy(deep=False)
+    for field in SCHEMAS[data_type]:
+        if field.name not in _df.columns or (exclude and field.name in exclude):
+            continue
+        s = _df[field.name]
+        if pa.types.is_dictionary(field.type):
+            s = _to_category(s)
+        elif pa.types.is_date(field.type):
+            s = _to_date(s)
+        elif pa.types.is_integer(field.type):
+            s = _to_int(s, np.dtype(field.type.to_pandas_dtype()).name)
+        elif pa.types.is_floating(field.type):
+            s = s.astype(field.type.to_pandas_dtype())
+        elif pa.types.is_string(field.type):
+            s = _to_string(s)
+        _df[field.name] = s
+    return _df
+
+
+def to_table(
+    df: pd.DataFrame,
+    data_type: Literal["trade", "bunyang", "sales", "rent"],
+    schema: pa.Schema = None,
+):
+    """df를 스키마에 맞춘 pyarrow Table로 변환, 스키마에 없는 컬럼은 버리고 없는 컬럼이 있으면 에러
+
+    Args:
+        df: 저장할 dataframe
+        data_type: trade, bunyang, sales, rent
+        schema: 저장할 스키마(HISTORY_SCHEMA 등), default data_type의 스키마
+    """
+    if schema is None:
+        schema = SCHEMAS[data_type]
+    missing = [name for name in schema.names if name not in df.columns]
+    if missing:
+        raise ValueError(f"{missing} are not in dataframe for '{data_type}' schema")
+    _df = conform(df[schema.names], data_type)
+    return pa.Table.from_pandas(_df, schema=schema, preserve_index=False)
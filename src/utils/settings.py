@@ -0,0 +1,123 @@
+import os
+from pathlib import Path
+
+from dotenv import dotenv_values
+
+from .config import PathConfig
+
+
+# .env를 찾을 때 내려가지 않을 폴더(parquet 스냅샷, git 객체 등)
+_SKIP_DIRS = {
+    ".git",
+    "data",
+    "metastore",
+    "__pycache__",
+    ".ruff_cache",
+    ".venv",
+    "venv",
+}
+
+
+def find_env_file(fname: str = ".env", start_path: str = None):
+    """fname 파일을 start_path, start_path/src 순으로 먼저 확인하고, 없으면 데이터 폴더를 제외하고 하위 폴더 검색
+
+    Args:
+        fname: 환경변수를 설정한 파일명
+        start_path: 검색을 시작할 최상위 폴더, default PathConfig.root
+
+    Returns: 파일의 경로, 없으면 None
+    """
+    if not start_path:
+        start_path = PathConfig.root
+    for candidate in [Path(start_path, fname), Path(start_path, "src", fname)]:
+        if candidate.is_file():
+            return str(candidate)
+
+    paths = []
+    for current_path, dirs, file_list in os.walk(start_path):
+        dirs[:] = [d for d in dirs if d not in _SKIP_DIRS]
+        if fname in file_list:
+            paths.append(os.path.join(current_path, fname))
+    if len(paths) > 1:
+        raise ValueError(f"{paths=}\ntwo files detected. please make unique file")
+    return paths[0] if paths else None
+
+
+class Settings:
+    """.env와 환경변수를 프로세스에서 한 번만 읽고 키별 값을 메모이즈하는 설정 객체
+    환경변수가 .env 파일보다 우선함(load_dotenv와 동일)
+
+    Args:
+        fname: 환경변수를 설정한 파일명, default ".env"
+        start_path: fname을 찾을 최상위 폴더, default PathConfig.root
+        values: 직접 넣을 설정값(테스트나 다른 설정 주입용), 지정하면 .env를 읽지 않음
+    """
+
+    def __init__(
+        self, fname: str = ".env", start_path: str = None, values: dict = None
+    ):
+        self.fname = fname
+        self.start_path = start_path
+        self._file_values = dict(values) if values is not None else None
+        self._cache: dict = {}
+
+    @property
+    def file_values(self):
+        """.env 파일의 값, 처음 접근할 때 한 번만 검색하고 읽음"""
+        if self._file_values is None:
+            env_path = find_env_file(self.fname, start_path=self.start_path)
+            self._file_values = dict(dotenv_values(env_path)) if env_path else {}
+        return self._file_values
+
+    def get(self, key: str, default: str = None):
+        """key의 설정값, 없으면 default, default도 없으면 ValueError"""
+        value = self._cache.get(key)
+        if value is None:
+            value = os.environ.get(key) or self.file_values.get(key)
+            if value:
+                self._cache[key] = value
+        if not value:
+            if default is not None:
+                return default
+            raise ValueError(f"cant find env variable '{key}'")
+        return value
+
+    def __getitem__(self, key: str):
+        return self.get(key)
+
+    @property
+    def public_data_api_key(self):
+        return self.get("PUBLIC_DATA_API_KEY")
+
+    @property
+    def telegram_bot_token(self):
+        return self.get("TELEGRAM_BOT_TOKEN")
+
+    @property
+    def telegram_test_chat_id(self):
+        return self.get("TELEGRAM_TEST_CHAT_ID")
+
+    @property
+    def telegram_monthly_chat_id(self):
+        return self.get("TELEGRAM_MONTHLY_CHAT_ID")
+
+    @property
+    def telegram_detail_chat_id(self):
+        return self.get("TELEGRAM_DETAIL_CHAT_ID")
+
+
+_SETTINGS: dict = {}
+
+
+def get_settings(fname: str = ".env", start_path: str = None):
+    """프로세스 단위로 공유하는 Settings, (fname, start_path)마다 하나만 생성"""
+    key = (fname, str(start_path or PathConfig.root))
+    settings = _SETTINGS.get(key)
+    if settings is None:
+        settings = _SETTINGS[key] = Settings(fname=fname, start_path=start_path)
+    return settings
+
+
+def set_settings(settings: Settings):
+    """기본 Settings를 교체(주입)"""
+    _SETTINGS[(settings.fname, str(settings.start_path or PathConfig.root))] = settings
@@ -0,0 +1,461 @@
+import os
+import shutil
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from .config import PathConfig, StorageConfig
+from .dataset import list_partitions, read_table, write_dataset
+from .listing_log import list_listing_dates
+from .schema import conform
+
+# pk의 순번(seq)을 매길 때 사용하는 정렬 순서
+TRADE_SORT_COLUMNS = [
+    "거래구분",
+    "아파트명",
+    "시군구코드",
+    "법정동",
+    "계약일",
+    "전용면적",
+    "거래금액",
+    "층",
+    "거래유형",
+    "거래구분",
+    "date_id",
+]
+TRADE_PK_GROUP_COLUMNS = ["거래구분", "아파트명", "시군구코드", "법정동", "date_id"]
+# delta 저장소에서 거래 하나를 구분하는 값 컬럼(계약해지여부 등 나중에 채워지는 값은 제외)
+TRADE_KEY_COLUMNS = [
+    "거래구분",
+    "아파트명",
+    "시군구코드",
+    "법정동",
+    "계약일",
+    "전용면적",
+    "거래금액",
+    "층",
+    "동",
+    "거래유형",
+]
+# pk를 만들 때 컬럼별 hash를 섞는 값(FNV-1a 64bit prime)
+_HASH_PRIME = 0x100000001B3
+# pk/변경 비교에서 제외할 컬럼, date_id마다 달라지는 값
+_VOLATILE_COLUMNS = ["신규거래", "date_id", "month_id"]
+
+
+def _factorize(df: pd.DataFrame, columns: list):
+    """컬럼별로 정렬 순서를 유지하는 정수 코드와 unique 값을 계산
+    결측도 하나의 값으로 취급하며 sort_values처럼 마지막 순서가 된다
+
+    Returns: {컬럼명: (codes, uniques)}
+    """
+    return {
+        col: pd.factorize(df[col], sort=True, use_na_sentinel=False)
+        for col in dict.fromkeys(columns)
+    }
+
+
+def trade_sort_order(df: pd.DataFrame, factorized: dict = None):
+    """TRADE_SORT_COLUMNS로 정렬했을 때의 위치 배열
+    컬럼마다 정수 코드로 바꾸고, 코드들을 int64 몇 개로 합친 뒤 정렬하므로 문자열 비교를 반복하지 않는다
+    """
+    if factorized is None:
+        factorized = _factorize(df, TRADE_SORT_COLUMNS)
+    # 앞 컬럼부터 자릿수(unique 개수)를 곱해서 int64 범위 안에서 하나의 키로 합침
+    keys = []
+    key, size = None, 1
+    for col in TRADE_SORT_COLUMNS:
+        codes, uniques = factorized[col]
+        n = len(uniques) + 1
+        if key is None or size * n >= 2**62:
+            if key is not None:
+                keys.append(key)
+            key, size = codes.astype("int64"), n
+        else:
+            key, size = key * n + codes, size * n
+    keys.append(key)
+    if len(keys) == 1:
+        return np.argsort(keys[0], kind="stable")
+    return np.lexsort(keys[::-1])
+
+
+def _hash_codes(codes: np.ndarray, uniques):
+    """unique 값만 hash한 뒤 codes로 펼침"""
+    return pd.util.hash_array(np.asarray(uniques, dtype=object))[codes]
+
+
+def generate_trade_pk(df: pd.DataFrame, with_order: bool = False):
+    """신규거래 비교에 쓰는 실거래/분양권 row의 pk 생성
+    (거래구분, 아파트명, 시군구코드, 법정동, date_id) 그룹 안에서 정렬된 순번(seq)을 붙이고,
+    (거래구분 첫 글자, 아파트명, 시군구코드, 법정동, seq)를 uint64로 hash한다
+    그룹의 거래 수가 늘어난 만큼을 신규로 보는 기존 기준이라, 저장소에서 거래를 구분할 때는 generate_row_pk 사용
+
+    Args:
+        df: pk를 생성할 dataframe
+        with_order: trade_sort_order 결과도 같이 반환할지 여부
+
+    Returns: df와 같은 index를 갖는 pk Series(uint64), with_order면 (pk, 정렬 위치 배열)
+    """
+    factorized = _factorize(df, TRADE_SORT_COLUMNS)
+    order = trade_sort_order(df, factorized)
+
+    groups = pd.DataFrame(
+        {col: factorized[col][0][order] for col in TRADE_PK_GROUP_COLUMNS}
+    )
+    seq = np.empty(len(df), dtype="uint64")
+    seq[order] = (
+        groups.groupby(TRADE_PK_GROUP_COLUMNS, sort=False).cumcount().to_numpy() + 1
+    )
+
+    # 거래구분은 첫 글자만 사용
+    codes, uniques = factorized["거래구분"]
+    pk = _hash_codes(codes, pd.Index(uniques).str[0])
+    for col in ["아파트명", "시군구코드", "법정동"]:
+        pk = pk * np.uint64(_HASH_PRIME) ^ _hash_codes(*factorized[col])
+    pk = pk * np.uint64(_HASH_PRIME) ^ pd.util.hash_array(seq)
+    pk = pd.Series(pk, index=df.index, name="pk")
+    if with_order:
+        return pk, order
+    return pk
+
+
+def generate_row_pk(df: pd.DataFrame):
+    """delta 저장소에서 거래 하나를 구분하는 pk 생성
+    TRADE_KEY_COLUMNS 값만 uint64로 hash하므로 다른 거래가 추가/삭제되어도 pk가 바뀌지 않고,
+    값이 모두 같은 중복 거래끼리만 나머지 컬럼 순서로 순번(seq)을 붙여서 구분한다
+
+    Args:
+        df: conform으로 스키마 타입을 맞춘 dataframe
+
+    Returns: df와 같은 index를 갖는 pk Series(uint64)
+    """
+    key = np.zeros(len(df), dtype="uint64")
+    for col in [c for c in TRADE_KEY_COLUMNS if c in df.columns]:
+        codes, uniques = pd.factorize(df[col], use_na_sentinel=False)
+        key = key * np.uint64(_HASH_PRIME) ^ _hash_codes(codes, uniques)
+    # 중복 거래 안에서는 나머지 값의 hash 순서로 순번을 매겨서 실행마다 같은 pk가 나오게 함
+    order = np.lexsort([_row_hash(df), key])
+    seq = np.empty(len(df), dtype="uint64")
+    seq[order] = (
+        pd.Series(key[order]).groupby(key[order], sort=False).cumcount().to_numpy()
+    )
+    pk = key * np.uint64(_HASH_PRIME) ^ pd.util.hash_array(seq)
+    return pd.Series(pk, index=df.index, name="pk")
+
+
+def _base_path(data_type: str, month_id):
+    return Path(PathConfig.deltas).joinpath(
+        data_type, "base", f"month_id={month_id}", "base.parquet"
+    )
+
+
+def _delta_path(data_type: str, month_id, date_id: str):
+    return Path(PathConfig.deltas).joinpath(
+        data_type,
+        "delta",
+        f"month_id={month_id}",
+        f"date_id={date_id}",
+        "delta.parquet",
+    )
+
+
+def _write(df: pd.DataFrame, path: Path):
+    os.makedirs(path.parent, exist_ok=True)
+    df.to_parquet(path, engine="pyarrow", index=False)
+
+
+def _delta_dates(data_type: str, month_id):
+    """month_id에 저장된 delta의 date_id 목록(오름차순)"""
+    month_path = Path(PathConfig.deltas).joinpath(
+        data_type, "delta", f"month_id={month_id}"
+    )
+    if not month_path.exists():
+        return []
+    return sorted(
+        p.name.split("=", 1)[1]
+        for p in month_path.iterdir()
+        if p.name.startswith("date_id=")
+    )
+
+
+def _row_hash(df: pd.DataFrame):
+    """pk를 제외한 값 컬럼들로 row별 hash를 계산해서 변경 여부 비교에 사용"""
+    columns = [c for c in df.columns if c not in _VOLATILE_COLUMNS + ["pk"]]
+    # None / NaN이 섞여 있어도 같은 값으로 비교되도록 빈 문자열로 통일
+    values = df[columns].astype(object).fillna("").astype(str)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+def _read_state(data_type: str, month_id, date_id: str = None, until: str = None):
+    """base + delta를 합쳐서 pk별 최신 상태를 만든다
+
+    Args:
+        date_id: 해당 date_id까지(포함)의 delta 반영
+        until: 해당 date_id 이전(미포함)까지의 delta 반영
+
+    Returns: (상태 dataframe, base의 date_id), base가 없으면 (None, None)
+    """
+    base_path = _base_path(data_type, month_id)
+    if not base_path.exists():
+        return None, None
+    base = read_table(base_path).to_pandas(date_as_object=False)
+    base_date_id = base["date_id"].iloc[0] if len(base) else None
+    base["_op"] = "insert"
+
+    dates = [d for d in _delta_dates(data_type, month_id) if d > (base_date_id or "")]
+    if date_id:
+        dates = [d for d in dates if d <= date_id]
+    if until:
+        dates = [d for d in dates if d < until]
+    deltas = []
+    for d in dates:
+        delta = read_table(_delta_path(data_type, month_id, d)).to_pandas(
+            date_as_object=False
+        )
+        delta["date_id"] = d
+        deltas.append(delta)
+
+    state = pd.concat([base, *deltas], ignore_index=True)
+    # pk별로 가장 마지막 변경만 남기고, 삭제된 pk는 제외
+    state = state.drop_duplicates("pk", keep="last")
+    state = state[state["_op"] != "delete"]
+    # delete row의 결측 때문에 바뀐 타입(int -> float 등)과 합치면서 object가 된 category를 스키마 타입으로 되돌림
+    # base의 category로 astype하면 delta에만 있는 값(새 아파트명 등)이 결측이 되므로 conform 사용
+    state = conform(state, data_type)
+    return state, base_date_id
+
+
+def read_delta(
+    data_type: Literal["trade", "bunyang"],
+    month_id,
+    date_id: str,
+):
+    """base + delta로 month_id의 date_id 시점 데이터를 복원
+
+    Args:
+        data_type: trade, bunyang
+        month_id: yyyyMM
+        date_id: 복원할 시점 yyyy-MM-dd
+
+    Returns: snapshot과 같은 형태의 dataframe, 데이터가 없으면 빈 dataframe
+    """
+    state, base_date_id = _read_state(data_type, month_id, date_id=date_id)
+    if state is None or base_date_id is None or base_date_id > date_id:
+        return pd.DataFrame()
+
+    # 신규거래는 해당 date_id의 delta에 저장된 값만 유효
+    if date_id != base_date_id:
+        state["신규거래"] = np.where(
+            state["date_id"] == date_id, state["신규거래"], None
+        )
+    state["date_id"] = date_id
+    state["month_id"] = int(month_id)
+    return state.drop(columns=["pk", "_op"]).reset_index(drop=True)
+
+
+def write_delta(
+    df: pd.DataFrame,
+    data_type: Literal["trade", "bunyang"],
+    month_id,
+    date_id: str,
+):
+    """date_id 시점의 month_id 전체 데이터(df)를 직전 상태와 비교해서 변경분만 저장
+    month_id에 base가 없으면 df를 base로 저장한다
+    이미 저장된 date_id보다 이전이나 같은 날짜를 저장하면 이후 날짜의 delta를 다시 계산(_rebase)
+
+    Args:
+        df: date_id 시점의 해당 월 전체 데이터
+        data_type: trade, bunyang
+        month_id: yyyyMM
+        date_id: yyyy-MM-dd
+    """
+    cur = (
+        conform(df, data_type)
+        .drop(columns=["month_id"], errors="ignore")
+        .reset_index(drop=True)
+    )
+    cur["pk"] = generate_row_pk(cur)
+
+    later = [
+        d
+        for m, d in list_delta_partitions(data_type, month_id=month_id)
+        if d >= date_id
+    ]
+    if later:
+        _rebase(cur, data_type, month_id, date_id, later)
+        return
+
+    prev, base_date_id = _read_state(data_type, month_id, until=date_id)
+    if prev is None or base_date_id is None or base_date_id >= date_id:
+        # base 이전 시점의 delta는 _read_state에서 무시된다
+        _write(cur, _base_path(data_type, month_id))
+        logger.info(f"Save the base in '{_base_path(data_type, month_id)}'")
+        return
+
+    prev = prev.drop(columns=["_op"])
+    merged = (
+        cur[["pk"]]
+        .assign(_cur_hash=_row_hash(cur))
+        .merge(
+            prev[["pk"]].assign(_prev_hash=_row_hash(prev)),
+            on="pk",
+            how="outer",
+            indicator=True,
+        )
+    )
+    inserted = merged.loc[merged["_merge"] == "left_only", "pk"]
+    deleted = merged.loc[merged["_merge"] == "right_only", "pk"]
+    changed = merged.loc[
+        (merged["_merge"] == "both") & (merged["_cur_hash"] != merged["_prev_hash"]),
+        "pk",
+    ]
+
+    # 신규거래로 표시된 row는 값이 같아도 delta에 포함해서 해당 date_id의 표시를 보존
+    is_new = cur["신규거래"].eq("신규")
+    upserts = cur[cur["pk"].isin(inserted) | cur["pk"].isin(changed) | is_new].copy()
+    # 기존 거래에 계약해지여부가 새로 채워지면 cancel, 그 외 값 변경은 update
+    prev_cancel = upserts["pk"].map(prev.set_index("pk")["계약해지여부"])
+    is_cancel = upserts["계약해지여부"].notna() & prev_cancel.isna()
+    upserts["_op"] = np.where(
+        upserts["pk"].isin(inserted), "insert", np.where(is_cancel, "cancel", "update")
+    )
+    deletes = pd.DataFrame({"pk": deleted.to_numpy(), "_op": "delete"})
+    delta = pd.concat([upserts, deletes], ignore_index=True).drop(columns=["date_id"])
+    _write(delta, _delta_path(data_type, month_id, date_id))
+    logger.info(
+        f"Save the delta in '{_delta_path(data_type, month_id, date_id)}' "
+        f"(insert: {len(inserted)}, update: {len(changed)}, delete: {len(deleted)})"
+    )
+
+
+def _rebase(cur: pd.DataFrame, data_type: str, month_id, date_id: str, later: list):
+    """이미 저장된 date_id(later) 이전이나 같은 날짜를 다시 저장
+    later 시점의 데이터를 복원해두고 later의 delta(와 base)를 지운 뒤, date_id부터 날짜 순서대로 다시 저장해서
+    이후 delta가 바뀐 이력을 기준으로 다시 계산되게 한다
+    """
+    snapshots = {d: read_delta(data_type, month_id, d) for d in later if d != date_id}
+    base_path = _base_path(data_type, month_id)
+    base = read_table(base_path, columns=["date_id"]).to_pandas()
+    if len(base) == 0 or base["date_id"].iloc[0] >= date_id:
+        base_path.unlink()
+    for d in later:
+        shutil.rmtree(_delta_path(data_type, month_id, d).parent, ignore_errors=True)
+    logger.info(
+        f"Rebase {data_type} {month_id} from {date_id} ({len(snapshots)} later date_id)"
+    )
+    write_delta(
+        cur.drop(columns=["pk"]),
+        data_type=data_type,
+        month_id=month_id,
+        date_id=date_id,
+    )
+    for d, snapshot in snapshots.items():
+        write_delta(snapshot, data_type=data_type, month_id=month_id, date_id=d)
+
+
+def save_dataframe(
+    df: pd.DataFrame,
+    data_type: Literal["trade", "bunyang"],
+    month_id,
+    date_id: str,
+    mode: Literal["snapshot", "delta"] = None,
+):
+    """StorageConfig.mode에 따라 실거래/분양권 데이터를 저장
+
+    Args:
+        df: date_id 시점의 해당 월 전체 데이터
+        data_type: trade, bunyang
+        month_id: yyyyMM
+        date_id: yyyy-MM-dd
+        mode: 저장 방식, default StorageConfig.mode
+    """
+    if not mode:
+        mode = StorageConfig.mode
+    if mode == "delta":
+        write_delta(df, data_type=data_type, month_id=month_id, date_id=date_id)
+        return
+    # 스키마에 맞춰 Parquet로 Overwrite 저장
+    path = getattr(PathConfig, data_type)
+    write_dataset(df, data_type)
+    logger.info(f"Save the data in '{path}/month_id={month_id}/date_id={date_id}'")
+
+
+def has_partition(
+    data_type: Literal["trade", "bunyang", "sales", "rent"],
+    month_id=None,
+    date_id: str = None,
+    mode: Literal["snapshot", "delta"] = None,
+):
+    """date_id 시점의 데이터가 이미 저장되어 있는지 확인
+
+    Args:
+        data_type: trade, bunyang, sales, rent
+        month_id: yyyyMM, sales, rent는 무시
+        date_id: yyyy-MM-dd
+        mode: 저장 방식, default StorageConfig.mode(sales, rent는 StorageConfig.listing_mode)
+    """
+    if data_type in ["sales", "rent"]:
+        if (mode or StorageConfig.listing_mode) == "events":
+            return date_id in list_listing_dates(data_type)
+        return bool(list_partitions(data_type, date_id=date_id))
+    if not mode:
+        mode = StorageConfig.mode
+    if mode == "delta":
+        return (str(month_id), date_id) in list_delta_partitions(
+            data_type, month_id=month_id
+        )
+    return bool(list_partitions(data_type, month_id=month_id, date_id=date_id))
+
+
+def list_delta_partitions(data_type: Literal["trade", "bunyang"], month_id=None):
+    """delta 저장소에 저장된 (month_id, date_id) 목록
+
+    Args:
+        data_type: trade, bunyang
+        month_id: 특정 month_id만 조회
+    """
+    base_root = Path(PathConfig.deltas).joinpath(data_type, "base")
+    if not base_root.exists():
+        return []
+    months = sorted(
+        p.name.split("=", 1)[1]
+        for p in base_root.iterdir()
+        if p.name.startswith("month_id=")
+    )
+    if month_id:
+        months = [m for m in months if m == str(month_id)]
+    partitions = []
+    for m in months:
+        if not _base_path(data_type, m).exists():
+            continue
+        base = read_table(_base_path(data_type, m), columns=["date_id"]).to_pandas()
+        base_date_id = base["date_id"].iloc[0] if len(base) else ""
+        dates = [base_date_id] + [
+            d for d in _delta_dates(data_type, m) if d > base_date_id
+        ]
+        partitions.extend((m, d) for d in dates if d)
+    return partitions
+
+
+def delta_files(data_type: Literal["trade", "bunyang"], month_id, date_id: str):
+    """month_id의 date_id 상태를 만드는 데 필요한 파일 목록(read_delta가 읽는 것과 같은 파일)
+
+    Args:
+        data_type: trade, bunyang
+        month_id: yyyyMM
+        date_id: 해당 date_id까지(포함)의 delta
+
+    Returns: [base 경로, delta 경로...], base가 없으면 빈 리스트
+    """
+    base_path = _base_path(data_type, month_id)
+    if not base_path.exists():
+        return []
+    base = read_table(base_path, columns=["date_id"]).to_pandas()
+    base_date_id = base["date_id"].iloc[0] if len(base) else ""
+    dates = [
+        d for d in _delta_dates(data_type, month_id) if base_date_id < d <= date_id
+    ]
+    return [base_path, *[_delta_path(data_type, month_id, d) for d in dates]]
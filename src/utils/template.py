@@ -1,5 +1,46 @@
+import math
 from textwrap import dedent
 
+from jinja2 import Environment
+
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def eok(value, unit: int = 1, digits: int = 2, sign: bool = False):
+    """금액을 억 단위 문자열로, 결측은 '-'
+
+    Args:
+        value: 금액
+        unit: value의 단위, 원 1, 만원 10000
+        digits: 소수점 자리수
+        sign: 양수에도 +를 붙일지 여부(전일대비 등)
+    """
+    if _missing(value):
+        return "-"
+    return f"{value * unit / 1e8:{'+' if sign else ''}.{digits}f}억"
+
+
+def pyeong(area):
+    """전용면적(㎡)을 '84(32평)' 형태로, 공급면적 평형은 전용면적 / 3.3 + 7로 어림"""
+    if _missing(area):
+        return "-"
+    return f"{int(area)}({int(area / 3.3 + 7)}평)"
+
+
+def gae(value, sign: bool = False):
+    """개수를 '12개' 형태로, 결측은 '-'"""
+    if _missing(value):
+        return "-"
+    return f"{int(value):{'+' if sign else ''}d}개"
+
+
+# 템플릿은 한 번만 컴파일해서 재사용, zip/len과 포맷 필터는 환경에 등록
+TEMPLATE_ENV = Environment()
+TEMPLATE_ENV.globals.update(zip=zip, len=len)
+TEMPLATE_ENV.filters.update(eok=eok, pyeong=pyeong, gae=gae)
+
 
 class TelegramTemplate:
     DAILY_STATUS = dedent(
@@ -20,12 +61,15 @@ class TelegramTemplate:
     {%- if len(data) == 0 %}
     없음{% else %}
     {%- for row in data %}
-    {%- for k, v in row.items() %}
-    {% if loop.first %} 🏠 [{{ v }}]
-    {%- else %}  - {{ k }}: {{ v }}
-    {%- endif %}
-    {%- endfor %}
-    
+     🏠 [{{ row['아파트명'] }}]
+      - 시군구코드: {{ row['시군구코드'] }}
+      - 법정동: {{ row['법정동'] }}
+      - 계약일: {{ row['계약일'] }}
+      - 전용면적: {{ row['전용면적'] | pyeong }}
+      - 층: {{ row['층'] }}
+      - 거래금액: {{ row['거래금액'] | eok(10000) }}
+      - 거래유형: {{ row['거래유형'] }}
+
     {% endfor %}
     {% endif %}
     """
@@ -36,11 +80,32 @@ class TelegramTemplate:
     ⭐ 최근 7일까지 확인된 매물 집계(84타입)
     {%- for t, m in zip(this_data, merged_data) %}
     🏢 {{ t['아파트명'] }} (전일대비, 억)
-      - 평균: {{ t['평균'] }} ({{ m['평균'] }})
-      - 중앙값: {{ t['중앙'] }} ({{ m['중앙'] }})
-      - 최대: {{ t['최대'] }} ({{ m['최대'] }})
-      - 최저: {{ t['최저'] }} ({{ m['최저'] }})
-      - 매물수: {{ t['매물수'] }} ({{ m['매물수'] }})
+      - 평균: {{ t['평균'] | eok }} ({{ m['평균'] | eok(sign=True) }})
+      - 중앙값: {{ t['중앙'] | eok }} ({{ m['중앙'] | eok(sign=True) }})
+      - 최대: {{ t['최대'] | eok }} ({{ m['최대'] | eok(sign=True) }})
+      - 최저: {{ t['최저'] | eok }} ({{ m['최저'] | eok(sign=True) }})
+      - 매물수: {{ t['매물수'] | gae }} ({{ m['매물수'] | gae(sign=True) }})
     {% endfor %}
     """
     )
+
+    _compiled: dict = {}
+
+    @classmethod
+    def get(cls, name: str):
+        """name(DAILY_STATUS 등) 템플릿을 TEMPLATE_ENV로 컴파일, 프로세스에서 한 번만 컴파일"""
+        template = cls._compiled.get(name)
+        if template is None:
+            template = cls._compiled[name] = TEMPLATE_ENV.from_string(
+                getattr(cls, name)
+            )
+        return template
+
+    @classmethod
+    def render(cls, name: str, **context):
+        """컴파일된 name 템플릿으로 메세지 생성
+
+        Examples:
+            TelegramTemplate.render("DAILY_DIFFERENCE", month=..., date_id=..., data=[...])
+        """
+        return cls.get(name).render(**context)
@@ -1,19 +1,21 @@
 import os
-import requests
 import asyncio
-from io import StringIO
+from io import BytesIO
+from xml.etree import ElementTree
 from datetime import datetime
 from typing import Literal
 import inspect
 import platform
 
-import telegram
 import pandas as pd
-from bs4 import BeautifulSoup
-from dotenv import load_dotenv
+from dateutil.relativedelta import relativedelta
 from loguru import logger
-from .config import PathConfig
+from .client import http_get
+from .dispatcher import get_dispatcher
+from .config import ColumnConfig, PathConfig, SchemaConfig, URLConfig
 from .metastore import Metastore
+from .settings import Settings, get_settings
+from .region import get_region_index
 
 
 def get_funcname(stack_index: int = None):
@@ -29,58 +31,145 @@ def get_funcname(stack_index: int = None):
 
 def load_env(key: str = None, fname=".env", start_path=None):
     """1) 환경변수 설정이 되었는지 검색하고, 2) 설정값이 없으면 환경변수가 정의된 파일을찾는다
+    파일 검색과 읽기는 프로세스에서 한 번만 하고, 이후에는 Settings에 메모이즈된 값을 사용
+
     Args:
         key: 검색할 환경변수 키
         fname: 환경변수를 설정한 파일명, default ".env"
         start_path: fname을 찾을 최상위 폴더, 해당 root(apt_trade)에서부터 sub folder를 재귀적으로 탐색
 
     """
+    return get_settings(fname=fname, start_path=start_path).get(key)
+
+
+def _iterparse_rows(response, tag: str = "items"):
+    """xml을 한 번만 스트리밍으로 읽어서 tag 하위 row들을 컬럼별 리스트로 모은다
+
+    Args:
+        response: Reponse받은 텍스트값. response.text
+        tag: response의 데이터 태그, 해당 태그의 자식 element 하나가 row 하나
+
+    Returns: (totalCount, {컬럼명: 값 리스트}, row 수), totalCount가 없으면 None
+    """
+    if isinstance(response, str):
+        response = response.encode("utf-8")
+    total_cnt = None
+    columns = {}
+    n_rows = 0
+    depth = 0
+    row_depth = None  # tag 바로 아래 element의 깊이
+    for event, elem in ElementTree.iterparse(
+        BytesIO(response), events=("start", "end")
+    ):
+        if event == "start":
+            depth += 1
+            if elem.tag == tag and row_depth is None:
+                row_depth = depth + 1
+            continue
+        if depth == row_depth:
+            for child in elem:
+                column = columns.get(child.tag)
+                if column is None:
+                    column = columns[child.tag] = [None] * n_rows
+                column.append(child.text)
+            n_rows += 1
+            # 해당 row에 없는 태그는 None으로 채움
+            for column in columns.values():
+                if len(column) < n_rows:
+                    column.append(None)
+            elem.clear()
+        elif elem.tag == "totalCount":
+            total_cnt = int(elem.text)
+        depth -= 1
+    return total_cnt, columns, n_rows
+
+
+def _to_typed_frame(columns: dict, dtypes: dict = None):
+    """컬럼별 리스트를 dtypes에 맞춰 DataFrame으로 변환, dtypes에 없는 컬럼은 문자열 그대로 둔다"""
+    df = pd.DataFrame(columns)
+    for col, dtype in (dtypes or {}).items():
+        if col not in df.columns:
+            continue
+        values = pd.to_numeric(df[col].str.strip(), errors="coerce")
+        # 결측이 있으면 정수형으로 변환할 수 없으므로 float로 남겨둠
+        df[col] = values if values.hasnans else values.astype(dtype)
+    return df
 
-    env_path = find_file(fname, start_path=start_path)
-    if isinstance(env_path, list) and len(env_path) > 1:
-        raise ValueError(f"{env_path=}\ntwo files detected. please make unique file")
-    load_dotenv(env_path)
-    env = os.getenv(key, None)
-    if not env:
-        raise ValueError(f"cant find env variable '{key}'")
-    return env
 
+def parse_total_count(response: str):
+    """공공데이터 API 응답에서 totalCount(전체 건수)만 파싱
+    xml 트리를 만들지 않고 태그 위치만 찾는다
 
-def parse_xml(response: str, tag):
+    Args:
+        response: Reponse받은 텍스트값. response.text
+    """
+    start = response.rfind("<totalCount>")
+    if start < 0:
+        raise ValueError(f"'totalCount' not found in response\n{response[:200]}")
+    start += len("<totalCount>")
+    return int(response[start : response.index("</totalCount>", start)])
+
+
+def parse_xml(response: str, tag: str = "items", dtypes: dict = None):
     """xml 데이터를 파싱해서 Pandas DataFrame으로 반환
+    iterparse로 한 번만 읽어서 컬럼 배열로 바로 쌓는다
+
+    Args:
+        response: Reponse받은 텍스트값. response.text
+        tag: response의 데이터 태그
+        dtypes: xml 태그별 타입, default SchemaConfig.trade_xml
+    """
+    return parse_public_api_xml(response, tag=tag, dtypes=dtypes)[1]
+
+
+def parse_public_api_xml(response: str, tag: str = "items", dtypes: dict = None):
+    """공공데이터 API 응답에서 totalCount와 데이터를 한 번에 파싱
 
     Args:
         response: Reponse받은 텍스트값. response.text
         tag: response의 데이터 태그
+        dtypes: xml 태그별 타입, default SchemaConfig.trade_xml
+
+    Returns: (totalCount, Pandas DataFrame)
+    """
+    if dtypes is None:
+        dtypes = SchemaConfig.trade_xml
+    total_cnt, columns, _ = _iterparse_rows(response, tag)
+    return total_cnt, _to_typed_frame(columns, dtypes)
+
+
+def parse_listing_json(pages: list, price_key: str = "dealPrice"):
+    """네이버 매물 API 응답(json) 페이지 리스트를 컬럼별 리스트에 모은 뒤 DataFrame 하나로 변환
+
+    Args:
+        pages: json.loads한 페이지별 응답
+        price_key: priceInfo에서 가져올 가격 키, FilterConfig.price_code의 값
+
+    Returns: ColumnConfig.LISTING_DICTIONARY의 컬럼을 가진 DataFrame, 매물이 없으면 빈 DataFrame
     """
-    soup = BeautifulSoup(response, "xml")
-    data = soup.findAll(tag)[0].decode()
-    return pd.read_xml(StringIO(data))
+    paths = {**ColumnConfig.LISTING_DICTIONARY, "가격": ("priceInfo", price_key)}
+    columns = {col: [] for col in paths}
+    for page in pages:
+        for article in page["result"]["list"]:
+            info = article["representativeArticleInfo"]
+            for col, path in paths.items():
+                value = info
+                for key in path:
+                    value = value[key]
+                columns[col].append(value)
+    return pd.DataFrame(columns)
 
 
 def get_lawd_cd(fname: str = "lawd_cd.csv"):
     """법정동코드를 다운받아서 서울특별시 코드 5자리만 파싱
     https://www.code.go.kr/stdcode/regCodeL.do 에서 [법정동 코드 전체 자료] 다운로드 후 사용
+    파일은 프로세스에서 한 번만 읽고, 캐시된 RegionIndex에서 DataFrame을 만들어 반환
 
     Args:
         path: 법정동 코드 파일의 path
     Returns: [시군구명, 법정동코드 5자리]로 파싱된 Pandas DataFrame
     """
-    path = find_file(fname)
-
-    # int로 추론됨, str로 변경 필요
-    df = pd.read_csv(path).astype(str)
-    # umd_cd, ri_cd가 0으로 되어야 구 레벨의 코드
-    df = df[df["region_cd"] == df["sido_cd"] + df["sgg_cd"] + "00000"]
-    # 도 레벨(서울특별시) 코드 제거
-    df = df[df["sgg_cd"] != "000"]
-
-    # API에 넣을 법정동 코드 파싱하여, 시군구명과 함께 저장
-    df["lawd_cd"] = df["region_cd"].str[:5]
-    df = df[["locallow_nm", "lawd_cd"]]
-    df.columns = ["sgg_nm", "lawd_cd"]
-
-    return df
+    return get_region_index(fname).frame()
 
 
 def find_file(fname: str, start_path: str = None):
@@ -122,6 +211,23 @@ def get_task_id(file_dunder: str, *args):
     return f"{basename}_{'_'.join(str(arg) for arg in args)}"
 
 
+def get_target_months(date_id: str = None):
+    """date_id에 수집/알림할 (지난달, 이번달) yyyyMM, 매월 1일은 한 달씩 앞당김
+
+    Args:
+        date_id: yyyy-MM-dd, default 오늘
+
+    Returns: (last_month, this_month) int 튜플
+    """
+    date = datetime.strptime(date_id, "%Y-%m-%d") if date_id else datetime.now()
+    # 1일이면 해당 월이 아니라 직전월 데이터를 가져옴
+    if date.day == 1:
+        date = date - relativedelta(months=1)
+    this_month = int(date.strftime("%Y%m"))
+    last_month = int((date - relativedelta(months=1)).strftime("%Y%m"))
+    return last_month, this_month
+
+
 class BatchManager:
     """metastore에 실행되었는지 확인후, 실행되지 않았으면 func을 실행하는 데코레이터
 
@@ -129,7 +235,6 @@ class BatchManager:
         task_id: metastore에서 체크할 task_id, get_task_id 함수로 생성
         key: metastore의 key
         func: 실행할 함수
-        if_message: telegram 메세지인 경우 True(async 사용 때문)
     """
 
     def __init__(
@@ -162,80 +267,81 @@ class BatchManager:
         """
         func(*args, **kwargs)
 
+    # 텔레그램 전송은 공유 dispatcher의 큐에 넣고 기다리지 않음, 실패하면 _watch에서 로그 전송
     def send_message(self, text, chat_id, token):
-        asyncio.run(send_message(text=text, chat_id=chat_id, token=token))
+        token, chat_id = _resolve_telegram(token, chat_id)
+        self._watch(get_dispatcher(token).send_message(text, chat_id), token)
 
     def send_photo(self, photo, chat_id, token):
-        asyncio.run(send_photo(photo=photo, chat_id=chat_id, token=token))
+        token, chat_id = _resolve_telegram(token, chat_id)
+        self._watch(get_dispatcher(token).send_photo(photo, chat_id), token)
+
+    def send_media_group(self, photos, chat_id, token, caption=None):
+        token, chat_id = _resolve_telegram(token, chat_id)
+        for future in get_dispatcher(token).send_media_group(
+            photos, chat_id, caption=caption
+        ):
+            self._watch(future, token)
 
     def send_log(self, text, chat_id, token):
-        asyncio.run(send_log(text=text, chat_id=chat_id, token=token))
+        token, chat_id = _resolve_telegram(token, chat_id)
+        get_dispatcher(token).send_message(_log_text(text), chat_id)
+
+    def _watch(self, future, token):
+        def done(f):
+            if f.cancelled() or f.exception() is None:
+                return
+            msg = f"{self.task_id}\n:{repr(f.exception())}"
+            logger.error(msg)
+            self.send_log(text=msg, chat_id=None, token=token)
+
+        future.add_done_callback(done)
+
+    def _run(self, task_type, func, *args, **kwargs):
+        try:
+            if task_type == "message":
+                self.send_message(
+                    text=kwargs.get("text", None),
+                    chat_id=kwargs.get("chat_id", None),
+                    token=kwargs.get("token", None),
+                )
+            if task_type == "photo":
+                self.send_photo(
+                    photo=kwargs.get("photo", None),
+                    chat_id=kwargs.get("chat_id", None),
+                    token=kwargs.get("token", None),
+                )
+            if task_type == "media_group":
+                self.send_media_group(
+                    photos=kwargs.get("photos", None),
+                    chat_id=kwargs.get("chat_id", None),
+                    token=kwargs.get("token", None),
+                    caption=kwargs.get("caption", None),
+                )
+            if task_type == "execute":
+                self.execute(func, *args, **kwargs)
+        except Exception as e:
+            msg = f"{self.task_id}\n:{repr(e)}"
+            logger.error(msg)
+            self.send_log(
+                text=msg,
+                chat_id=None,
+                token=kwargs.get("token", None),
+            )
 
     def __call__(
         self,
-        task_type: Literal["message", "photo", "execute"],
+        task_type: Literal["message", "photo", "media_group", "execute"],
         func,
         task_id=None,
         *args,
         **kwargs,
     ):
-        if self.block:
-            meta = Metastore()
-            if not meta[self.key]:
-                meta.setdefault(self.key, [])
-                meta.commit()
-            if self.task_id in meta[self.key]:
-                logger.info(f"{self.task_id} already executed.")
-                return
-            else:
-                try:
-                    meta.add(key=self.key, value=self.task_id)
-                    if task_type == "message":
-                        self.send_message(
-                            text=kwargs.get("text", None),
-                            chat_id=kwargs.get("chat_id", None),
-                            token=kwargs.get("token", None),
-                        )
-                    if task_type == "photo":
-                        self.send_photo(
-                            photo=kwargs.get("photo", None),
-                            chat_id=kwargs.get("chat_id", None),
-                            token=kwargs.get("token", None),
-                        )
-                    if task_type == "execute":
-                        self.execute(func, *args, **kwargs)
-                except Exception as e:
-                    msg = f"{self.task_id}\n:{repr(e)}"
-                    logger.error(msg)
-                    self.send_log(
-                        text=msg,
-                        chat_id=None,
-                        token=kwargs.get("token", None),
-                    )
-        else:
-            try:
-                if task_type == "message":
-                    self.send_message(
-                        text=kwargs.get("text", None),
-                        chat_id=kwargs.get("chat_id", None),
-                        token=kwargs.get("token", None),
-                    )
-                if task_type == "photo":
-                    self.send_photo(
-                        photo=kwargs.get("photo", None),
-                        chat_id=kwargs.get("chat_id", None),
-                        token=kwargs.get("token", None),
-                    )
-                if task_type == "execute":
-                    self.execute(func, *args, **kwargs)
-            except Exception as e:
-                msg = f"{self.task_id}\n:{repr(e)}"
-                logger.error(msg)
-                self.send_log(
-                    text=msg,
-                    chat_id=None,
-                    token=kwargs.get("token", None),
-                )
+        # 실행 여부 확인과 기록을 한 번의 insert로 처리(이미 있으면 False)
+        if self.block and not Metastore().add_task(key=self.key, task_id=self.task_id):
+            logger.info(f"{self.task_id} already executed.")
+            return
+        self._run(task_type, func, *args, **kwargs)
 
 
 def get_chat_id(token: str):
@@ -243,60 +349,93 @@ def get_chat_id(token: str):
     Args:
         token: Telegram Bot Token
     """
-    url = f"https://api.telegram.org/bot{token}/getUpdates"
-    response = requests.get(url)
+    url = f"{URLConfig.URL['텔레그램']}{token}/getUpdates"
+    response = http_get(url)
     return response
 
 
+def _resolve_telegram(
+    token: str = None, chat_id: str = None, settings: Settings = None
+):
+    """token, chat_id가 없으면 Settings의 bot token, 테스트 chat_id 사용"""
+    if not settings:
+        settings = get_settings()
+    if not token:
+        token = settings.telegram_bot_token
+    if not chat_id:
+        chat_id = settings.telegram_test_chat_id
+    return token, chat_id
+
+
+def _log_text(text: str, func_name: str = None, stack_index: int = None):
+    if not func_name:
+        func_name = get_funcname(stack_index=stack_index)
+    return f"{platform.uname().node}:\n{func_name}:\n" + text
+
+
 async def send_log(
     text: str,
     chat_id: str = None,
     token: str = None,
     func_name: str = None,
     stack_index: int = None,
+    settings: Settings = None,
 ):
     """telegram chat_id로 메세지 전송
     Args:
         text: 전송할 메세지
         chat_id: telegram channel id
         token: bot의 token
+        settings: token, chat_id 기본값을 가져올 Settings, default get_settings()
     """
-    if not token:
-        token = load_env("TELEGRAM_BOT_TOKEN", ".env", start_path=PathConfig.root)
-    if not chat_id:
-        chat_id = load_env("TELEGRAM_TEST_CHAT_ID", ".env", start_path=PathConfig.root)
-    bot = telegram.Bot(token=token)
-    if not func_name:
-        func_name = get_funcname(stack_index=stack_index)
-    text = f"{platform.uname().node}:\n{func_name}:\n" + text
-    await bot.send_message(chat_id=chat_id, text=text)
+    token, chat_id = _resolve_telegram(token, chat_id, settings)
+    text = _log_text(text, func_name=func_name, stack_index=stack_index)
+    await asyncio.wrap_future(get_dispatcher(token).send_message(text, chat_id))
 
 
-async def send_message(text: str, chat_id: str = None, token: str = None):
+async def send_message(
+    text: str, chat_id: str = None, token: str = None, settings: Settings = None
+):
     """telegram chat_id로 메세지 전송
     Args:
         text: 전송할 메세지
         chat_id: telegram channel id
         token: bot의 token
+        settings: token, chat_id 기본값을 가져올 Settings, default get_settings()
     """
-    if not token:
-        token = load_env("TELEGRAM_BOT_TOKEN", ".env", start_path=PathConfig.root)
-    if not chat_id:
-        chat_id = load_env("TELEGRAM_TEST_CHAT_ID", ".env", start_path=PathConfig.root)
-    bot = telegram.Bot(token=token)
-    await bot.send_message(chat_id=chat_id, text=text)
+    token, chat_id = _resolve_telegram(token, chat_id, settings)
+    await asyncio.wrap_future(get_dispatcher(token).send_message(text, chat_id))
 
 
-async def send_photo(photo: str, chat_id: str = None, token: str = None):
+async def send_photo(
+    photo: str, chat_id: str = None, token: str = None, settings: Settings = None
+):
     """telegram chat_id로 메세지 전송
     Args:
         photo: 전송할 이미지의 Path
         chat_id: telegram channel id
         token: bot의 token
+        settings: token, chat_id 기본값을 가져올 Settings, default get_settings()
     """
-    if not token:
-        token = load_env("TELEGRAM_BOT_TOKEN", ".env", start_path=PathConfig.root)
-    if not chat_id:
-        chat_id = load_env("TELEGRAM_TEST_CHAT_ID", ".env", start_path=PathConfig.root)
-    bot = telegram.Bot(token=token)
-    await bot.send_photo(chat_id=chat_id, photo=photo)
+    token, chat_id = _resolve_telegram(token, chat_id, settings)
+    await asyncio.wrap_future(get_dispatcher(token).send_photo(photo, chat_id))
+
+
+async def send_media_group(
+    photos: list,
+    chat_id: str = None,
+    token: str = None,
+    caption: str = None,
+    settings: Settings = None,
+):
+    """telegram chat_id로 사진 여러 장을 앨범으로 전송
+    Args:
+        photos: 전송할 이미지의 Path 리스트
+        chat_id: telegram channel id
+        token: bot의 token
+        caption: 앨범 설명
+        settings: token, chat_id 기본값을 가져올 Settings, default get_settings()
+    """
+    token, chat_id = _resolve_telegram(token, chat_id, settings)
+    futures = get_dispatcher(token).send_media_group(photos, chat_id, caption=caption)
+    await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))